@@ -0,0 +1,234 @@
+"""
+Adaptive runner module for batches that run until their estimate is precise enough.
+
+A fixed trial count is either wasted on easy setups, like the small grids of
+K-2, or too small for hard ones. run_adaptive runs trials in chunks and, after
+each chunk, computes a confidence interval for the mean meeting time or for a
+quantile of it. It stops once the interval is narrower than the target, or once
+the trial or time budget runs out, and reports the precision it reached.
+
+The mean's interval uses the normal approximation (mean +/- z * stdev / sqrt(n)).
+A quantile's interval is distribution-free: the true q-quantile lies between
+the sample quantiles at q +/- z * sqrt(q * (1 - q) / n). Both are read off the
+batch's RunStatistics, so memory stays constant however many trials are run;
+quantile intervals are therefore never tighter than run_statistics.RELATIVE_ACCURACY.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from statistics import NormalDist
+
+import batch_runner
+
+# Trials run between two checks of the confidence interval
+DEFAULT_CHUNK_SIZE = 200
+
+# Trials run before the interval is trusted, so a lucky first chunk cannot end the batch
+DEFAULT_MIN_TRIALS = 400
+
+
+def confidence_interval(statistics, quantile=None, confidence=0.95):
+    """
+    Computes a confidence interval for the mean of a stream of run lengths, or for one of its quantiles.
+
+    Args:
+        statistics (RunStatistics): The run lengths.
+        quantile (float): The quantile to estimate, e.g. 0.9, or None for the mean.
+        confidence (float): The probability that the interval holds the true value.
+
+    Returns:
+        tuple: (estimate, lower, upper); lower and upper are infinite with fewer than two runs.
+    """
+    count = statistics.count
+    if quantile is None:
+        estimate = statistics.mean if count else math.nan
+    else:
+        estimate = statistics.quantile(quantile) if count else math.nan
+    if count < 2:
+        return estimate, -math.inf, math.inf
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)  # 1.96 for 95%
+    if quantile is None:
+        half_width = z * statistics.stdev() / math.sqrt(count)
+        return estimate, estimate - half_width, estimate + half_width
+
+    # Ranks of the order statistics bracketing the quantile with the requested confidence
+    spread = z * math.sqrt(quantile * (1 - quantile) / count)
+    return estimate, statistics.quantile(max(quantile - spread, 0)), statistics.quantile(min(quantile + spread, 1))
+
+
+class AdaptiveResult:
+    """
+    A class holding the outcome of an adaptive batch.
+
+    Attributes:
+        batch (BatchResult): The trials run, without their per-trial results.
+        quantile (float): The quantile estimated, or None for the mean.
+        confidence (float): The confidence level of the interval.
+        estimate (float): The estimated mean or quantile of the meeting time.
+        lower (float): The lower end of the confidence interval.
+        upper (float): The upper end of the confidence interval.
+        stop_reason (str): 'precision' if the target width was reached, otherwise 'trials' or 'time'.
+        seconds (float): The time spent running trials.
+    """
+
+    def __init__(self, batch, quantile, confidence, stop_reason, seconds):
+        """
+        Initializes an AdaptiveResult instance.
+
+        Args:
+            batch (BatchResult): The trials run.
+            quantile (float): The quantile estimated, or None for the mean.
+            confidence (float): The confidence level of the interval.
+            stop_reason (str): Why the batch stopped.
+            seconds (float): The time spent running trials.
+        """
+        self.batch = batch
+        self.quantile = quantile
+        self.confidence = confidence
+        self.estimate, self.lower, self.upper = confidence_interval(batch.statistics, quantile, confidence)
+        self.stop_reason = stop_reason
+        self.seconds = seconds
+
+    def width(self):
+        """
+        Returns the width of the confidence interval.
+
+        Returns:
+            float: upper - lower, in steps.
+        """
+        return self.upper - self.lower
+
+    def relative_width(self):
+        """
+        Returns the width of the confidence interval relative to the estimate.
+
+        Returns:
+            float: The width divided by the estimate (infinite if the estimate is 0 or unknown).
+        """
+        return self.width() / self.estimate if self.estimate else math.inf
+
+    def summary(self):
+        """
+        Combines the batch's statistics with the precision reached.
+
+        Returns:
+            dict: The keys of BatchResult.summary, plus the statistic estimated, its estimate, the confidence
+                  interval, its absolute and relative width, the reason for stopping and the time taken.
+        """
+        summary = self.batch.summary()
+        summary.update({
+            'statistic': 'mean' if self.quantile is None else f'p{self.quantile * 100:g}',
+            'estimate': self.estimate,
+            'confidence': self.confidence,
+            'ci_lower': self.lower,
+            'ci_upper': self.upper,
+            'ci_width': self.width(),
+            'relative_width': self.relative_width(),
+            'stop_reason': self.stop_reason,
+            'seconds': self.seconds,
+        })
+        return summary
+
+
+def run_adaptive(grid_width, grid_height, positions, wandering_choice, target_width=None, relative_width=0.05,
+                 quantile=None, confidence=0.95, max_trials=1000000, time_budget=None, seed=None, memory_limit=5,
+                 max_steps=None, chunk_size=DEFAULT_CHUNK_SIZE, min_trials=DEFAULT_MIN_TRIALS):
+    """
+    Runs trials of one setup until the confidence interval of the estimate is narrow enough.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        target_width (float): Stop once the interval is at most this many steps wide.
+        relative_width (float): Stop once the interval is at most this fraction of the estimate wide
+                                (used when target_width is None).
+        quantile (float): The quantile to estimate, e.g. 0.9, or None for the mean.
+        confidence (float): The confidence level of the interval.
+        max_trials (int): The most trials to run.
+        time_budget (float): Optional most seconds to spend; the chunk in progress is finished first.
+        seed (int): Optional seed; the trials run are reproducible unless the time budget stops the batch.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial; abandoned trials are left out of
+                         the estimate.
+        chunk_size (int): The number of trials run between checks of the interval.
+        min_trials (int): The fewest trials run before the interval is checked.
+
+    Returns:
+        AdaptiveResult: The trials run and the precision reached.
+    """
+    if target_width is None and relative_width is None:
+        raise ValueError('Either target_width or relative_width is needed')
+    if not batch_runner.can_meet(grid_width, grid_height, positions, wandering_choice) and max_steps is None:
+        raise ValueError('The players can never all meet, so no trial would end; set max_steps')
+
+    result = batch_runner.BatchResult(keep_trials=False)
+    trials = batch_runner.iter_trials(grid_width, grid_height, positions, wandering_choice, max_trials, seed,
+                                      memory_limit, max_steps)
+    start = time.perf_counter()
+    stop_reason = 'trials'
+
+    for steps, longest_run in trials:
+        result.add(steps, longest_run)
+        if result.trials % chunk_size and result.trials != max_trials:
+            continue  # Only check at the end of a chunk
+
+        if result.trials >= min_trials:
+            estimate, lower, upper = confidence_interval(result.statistics, quantile, confidence)
+            target = target_width if target_width is not None else relative_width * abs(estimate)
+            if upper - lower <= target:
+                stop_reason = 'precision'
+                break
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            stop_reason = 'time'
+            break
+
+    return AdaptiveResult(result, quantile, confidence, stop_reason, time.perf_counter() - start)
+
+
+def main(argv=None):
+    """
+    Runs an adaptive batch described by the command-line arguments and prints its summary as JSON.
+
+    Args:
+        argv (list): Optional arguments to parse instead of sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(description='Run trials until the meeting time is known precisely enough.')
+    parser.add_argument('--width', type=int, default=10, help='grid width (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=10, help='grid height (default: %(default)s)')
+    parser.add_argument('--players', type=int, default=2, help='players, placed along the diagonal (default: 2)')
+    parser.add_argument('--strategy', choices=batch_runner.WANDERING_CHOICES, default='Random',
+                        help='wandering strategy (default: %(default)s)')
+    parser.add_argument('--quantile', type=float, help='estimate this quantile, e.g. 0.9, instead of the mean')
+    parser.add_argument('--width-target', type=float, dest='target_width', help='target interval width in steps')
+    parser.add_argument('--relative-width', type=float, default=0.05,
+                        help='target interval width as a fraction of the estimate (default: %(default)s)')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level (default: %(default)s)')
+    parser.add_argument('--max-trials', type=int, default=1000000, help='trial budget (default: %(default)s)')
+    parser.add_argument('--time-budget', type=float, help='time budget in seconds')
+    parser.add_argument('--seed', type=int, help='seed making the trials reproducible')
+    parser.add_argument('--max-steps', type=int, help='abandon a trial after this many steps')
+    args = parser.parse_args(argv)
+
+    positions = batch_runner.default_positions(args.width, args.height, args.players)
+    try:
+        result = run_adaptive(args.width, args.height, positions, args.strategy, args.target_width,
+                              args.relative_width, args.quantile, args.confidence, args.max_trials, args.time_budget,
+                              args.seed, max_steps=args.max_steps)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(json.dumps(result.summary(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Assets module for loading fonts, images and music on first use.
+
+Nothing here is loaded when the module is imported. Fonts and images are
+loaded the first time they are asked for and cached, images once per size
+and transparency they are shown at. Music is streamed from disk through
+pygame.mixer.music rather than decoded into memory up front.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+import pygame
+
+
+def resource_path(relative_path):
+    """
+    Returns the absolute path of a bundled file, both in development and in a PyInstaller executable.
+
+    Args:
+        relative_path (str): The path of the file relative to the game folder.
+
+    Returns:
+        str: The absolute path of the file.
+    """
+    if getattr(sys, 'frozen', False):  # Check if running as an exe
+        base_path = sys._MEIPASS  # Temporary directory for PyInstaller
+    else:
+        base_path = os.path.abspath(".")  # Normal script execution
+
+    return os.path.join(base_path, relative_path)
+
+
+@lru_cache(maxsize=None)
+def get_font(name, size):
+    """
+    Returns a system font, looking it up on first use.
+
+    Args:
+        name (str): The font family, e.g. 'Arial'.
+        size (int): The font size.
+
+    Returns:
+        pygame.font.Font: The font.
+    """
+    if not pygame.font.get_init():
+        pygame.font.init()  # Fonts can be needed before the rest of pygame is started
+    return pygame.font.SysFont(name, size)
+
+
+@lru_cache(maxsize=32)
+def get_image(relative_path, size=None, alpha=None):
+    """
+    Returns an image, loading it on first use and caching each size and transparency it is asked for.
+
+    Args:
+        relative_path (str): The path of the image relative to the game folder.
+        size (tuple): Optional (width, height) to scale the image to.
+        alpha (int): Optional transparency (0 = fully transparent, 255 = fully opaque).
+
+    Returns:
+        pygame.Surface: The image, or None if it could not be loaded.
+    """
+    if size is not None or alpha is not None:
+        image = get_image(relative_path)  # Scale and fade a copy of the original
+        if image is None:
+            return None
+        if size is not None:
+            image = pygame.transform.scale(image, size)  # Resize image
+        else:
+            image = image.copy()  # Keep the cached original opaque
+        if alpha is not None:
+            image.set_alpha(alpha)  # Set transparency
+        return image
+
+    try:
+        image = pygame.image.load(resource_path(relative_path))
+    except (pygame.error, FileNotFoundError) as e:
+        print(f"Unable to load image: {e}")
+        return None
+
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()  # Match the window's pixel format so blitting is fast
+    return image
+
+
+def play_music(relative_path, loops=-1):
+    """
+    Streams background music from disk.
+
+    Args:
+        relative_path (str): The path of the music file relative to the game folder.
+        loops (int): The number of times to repeat the music (-1 loops it indefinitely).
+
+    Returns:
+        bool: True if the music started; False if it or the audio device is unavailable.
+    """
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()  # Only open the audio device once there is something to play
+        pygame.mixer.music.load(resource_path(relative_path))
+        pygame.mixer.music.play(loops)
+    except (pygame.error, FileNotFoundError) as e:
+        print(f"Unable to play music: {e}")
+        return False
+
+    return True
@@ -0,0 +1,350 @@
+"""
+Batch runner module for headless Monte Carlo simulations.
+
+This module plays the wandering strategies from group_manager without a pygame
+window, turn timer or merge animation, so many independent trials can be run
+to completion as fast as the CPU allows. Each trial follows the same rules as
+Game.game_loop: every group moves once per step (led by its lowest numbered
+member), all groups sharing a cell merge, and the run ends when everybody has met.
+"""
+
+import random
+import re
+
+import grid_adjacency
+from run_statistics import RunStatistics
+from visit_memory import VisitMemory
+
+# Wandering strategies understood by the batch runner (same names as universal_variables.WANDERING_CHOICE)
+WANDERING_CHOICES = ('Random', 'Random Valid', 'Biased Unexplored')
+
+# Version of the trial rules and their use of the random number generator. Bump it whenever a change alters the
+# results of a seeded batch, so that results cached by sweep are computed again.
+ENGINE_VERSION = 2
+
+# A written "x,y" starting position
+COORDINATE_PAIR = re.compile(r'(-?\d+),(-?\d+)')
+
+def default_positions(grid_width, grid_height, player_count, grade_level=2):
+    """
+    Returns the starting positions the game uses for a grade level.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        player_count (int): The number of players (ignored for grade level 1, which always has two).
+        grade_level (int): The grade level (1 = K-2 | 2 = 3-5 | 3 = 6-8).
+
+    Returns:
+        list of tuple: The (x, y) starting position of each player.
+    """
+    if grade_level == 1:
+        # K-2 places two players at opposite corners of the grid
+        return [(0, 0), (grid_width - 1, grid_height - 1)]
+
+    # 3-5 and 6-8 spread the players along the diagonal, like simulation_chooser does
+    return [(i * (grid_width // player_count), i * (grid_height // player_count)) for i in range(player_count)]
+
+
+def parse_positions(text, grid_width=None, grid_height=None):
+    """
+    Reads starting positions written as whitespace-separated "x,y" pairs, e.g. "0,0 4,4 2,3".
+
+    Every pair must be written exactly, so a typo is reported rather than skipped or guessed at.
+
+    Args:
+        text (str): The pairs.
+        grid_width (int): Optional width of the grid the positions must lie on.
+        grid_height (int): Optional height of the grid the positions must lie on.
+
+    Returns:
+        list of tuple: The (x, y) position of each pair, in order (empty if the text has none).
+    """
+    positions = []
+    for token in text.split():
+        match = COORDINATE_PAIR.fullmatch(token)
+        if match is None:
+            raise ValueError(f'{token!r} is not an "x,y" position')
+        x, y = int(match.group(1)), int(match.group(2))
+        if grid_width is not None and not (0 <= x < grid_width and 0 <= y < grid_height):
+            raise ValueError(f'Starting position ({x}, {y}) is outside the {grid_width}x{grid_height} grid')
+        positions.append((x, y))
+    return positions
+
+
+def can_meet(grid_width, grid_height, positions, wandering_choice):
+    """
+    Tells whether the players can ever all meet.
+
+    Under Random Valid and Biased Unexplored every group moves to a neighbouring
+    cell each step, so players starting on different colors of a checkerboard
+    always stay on different colors and a trial with them never ends. The one
+    exception is Random Valid on a single row or column, where a move into a
+    side wall has nowhere to bounce to and leaves the group in place.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of WANDERING_CHOICES.
+
+    Returns:
+        bool: False if the players can never all be on the same cell.
+    """
+    if wandering_choice == 'Random':
+        return True  # Blocked moves leave a group in place, changing its color relative to the others
+    if wandering_choice == 'Random Valid' and (grid_width == 1 or grid_height == 1):
+        return True  # Same for the side walls of a single row or column
+    return len({(x + y) % 2 for x, y in positions}) <= 1
+
+
+def run_trial(grid_width, grid_height, positions, wandering_choice, rng=random, memory_limit=5, max_steps=None,
+              adjacency=None):
+    """
+    Runs a single headless trial until every player has met.
+
+    Only group leaders are tracked, since every member of a group shares its
+    leader's position and only the leader's history steers Biased Unexplored.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player, in player order.
+        wandering_choice (str): One of WANDERING_CHOICES.
+        rng (random.Random): The random number generator driving the moves.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps before the trial is abandoned.
+        adjacency (GridAdjacency): Optional move tables from grid_adjacency, reused across trials.
+
+    Returns:
+        tuple: (steps, longest_run_without_meeting), where steps is -1 if max_steps was reached.
+    """
+    if wandering_choice not in WANDERING_CHOICES:
+        raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+    if adjacency is None:
+        adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)
+
+    biased = wandering_choice == 'Biased Unexplored'
+    moves = adjacency.clamped if wandering_choice == 'Random' else adjacency.reflected
+    neighbour_start, neighbour_cells = adjacency.neighbour_start, adjacency.neighbour_cells
+    next_random = rng.random  # Bound method, called once per group per step
+    leaders = list(range(len(positions)))  # Group leaders in player order
+    cell = [y * grid_width + x for x, y in positions]  # Cell of each group, indexed by leader
+    last_meeting = [0] * len(positions)  # Step at which each player's move count was last reset
+    history = [VisitMemory([c]) for c in cell]  # Recently visited cells of each leader
+    longest_run_without_meeting = 0
+    step = 0
+
+    while max_steps is None or step < max_steps:
+        step += 1
+
+        # Move each group based on its leader's direction
+        for leader in leaders:
+            if biased:
+                # Prefer the unexplored moves, or move randomly if all are explored
+                leader_cell = cell[leader]
+                leader_history = history[leader]
+                valid_moves = neighbour_cells[neighbour_start[leader_cell]:neighbour_start[leader_cell + 1]]
+                choices = [move for move in valid_moves if move not in leader_history] or valid_moves
+                # A 1x1 grid has nowhere to go, so the group stays put
+                new_cell = choices[int(next_random() * len(choices))] if choices else leader_cell
+                leader_history.append(new_cell, memory_limit)
+            else:
+                new_cell = moves[cell[leader] * 4 + int(next_random() * 4)]
+
+            cell[leader] = new_cell
+
+        # Merge every group that lands on a cell already taken by an earlier group, as update_groups does
+        if len(leaders) > 1:
+            occupied_cells = {}  # cell -> leader of the first group found on that cell
+            remaining = []
+            for player2 in leaders:
+                player1 = occupied_cells.setdefault(cell[player2], player2)
+                if player1 == player2:
+                    remaining.append(player2)
+                    continue
+
+                longest_run_without_meeting = max(longest_run_without_meeting, step - last_meeting[player1],
+                                                  step - last_meeting[player2])
+                last_meeting[player1] = last_meeting[player2] = step  # Reset both move counts
+            leaders = remaining  # The lower numbered player leads each merged group
+
+        # The run is over once everybody has merged into one group
+        if len(leaders) == 1:
+            return step, longest_run_without_meeting
+
+    return -1, longest_run_without_meeting
+
+
+class BatchResult:
+    """
+    A class holding the outcome of a batch of trials.
+
+    The aggregate statistics are updated as each trial is added, so a batch
+    that does not keep its per-trial results takes constant memory however
+    many trials it runs.
+
+    Attributes:
+        steps (list): The number of steps each trial took for everybody to meet (-1 if abandoned),
+                      or None if the per-trial results are not kept.
+        longest_runs (list): The longest run without meeting recorded in each trial, or None if not kept.
+        trials (int): The number of trials added.
+        statistics (RunStatistics): The meeting step counts of the completed trials.
+        longest_run_without_meeting (int): The longest run without meeting over every trial.
+    """
+
+    def __init__(self, steps=(), longest_runs=(), keep_trials=True):
+        """
+        Initializes a BatchResult instance.
+
+        Args:
+            steps (list): The meeting step count of each trial.
+            longest_runs (list): The longest run without meeting of each trial.
+            keep_trials (bool): Whether to keep the per-trial results, or only their statistics.
+        """
+        self.steps = [] if keep_trials else None  # Meeting step count per trial
+        self.longest_runs = [] if keep_trials else None  # Longest run without meeting per trial
+        self.trials = 0
+        self.statistics = RunStatistics()  # Completed trials only
+        self.longest_run_without_meeting = 0
+
+        for trial_steps, longest_run in zip(steps, longest_runs):
+            self.add(trial_steps, longest_run)
+
+    def add(self, steps, longest_run):
+        """
+        Records the outcome of one trial.
+
+        Args:
+            steps (int): The number of steps the trial took for everybody to meet (-1 if abandoned).
+            longest_run (int): The longest run without meeting recorded in the trial.
+        """
+        self.trials += 1
+        if steps != -1:  # Abandoned trials only count towards the number of trials
+            self.statistics.add(steps)
+        self.longest_run_without_meeting = max(self.longest_run_without_meeting, longest_run)
+
+        if self.steps is not None:
+            self.steps.append(steps)
+            self.longest_runs.append(longest_run)
+
+    def merge(self, other):
+        """
+        Appends the trials of another batch to this one.
+
+        If either batch did not keep its per-trial results, the merged batch
+        only keeps the statistics.
+
+        Args:
+            other (BatchResult): The batch to merge in.
+
+        Returns:
+            BatchResult: This batch, now holding the trials of both.
+        """
+        self.trials += other.trials
+        self.statistics.merge(other.statistics)
+        self.longest_run_without_meeting = max(self.longest_run_without_meeting, other.longest_run_without_meeting)
+
+        if self.steps is not None and other.steps is not None:
+            self.steps.extend(other.steps)
+            self.longest_runs.extend(other.longest_runs)
+        else:
+            self.steps = self.longest_runs = None
+        return self
+
+    def summary(self):
+        """
+        Computes aggregate statistics over the completed trials.
+
+        The quantiles are exact when the per-trial results were kept, and
+        within run_statistics.RELATIVE_ACCURACY of the exact value otherwise.
+
+        Returns:
+            dict: The trial count, completed count, mean, standard deviation, minimum,
+                  median, 90th and 99th percentiles, maximum and longest run without meeting.
+        """
+        statistics = self.statistics
+        summary = {'trials': self.trials, 'completed': statistics.count,
+                   'longest_run_without_meeting': self.longest_run_without_meeting}
+
+        if not statistics.count:
+            return summary
+
+        summary.update({
+            'mean': statistics.mean,
+            'stdev': statistics.stdev(),
+            'min': statistics.minimum,
+            'median': statistics.quantile(0.5),
+            'p90': statistics.quantile(0.9),
+            'p99': statistics.quantile(0.99),
+            'max': statistics.maximum,
+        })
+
+        if self.steps is not None:
+            completed = sorted(s for s in self.steps if s != -1)  # Exact quantiles from the kept trials
+            summary['median'] = completed[len(completed) // 2]
+            summary['p90'] = completed[min(len(completed) - 1, int(len(completed) * 0.9))]
+            summary['p99'] = completed[min(len(completed) - 1, int(len(completed) * 0.99))]
+        return summary
+
+
+def iter_trials(grid_width, grid_height, positions, wandering_choice, trials, seed=None, memory_limit=5,
+                max_steps=None):
+    """
+    Runs independent headless trials of the same setup, yielding each result as soon as the trial ends.
+
+    Nothing is kept between trials, so a caller streaming the results elsewhere uses constant memory.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of WANDERING_CHOICES.
+        trials (int): The number of trials to run, or None to run until the caller stops.
+        seed (int): Optional seed, making the trials reproducible.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+
+    Yields:
+        tuple: (steps, longest_run_without_meeting) of each trial, as returned by run_trial.
+    """
+    if wandering_choice not in WANDERING_CHOICES:
+        raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+    for x, y in positions:
+        if not (0 <= x < grid_width and 0 <= y < grid_height):
+            raise ValueError(f'Starting position ({x}, {y}) is outside the {grid_width}x{grid_height} grid')
+
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)  # Shared by every trial
+    rng = random.Random(seed)  # Private generator, so the trials never disturb the game's random state
+
+    trial = 0
+    while trials is None or trial < trials:
+        yield run_trial(grid_width, grid_height, positions, wandering_choice, rng, memory_limit, max_steps, adjacency)
+        trial += 1
+
+
+def run_batch(grid_width, grid_height, positions, wandering_choice, trials, seed=None, memory_limit=5,
+              max_steps=None, keep_trials=True):
+    """
+    Runs many independent headless trials of the same setup.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of WANDERING_CHOICES.
+        trials (int): The number of trials to run.
+        seed (int): Optional seed, making the batch reproducible.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+        keep_trials (bool): Whether to keep every trial's result, or only the statistics (constant memory).
+
+    Returns:
+        BatchResult: The per-trial meeting steps and longest runs without meeting.
+    """
+    result = BatchResult(keep_trials=keep_trials)
+    for steps, longest_run in iter_trials(grid_width, grid_height, positions, wandering_choice, trials, seed,
+                                          memory_limit, max_steps):
+        result.add(steps, longest_run)
+
+    return result
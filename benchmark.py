@@ -0,0 +1,357 @@
+"""
+Benchmark module for the movement, grouping and rendering hot paths.
+
+The suite runs headlessly (pygame renders to the dummy SDL video driver) over
+a matrix of grid sizes, player counts and wandering strategies, and measures:
+
+    movement   steps per second of group_manager.move_groups and update_groups,
+               as the game calls them, with the share spent in each
+    batch      trials per second of batch_runner.run_trial
+    render     frame times of Game.draw_grid while the players move
+
+Peak memory is measured in a separate, shorter pass under tracemalloc, whose
+overhead would otherwise distort the timings. Results can be saved as a
+baseline and later runs compared against it, failing when any metric is worse
+than the baseline by more than a threshold:
+
+    python benchmark.py --save        # record benchmark_baseline.json
+    python benchmark.py               # compare, exit status 1 on a regression
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import batch_runner
+import grid_adjacency
+import group_manager
+import universal_variables
+from person import Person
+
+# Benchmark matrix
+GRID_SIZES = (10, 50, 250)
+PLAYER_COUNTS = (2, 16)
+QUICK_GRID_SIZES = (10, 50)
+QUICK_PLAYER_COUNTS = (4,)
+
+# Work done per measurement
+MOVEMENT_STEPS = 20000  # Steps timed per movement case
+BATCH_SECONDS = 0.5  # Time spent running trials per batch case (trial lengths vary too much to fix their number)
+BATCH_MAX_STEPS = 5000  # Cap on each batch trial, so large grids finish
+RENDER_FRAMES = 2000  # Frames timed per render case
+REPEATS = 5  # Each timing is repeated and the best kept, to filter out noise
+
+# Work done once more under tracemalloc, to measure peak memory
+MEMORY_STEPS = 200
+MEMORY_SECONDS = 0.05
+MEMORY_FRAMES = 50
+
+# Default file of baseline results and default allowed slowdown (0.2 = 20% worse)
+BASELINE_PATH = 'benchmark_baseline.json'
+REGRESSION_THRESHOLD = 0.2
+
+
+def make_people(grid_size, player_count):
+    """
+    Creates players spread along the diagonal, as the game places them for grades 3-5 and 6-8.
+
+    Args:
+        grid_size (int): The width and height of the grid.
+        player_count (int): The number of players.
+
+    Returns:
+        list of Person: The players.
+    """
+    positions = batch_runner.default_positions(grid_size, grid_size, player_count)
+    return [Person(x, y, universal_variables.PLAYER_COLORS[i % len(universal_variables.PLAYER_COLORS)], i + 1)
+            for i, (x, y) in enumerate(positions)]
+
+
+def run_steps(people, grid_size, steps, occupancy=None, timings=None):
+    """
+    Plays steps the way the game does, starting over whenever everybody has met.
+
+    Args:
+        people (list of Person): The players, replaced in place by new ones if the run starts over.
+        grid_size (int): The width and height of the grid.
+        steps (int): The number of steps to play.
+        occupancy (OccupancyIndex): The occupancy index of the players (built if not given).
+        timings (list): Optional [move seconds, update seconds] to add the time spent in each call to.
+
+    Returns:
+        OccupancyIndex: The occupancy index of the players at the end.
+    """
+    clock = time.perf_counter
+    if occupancy is None:
+        occupancy = group_manager.build_occupancy_index(people)
+
+    for _ in range(steps):
+        start = clock()
+        group_manager.move_groups(people, grid_size, grid_size, occupancy)
+        moved = clock()
+        merged = group_manager.update_groups(people, occupancy)
+        if timings is not None:
+            timings[0] += moved - start
+            timings[1] += clock() - moved
+
+        # Once everybody has met, keep measuring on a fresh run
+        if merged and all(person.x == people[0].x and person.y == people[0].y for person in people):
+            people[:] = make_people(grid_size, len(people))
+            occupancy = group_manager.build_occupancy_index(people)
+
+    return occupancy
+
+
+def bench_movement(grid_size, player_count, strategy, steps, repeats=REPEATS):
+    """
+    Measures the speed of moving and grouping the players.
+
+    Args:
+        grid_size (int): The width and height of the grid.
+        player_count (int): The number of players.
+        strategy (str): One of batch_runner.WANDERING_CHOICES.
+        steps (int): The number of steps to time.
+        repeats (int): The number of times to time them.
+
+    Returns:
+        dict: steps_per_second, and the move_share of the time spent in move_groups rather than update_groups.
+    """
+    universal_variables.WANDERING_CHOICE = strategy
+    best = None
+    for _ in range(repeats):
+        random.seed(0)  # Every repeat plays the same game
+        timings = [0.0, 0.0]
+        run_steps(make_people(grid_size, player_count), grid_size, steps, timings=timings)
+        if best is None or sum(timings) < sum(best):
+            best = timings
+
+    return {'steps_per_second': steps / sum(best), 'move_share': best[0] / sum(best)}
+
+
+def bench_batch(grid_size, player_count, strategy, seconds, repeats=REPEATS):
+    """
+    Measures the speed of headless batch trials.
+
+    Args:
+        grid_size (int): The width and height of the grid.
+        player_count (int): The number of players.
+        strategy (str): One of batch_runner.WANDERING_CHOICES.
+        seconds (float): How long to keep running trials (at least one is always run).
+        repeats (int): The number of times to time them.
+
+    Returns:
+        dict: trials_per_second.
+    """
+    positions = batch_runner.default_positions(grid_size, grid_size, player_count)
+    adjacency = grid_adjacency.get_adjacency(grid_size, grid_size)  # Built before the clock starts
+    best = 0.0
+    for _ in range(repeats):
+        rng = random.Random(0)  # Every repeat plays the same trials
+        trials = 0
+        start = time.perf_counter()
+        while trials == 0 or time.perf_counter() - start < seconds:
+            batch_runner.run_trial(grid_size, grid_size, positions, strategy, rng, max_steps=BATCH_MAX_STEPS,
+                                   adjacency=adjacency)
+            trials += 1
+        best = max(best, trials / (time.perf_counter() - start))
+
+    return {'trials_per_second': best}
+
+
+def bench_render(grid_size, player_count, strategy, frames, repeats=REPEATS):
+    """
+    Measures how long Game.draw_grid takes per frame while the players move.
+
+    Args:
+        grid_size (int): The width and height of the grid.
+        player_count (int): The number of players.
+        strategy (str): One of batch_runner.WANDERING_CHOICES.
+        frames (int): The number of frames to time.
+        repeats (int): The number of times to time them.
+
+    Returns:
+        dict: The mean_frame_ms and p95_frame_ms frame times.
+    """
+    import game_base  # Needs pygame, which only the render benchmark uses
+
+    universal_variables.WANDERING_CHOICE = strategy
+    best = None
+    for _ in range(repeats):
+        random.seed(0)  # Every repeat plays the same game
+        game = game_base.Game(grid_size, grid_size, player_count)
+        game.people = make_people(grid_size, player_count)
+        game.enter()  # Opens the (dummy) window and sets up the run
+
+        times = []
+        for _ in range(frames):
+            game.occupancy = run_steps(game.people, grid_size, 1, game.occupancy)
+            start = time.perf_counter()
+            game.draw_grid(game.screen)
+            times.append((time.perf_counter() - start) * 1000)
+        if best is None or sum(times) < sum(best):
+            best = times
+
+    frame_times = sorted(best)
+    return {'mean_frame_ms': statistics.mean(frame_times),
+            'p95_frame_ms': frame_times[min(len(frame_times) - 1, int(len(frame_times) * 0.95))]}
+
+
+def peak_memory(benchmark, *args):
+    """
+    Runs a benchmark under tracemalloc.
+
+    Args:
+        benchmark (callable): The benchmark function.
+        *args: Its arguments.
+
+    Returns:
+        float: The peak memory allocated while it ran, in KiB.
+    """
+    tracemalloc.start()
+    try:
+        benchmark(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(grid_sizes=GRID_SIZES, player_counts=PLAYER_COUNTS, strategies=batch_runner.WANDERING_CHOICES,
+              render=True, log=print):
+    """
+    Runs every benchmark over the matrix of grid sizes, player counts and strategies.
+
+    Args:
+        grid_sizes (tuple): The grid widths (and heights) to run.
+        player_counts (tuple): The player counts to run.
+        strategies (tuple): The wandering strategies to run.
+        render (bool): Whether to include the rendering benchmark.
+        log (callable): Called with a line of progress for each case, or None for silence.
+
+    Returns:
+        dict: Maps a case name, e.g. 'movement/Random/50x50/2p', to its metrics.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Render without opening a window
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    saved = universal_variables.WANDERING_CHOICE, universal_variables.RUN_LOG_PATH
+    universal_variables.RUN_LOG_PATH = None  # Benchmarks are not real runs
+
+    suites = [('movement', bench_movement, MOVEMENT_STEPS, MEMORY_STEPS),
+              ('batch', bench_batch, BATCH_SECONDS, MEMORY_SECONDS)]
+    if render:
+        suites.append(('render', bench_render, RENDER_FRAMES, MEMORY_FRAMES))
+
+    results = {}
+    try:
+        for name, benchmark, amount, memory_amount in suites:
+            for strategy in strategies:
+                for grid_size in grid_sizes:
+                    for player_count in player_counts:
+                        case = f'{name}/{strategy}/{grid_size}x{grid_size}/{player_count}p'
+                        metrics = benchmark(grid_size, player_count, strategy, amount)
+                        metrics['peak_memory_kb'] = peak_memory(benchmark, grid_size, player_count, strategy,
+                                                                memory_amount, 1)
+                        results[case] = metrics
+                        if log:
+                            log(case + '  ' + '  '.join(f'{key}={value:.4g}' for key, value in metrics.items()))
+    finally:
+        universal_variables.WANDERING_CHOICE, universal_variables.RUN_LOG_PATH = saved
+
+    return results
+
+
+def higher_is_better(metric):
+    """
+    Tells which way a metric improves.
+
+    Args:
+        metric (str): The metric name.
+
+    Returns:
+        bool: True for rates, False for times and memory.
+    """
+    return metric.endswith('_per_second')
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares results against a baseline.
+
+    Metrics the baseline does not have (new cases) are skipped, as are shares,
+    which describe where time goes rather than how much of it there is.
+
+    Args:
+        results (dict): The output of run_suite.
+        baseline (dict): An earlier output of run_suite.
+        threshold (float): The allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list of str: A description of every metric worse than its baseline by more than the threshold.
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(case, {}).get(metric)
+            if base is None or metric.endswith('_share') or base <= 0 or value <= 0:
+                continue
+
+            # How much worse than the baseline, as a fraction of it
+            change = base / value - 1 if higher_is_better(metric) else value / base - 1
+            if change > threshold:
+                regressions.append(f'{case} {metric}: {value:.4g} vs baseline {base:.4g} ({change:+.0%} worse)')
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the suite from the command line.
+
+    Args:
+        argv (list): The command line arguments (defaults to sys.argv).
+
+    Returns:
+        int: The exit status, 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the movement, grouping and rendering hot paths.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='allowed slowdown before failing, e.g. 0.2 for 20%% (default: %(default)s)')
+    parser.add_argument('--quick', action='store_true', help='run a smaller matrix')
+    parser.add_argument('--no-render', action='store_true', help='skip the rendering benchmark')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    grid_sizes, player_counts = (QUICK_GRID_SIZES, QUICK_PLAYER_COUNTS) if args.quick else (GRID_SIZES, PLAYER_COUNTS)
+    results = run_suite(grid_sizes, player_counts, render=not args.no_render)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print('Saved baseline to ' + args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at ' + args.baseline + '; run with --save to record one')
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
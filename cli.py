@@ -0,0 +1,144 @@
+"""
+Command-line runner streaming headless trials as JSON lines.
+
+The only other way to run the simulation is the pygame menu in simulation.py.
+This script plays trials with batch_runner, without importing pygame, and
+writes one JSON object per finished trial to stdout as soon as the trial ends,
+so batch pipelines can consume the results through a pipe:
+
+    python cli.py --width 10 --height 10 --positions "0,0 9,9 5,0" --strategy "Random Valid" \\
+        --trials 100000 --seed 42 --max-steps 100000 | your-consumer
+
+Each line looks like {"trial": 0, "steps": 57, "longest_run_without_meeting": 31}, with
+steps -1 for a trial abandoned at --max-steps. Nothing is kept between trials,
+so memory stays constant however many trials are run. With --summary, the
+statistics of the whole run are written to stderr as one more JSON object
+once the trials are over.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import batch_runner
+import universal_variables
+
+# Longest time (in seconds) a finished trial may sit in the output buffer before it is flushed down the pipe
+FLUSH_INTERVAL = 0.1
+
+
+def parse_positions(text):
+    """
+    Reads starting positions given as "x,y" pairs, e.g. "0,0 4,4 2,3".
+
+    Args:
+        text (str): The pairs, separated by whitespace.
+
+    Returns:
+        list of tuple: The (x, y) position of each player, in player order.
+    """
+    try:
+        positions = batch_runner.parse_positions(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    if not positions:
+        raise argparse.ArgumentTypeError(f'no "x,y" positions in {text!r}')
+    return positions
+
+
+def stream_trials(trials, output, flush_interval=FLUSH_INTERVAL):
+    """
+    Writes each trial's result to a stream as one JSON line.
+
+    Args:
+        trials (iterable): The (steps, longest_run_without_meeting) of each trial, e.g. from batch_runner.iter_trials.
+        output (file): The text stream to write to.
+        flush_interval (float): The longest time (in seconds) between flushes of the stream.
+
+    Returns:
+        batch_runner.BatchResult: The statistics of the trials written, without the per-trial results.
+    """
+    result = batch_runner.BatchResult(keep_trials=False)  # Constant memory, for the summary
+    last_flush = time.monotonic()
+
+    for trial, (steps, longest_run) in enumerate(trials):
+        output.write(json.dumps({'trial': trial, 'steps': steps, 'longest_run_without_meeting': longest_run}) + '\n')
+        result.add(steps, longest_run)
+
+        # Flushing every line would cost a system call per trial; a consumer only has to wait FLUSH_INTERVAL
+        if time.monotonic() - last_flush >= flush_interval:
+            output.flush()
+            last_flush = time.monotonic()
+
+    output.flush()
+    return result
+
+
+def main(argv=None):
+    """
+    Runs the trials described by the command-line arguments and streams their results to stdout.
+
+    Args:
+        argv (list): Optional arguments to parse instead of sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(description='Run headless trials and stream one JSON line per trial.')
+    parser.add_argument('--width', type=int, default=universal_variables.GRID_WIDTH,
+                        help='grid width (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=universal_variables.GRID_HEIGHT,
+                        help='grid height (default: %(default)s)')
+    parser.add_argument('--players', type=int,
+                        help='number of players, placed like the game places them (default: one per --positions '
+                             f'pair, or {universal_variables.PLAYER_COUNT})')
+    parser.add_argument('--positions', type=parse_positions, help='starting positions as "x,y" pairs, e.g. "0,0 4,4"')
+    parser.add_argument('--grade', type=int, choices=(1, 2, 3), default=2,
+                        help='grade level whose default positions are used without --positions (default: %(default)s)')
+    parser.add_argument('--strategy', choices=batch_runner.WANDERING_CHOICES,
+                        default=universal_variables.WANDERING_CHOICE, help='wandering strategy (default: %(default)s)')
+    parser.add_argument('--trials', type=int, default=1000,
+                        help='number of trials, or 0 to run until interrupted (default: %(default)s)')
+    parser.add_argument('--seed', type=int, help='seed making the trials reproducible')
+    parser.add_argument('--max-steps', type=int,
+                        help='abandon a trial after this many steps (needed when the players can never all meet)')
+    parser.add_argument('--memory-limit', type=int, default=5,
+                        help='past positions a Biased Unexplored leader remembers (default: %(default)s)')
+    parser.add_argument('--summary', action='store_true', help='write the statistics of all trials to stderr at the end')
+    args = parser.parse_args(argv)
+
+    if args.positions is None:
+        players = args.players or universal_variables.PLAYER_COUNT
+        positions = batch_runner.default_positions(args.width, args.height, players, args.grade)
+    elif args.players is not None and args.players != len(args.positions):
+        parser.error(f'--players is {args.players} but --positions gives {len(args.positions)} positions')
+    else:
+        positions = args.positions
+    for x, y in positions:
+        if not (0 <= x < args.width and 0 <= y < args.height):
+            parser.error(f'starting position ({x}, {y}) is outside the {args.width}x{args.height} grid')
+    if not batch_runner.can_meet(args.width, args.height, positions, args.strategy) and args.max_steps is None:
+        parser.error(f'the players can never all meet under {args.strategy}, so no trial would end; set --max-steps')
+
+    trials = batch_runner.iter_trials(args.width, args.height, positions, args.strategy, args.trials or None,
+                                      args.seed, args.memory_limit, args.max_steps)
+    try:
+        result = stream_trials(trials, sys.stdout)
+    except ValueError as e:  # Raised by the first trial when the setup is invalid
+        parser.error(str(e))
+    except BrokenPipeError:
+        # The consumer stopped reading, e.g. `| head`; point stdout at nothing so exiting does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except KeyboardInterrupt:
+        return 130
+
+    if args.summary:
+        print(json.dumps(result.summary()), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Frame scheduler module defining the FrameScheduler and SimulationClock classes.
+
+The menu and game loops used to redraw as fast as possible, keeping a CPU core
+busy even while nothing on screen changed. FrameScheduler caps how often a
+loop may run and, when nothing is animating, sleeps until the next input event
+or deadline instead of spinning. SimulationClock is a fixed-timestep clock
+telling the game loop when the next simulation step is due, independent of
+how often frames are drawn.
+"""
+
+import pygame
+
+import universal_variables
+
+
+class FrameScheduler:
+    """
+    A class pacing a pygame loop to a maximum frame rate.
+
+    Attributes:
+        frame_rate (int): The maximum number of frames per second.
+        clock (pygame.time.Clock): The clock used to cap the frame rate.
+    """
+
+    def __init__(self, frame_rate=None):
+        """
+        Initializes a FrameScheduler instance.
+
+        Args:
+            frame_rate (int): The maximum number of frames per second (defaults to universal_variables.FRAME_RATE).
+        """
+        self.frame_rate = frame_rate or universal_variables.FRAME_RATE  # Set frame rate cap
+        self.clock = pygame.time.Clock()  # Tracks the time between frames
+
+    def poll(self):
+        """
+        Waits out the rest of the current frame, then returns the pending events.
+
+        Used while the screen is animating and has to be redrawn every frame.
+
+        Returns:
+            list: The pygame events received since the last frame.
+        """
+        self.clock.tick(self.frame_rate)  # Sleep so the loop runs no faster than the frame rate
+        return pygame.event.get()
+
+    def wait(self, timeout):
+        """
+        Sleeps until an event arrives or the timeout passes, then returns the pending events.
+
+        Used while nothing is animating, so an idle loop costs next to no CPU time.
+
+        Args:
+            timeout (int): The longest time to sleep, in milliseconds.
+
+        Returns:
+            list: The pygame events received, empty if the timeout passed first.
+        """
+        self.clock.tick(self.frame_rate)  # Still never run faster than the frame rate
+        event = pygame.event.wait(max(int(timeout), 1))  # Blocks without spinning
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())  # Collect anything that arrived alongside it
+        return events
+
+
+class SimulationClock:
+    """
+    A class counting the fixed-length simulation steps that are due.
+
+    Elapsed time is collected in an accumulator and paid out one step length
+    at a time, so steps keep an even pace no matter how often frames are drawn.
+
+    Attributes:
+        accumulator (float): Time collected towards the next step, in milliseconds.
+        last_ticks (int): The pygame time at which time was last collected.
+    """
+
+    def __init__(self):
+        """
+        Initializes a SimulationClock instance with no time collected yet.
+        """
+        self.accumulator = 0.0  # Time collected towards the next step
+        self.last_ticks = pygame.time.get_ticks()  # When time was last collected
+
+    def reset(self):
+        """
+        Drops any collected time, so the next step is a full step length away.
+        """
+        self.accumulator = 0.0
+        self.last_ticks = pygame.time.get_ticks()
+
+    def steps_due(self, step_time, max_steps=1):
+        """
+        Collects the time elapsed since the last call and pays it out as steps.
+
+        Args:
+            step_time (float): The length of a step, in seconds.
+            max_steps (int): The most steps to pay out at once; any further backlog is dropped.
+
+        Returns:
+            int: The number of steps to simulate now.
+        """
+        now = pygame.time.get_ticks()
+        self.accumulator += now - self.last_ticks  # Collect the elapsed time
+        self.last_ticks = now
+
+        step_length = step_time * 1000
+        if step_length <= 0:
+            self.accumulator = 0.0
+            return max_steps  # A zero turn time steps on every frame
+
+        steps = min(int(self.accumulator // step_length), max_steps)
+        self.accumulator -= steps * step_length
+        self.accumulator = min(self.accumulator, step_length)  # Never build up a backlog of more than a step
+        return steps
+
+    def time_until_next_step(self, step_time):
+        """
+        Returns how long until the next step is due.
+
+        Args:
+            step_time (float): The length of a step, in seconds.
+
+        Returns:
+            float: The time until the next step, in milliseconds.
+        """
+        elapsed = self.accumulator + pygame.time.get_ticks() - self.last_ticks
+        return max(step_time * 1000 - elapsed, 0)
@@ -1,32 +1,19 @@
-import os
-import sys
+import math
 import time
+
 import pygame
 
+import assets
 import group_manager
-import simulation
+import run_log
+import scene_manager
+import sprite_cache
 import universal_variables
-
-pygame.init()
-
-# Function to get the correct path for bundled files
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and PyInstaller """
-    if getattr(sys, 'frozen', False):  # Check if running as an exe
-        base_path = sys._MEIPASS  # Temporary directory for PyInstaller
-    else:
-        base_path = os.path.abspath(".")  # Normal script execution
-
-    return os.path.join(base_path, relative_path)
-
-# Load the image with transparency using the resource path
-try:
-    happy_image_path = resource_path('happy.png')  # Get correct path for bundled image
-    happy_image = pygame.image.load(happy_image_path).convert_alpha()  # Ensure alpha channel is used
-    happy_image = pygame.transform.scale(happy_image, (100, 100))  # Resize image if needed
-    happy_image.set_alpha(150)  # Set transparency (0 = fully transparent, 255 = fully opaque)
-except pygame.error as e:
-    print(f"Unable to load image: {e}")
+import utilities
+import viewport
+from frame_scheduler import SimulationClock
+from profiler import PROFILER
+from simulation_context import DEFAULT_CONTEXT
 
 
 class Game:
@@ -34,10 +21,24 @@ class Game:
     A class representing the game logic, including grid setup, movement, and game state management.
     """
 
-    def __init__(self, grid_width, grid_height, num_people):
+    def __init__(self, grid_width, grid_height, num_people, context=None):
         """
         Initialize the game with a given grid size and number of people.
 
+        :param grid_width: Width of the grid in cells.
+        :param grid_height: Height of the grid in cells.
+        :param num_people: Number of people in the simulation.
+        :param context: Optional SimulationContext holding the settings and statistics of this game
+                        (defaults to the universal_variables globals).
+        """
+        self.context = context or DEFAULT_CONTEXT  # Settings and statistics, kept apart from other games
+        self.exit_scene = 'menu'  # Scene the scene manager switches to once a run is over
+        self.reset(grid_width, grid_height, num_people)
+
+    def reset(self, grid_width, grid_height, num_people):
+        """
+        Prepare the game for a new run, so one Game can be reused for every run.
+
         :param grid_width: Width of the grid in cells.
         :param grid_height: Height of the grid in cells.
         :param num_people: Number of people in the simulation.
@@ -46,6 +47,23 @@ class Game:
         self.grid_height = grid_height  # Set grid height
         self.num_people = num_people  # Set number of people
         self.people = []  # Initialize list of people
+        self.viewport = None  # Camera onto the visible part of the grid
+        self.view_state = None  # Zoom and scroll position of the last frame
+        self.background = None  # Cached grid lines
+        self.background_key = None  # Cell and view size the cached background was rendered for
+        self.frame_screen = None  # Surface the last frame was drawn on
+        self.drawn_cells = None  # Colors shown on each occupied cell in the last frame (None repaints everything)
+        self.hud_status = None  # Text shown in the text area in the last frame
+
+        # State of the run in progress, set up by enter
+        self.screen = None  # Game window
+        self.game_over = False  # Whether everybody has met
+        self.game_move_count = 0  # Track number of moves in the game
+        self.simulation_clock = None  # Paces the steps at one per turn time
+        self.occupancy = None  # Cells occupied by each group
+        self.start_positions = []  # Recorded in the run log
+        self.redraw = True  # Whether the next frame has to be drawn
+        self.pause_until = 0  # Time at which the pause after a merge ends (0 when not paused)
 
     def all_met(self):
         """
@@ -62,115 +80,336 @@ class Game:
         # Check if all people are at the same position
         return all(person.x == first_x and person.y == first_y for person in self.people)
 
-    def draw_grid(self, screen):
+    def create_viewport(self):
         """
-        Draw the grid, people, and game statistics on the screen.
+        Create the camera for a new run, sized to fit the grid on screen.
 
-        :param screen: Pygame display surface.
+        :return: A Viewport showing as much of the grid as fits at the configured cell size.
         """
-        screen.fill(universal_variables.BACKGROUND_COLOR)  # Set background color
+        return viewport.Viewport.for_grid(self.grid_width, self.grid_height, self.context.cell_size)
+
+    def build_background(self):
+        """
+        Render the background and grid lines of the visible area into a surface.
+
+        The grid lines repeat every cell, so the surface is one cell larger than
+        the visible area and any scroll position can be cut out of it.
+
+        :return: A surface holding the grid line pattern, starting at a cell corner.
+        """
+        cell_size = self.viewport.cell_size
+        columns = self.viewport.width // cell_size + 2  # Enough cells to cover any scroll offset
+        rows = self.viewport.height // cell_size + 2
+        background = pygame.Surface((columns * cell_size, rows * cell_size))
+        background.fill(universal_variables.BACKGROUND_COLOR)  # Set background color
 
         # Draw grid cells
-        for x in range(self.grid_width):
-            for y in range(self.grid_height):
-                pygame.draw.rect(screen, universal_variables.WHITE, (
-                    x * universal_variables.CELL_SIZE, y * universal_variables.CELL_SIZE,
-                    universal_variables.CELL_SIZE, universal_variables.CELL_SIZE), 1)
+        for x in range(columns):
+            for y in range(rows):
+                pygame.draw.rect(background, universal_variables.WHITE, (x * cell_size, y * cell_size, cell_size,
+                                                                         cell_size), 1)
+        return background
+
+    def invalidate(self):
+        """
+        Make the next call to draw_grid repaint the whole window, e.g. after something was drawn over the grid.
+        """
+        self.drawn_cells = None
 
-        # Draw people on the grid
+    def draw_grid(self, screen):
+        """
+        Draw the visible part of the grid, the people on it, and game statistics on the screen.
+
+        Only the cells whose contents changed since the last call, and the text
+        area if its text changed, are repainted and pushed to the display.
+        When zoomed far out, a heat map of where people are is drawn instead
+        of the grid lines and individual people.
+
+        :param screen: Pygame display surface.
+        """
+        start = time.perf_counter()
+        if self.viewport is None:
+            self.viewport = self.create_viewport()
+        view = self.viewport
+        cell_size = view.cell_size
+        first_x, first_y, end_x, end_y = view.visible_cells()
+
+        # Scrolling or zooming moves every cell, so the whole view has to be repainted
+        if self.view_state != view.state():
+            self.view_state = view.state()
+            self.drawn_cells = None
+
+        # The grid lines only change with the zoom or window size, so they are rendered once and reused
+        if view.detailed() and self.background_key != (cell_size, view.width, view.height):
+            self.background = self.build_background()
+            self.background_key = (cell_size, view.width, view.height)
+        if self.frame_screen is not screen:
+            self.frame_screen = screen  # A new window starts out blank
+            self.drawn_cells = None
+
+        repaint_all = self.drawn_cells is None
+
+        # All members of a group share one cell and color, so each group is drawn once, represented by its
+        # last member so overlapping groups stack in the same order as when every person was drawn
+        groups = {}
         for person in self.people:
-            person.draw(screen)
+            groups.pop(id(person.group), None)
+            groups[id(person.group)] = person
+
+        screen.set_clip(view.view_rect())  # Keep cells at the edge of the view out of the text area
+        if view.detailed():
+            # Colors shown on each visible occupied cell, in drawing order
+            cells = {}
+            for person in groups.values():
+                if first_x <= person.x < end_x and first_y <= person.y < end_y:
+                    cells.setdefault((person.x, person.y), []).append(person.display_color())
+            cells = {cell: tuple(colors) for cell, colors in cells.items()}
+        else:
+            # Number of people in each block of cells that is drawn as one heat map square
+            block = math.ceil(universal_variables.LOD_CELL_SIZE / cell_size)
+            cells = {}
+            for person in self.people:
+                if first_x <= person.x < end_x and first_y <= person.y < end_y:
+                    key = (person.x // block * block, person.y // block * block)
+                    cells[key] = cells.get(key, 0) + 1
+
+        # Cut the grid lines for the current scroll position out of the background
+        scroll = (view.left % cell_size, view.top % cell_size)
+
+        if repaint_all or not view.detailed():
+            if self.drawn_cells == cells:
+                dirty_cells, dirty_rects = (), []  # The heat map did not change
+            else:
+                # Repaint everything; any part of the view the grid does not reach stays black
+                screen.fill(universal_variables.BLACK, view.view_rect())
+                if view.detailed():
+                    screen.blit(self.background, view.grid_rect(), view.grid_rect().move(scroll))
+                else:
+                    screen.fill(universal_variables.BACKGROUND_COLOR, view.grid_rect())
+                dirty_cells = cells.keys()
+                dirty_rects = [view.view_rect()]
+        else:
+            # Repaint only the cells that someone entered, left or changed color on
+            dirty_cells = {cell for cell in cells.keys() | self.drawn_cells.keys()
+                           if cells.get(cell) != self.drawn_cells.get(cell)}
+            dirty_rects = [view.cell_rect(x, y) for x, y in dirty_cells]
+            for rect in dirty_rects:
+                screen.blit(self.background, rect, rect.move(scroll))  # Restore the grid lines under the cell
+
+        if view.detailed():
+            # Draw people on the grid, one cached circle per group
+            for x, y in dirty_cells:
+                for color in cells.get((x, y), ()):
+                    screen.blit(sprite_cache.circle_sprite(color, cell_size), view.cell_rect(x, y))
+        else:
+            # Shade each block by how many people are in it, relative to the busiest block
+            most = max(cells.values(), default=1)
+            for (x, y), count in cells.items():
+                screen.fill(utilities.heat_color(count / most), view.cell_rect(x, y, block).clip(view.grid_rect()))
+        self.drawn_cells = cells
+        screen.set_clip(None)
+
+        # Display turn time text, or the fast forward rate when the game is not stepping in real time
+        if self.context.simulation_speed == 'Normal':
+            status = f'Turn Time: ' + str(self.context.turn_time)
+        elif self.context.simulation_speed == 'Fast Forward':
+            status = f'Fast Forward: {self.context.steps_per_frame} steps per frame'
+        else:
+            status = 'Instant'
+
+        # Render the text again only when it changed
+        if status != self.hud_status or repaint_all:
+            self.hud_status = status
+            text_surface = universal_variables.font.render(status, True, universal_variables.WHITE)
+            text_rect = text_surface.get_rect(topleft=(10, view.height + (self.context.cell_size // 4)))
+            hud_rect = pygame.Rect(0, view.height, view.width, 50)
+
+            # Draw black background for text area, then blit text to screen
+            screen.fill(universal_variables.BLACK, hud_rect)
+            screen.blit(text_surface, text_rect)
+            dirty_rects.append(hud_rect.union(text_rect))
+
+        drawn = time.perf_counter()
+        pygame.display.update(dirty_rects)
+        PROFILER.record('draw_grid', start, drawn, cells=len(cells))
+        PROFILER.record('display', drawn, time.perf_counter(), rects=len(dirty_rects))
+
+    def enter(self):
+        """
+        Open the game window and start the run. Called by the scene manager when the game is switched to.
+        """
+        pygame.init()  # Does nothing if the menu already started pygame
 
-        # Display turn time text
-        text_surface = universal_variables.font.render(f'Turn Time: ' + str(universal_variables.TURN_TIME), True,
-                                                       universal_variables.WHITE)
-        text_rect = text_surface.get_rect(
-            topleft=(10, self.grid_height * universal_variables.CELL_SIZE + (universal_variables.CELL_SIZE // 4)))
+        # Initialize the game window, showing as much of the grid as fits on screen
+        self.viewport = self.create_viewport()
+        self.screen = pygame.display.set_mode((self.viewport.width, self.viewport.height + 50))
+        pygame.display.set_caption("Wandering in the Woods")
+        self.invalidate()  # The new window starts out blank
+
+        self.game_over = False
+        self.game_move_count = 0
+        self.context.start_run()
+        self.simulation_clock = SimulationClock()
+        self.occupancy = group_manager.build_occupancy_index(self.people)
+        self.start_positions = [(person.x, person.y) for person in self.people]
+        self.redraw = True  # Draw the starting positions on the first frame
+        self.pause_until = 0
+
+    def timeout(self):
+        """
+        Tell the scene manager how long it may sleep before the next frame.
 
-        # Draw black background for text area
-        pygame.draw.rect(screen, universal_variables.BLACK, (
-            0, self.grid_height * universal_variables.CELL_SIZE, self.grid_width * universal_variables.CELL_SIZE, 50))
+        :return: Milliseconds to wait for input, or 0 to run at the full frame rate.
+        """
+        if self.pause_until:
+            return max(self.pause_until - pygame.time.get_ticks(), 1)  # Sleep through the pause after a merge
+        if self.context.simulation_speed == 'Normal':
+            # Nothing moves between turns, so sleep until the next step or some input
+            return self.simulation_clock.time_until_next_step(self.context.turn_time)
+        return 0
+
+    def frame(self, events):
+        """
+        Handle input, simulate the steps that are due and draw one frame.
+
+        :param events: The pygame events received since the last frame.
+        :return: The scene to switch to once the run is over, otherwise None.
+        """
+        if self.pause_until:
+            if pygame.time.get_ticks() < self.pause_until:
+                return None  # Input is dropped while the happy image is shown
+            self.pause_until = 0
+            self.invalidate()  # The happy image covered part of the grid
+            self.simulation_clock.reset()  # The next turn starts after the pause
+            self.redraw = True
+            if self.game_over:
+                return self.finish_run()
+
+        # Handle user input events
+        start = time.perf_counter()
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RIGHT:  # Increase turn time
+                    self.context.turn_time += 0.05
+                    self.context.turn_time = round(self.context.turn_time, 2)
+                elif event.key == pygame.K_LEFT:  # Decrease turn time
+                    self.context.turn_time -= 0.05
+                    self.context.turn_time = round(self.context.turn_time, 2)
+                elif event.key == pygame.K_f:  # Toggle fast forward
+                    normal = self.context.simulation_speed == 'Normal'
+                    self.context.simulation_speed = 'Fast Forward' if normal else 'Normal'
+                    self.simulation_clock.reset()  # Start a fresh turn when returning to normal speed
+                elif event.key == pygame.K_UP:  # Simulate more steps between frames while fast forwarding
+                    self.context.steps_per_frame = min(self.context.steps_per_frame * 2, 10000)
+                elif event.key == pygame.K_DOWN:  # Simulate fewer steps between frames while fast forwarding
+                    self.context.steps_per_frame = max(self.context.steps_per_frame // 2, 1)
+                elif event.key == pygame.K_RETURN:  # Skip to the end of the run
+                    self.context.simulation_speed = 'Instant'
+                elif event.key in (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d):  # Scroll a quarter view
+                    dx = (event.key == pygame.K_d) - (event.key == pygame.K_a)
+                    dy = (event.key == pygame.K_s) - (event.key == pygame.K_w)
+                    self.viewport.pan(dx * self.viewport.width // 4, dy * self.viewport.height // 4)
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):  # Zoom in
+                    self.viewport.zoom(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):  # Zoom out
+                    self.viewport.zoom(-1)
+                elif event.key == pygame.K_HOME:  # Show the whole forest
+                    self.viewport.fit()
+                self.redraw = True
+            elif event.type == pygame.MOUSEWHEEL:  # Zoom around the mouse pointer
+                self.viewport.zoom(event.y, pygame.mouse.get_pos())
+                self.redraw = True
+            elif event.type == pygame.MOUSEMOTION and event.buttons[0]:  # Drag to scroll
+                self.viewport.pan(-event.rel[0], -event.rel[1])
+                self.redraw = True
+        PROFILER.record('events', start, time.perf_counter(), events=len(events))
+
+        current_time = pygame.time.get_ticks()  # Get current time
+
+        # Decide how many steps to simulate before the next redraw
+        if self.context.simulation_speed == 'Fast Forward':
+            steps_due = self.context.steps_per_frame  # Render every Nth step
+        elif self.context.simulation_speed == 'Instant':
+            steps_due = -1  # As many as fit in the frame budget
+        else:
+            steps_due = self.simulation_clock.steps_due(self.context.turn_time)  # One step per turn time
+
+        found_group = False
+        steps_taken = 0
+        move_time = update_time = 0  # Time spent in each half of the steps, in seconds
+        start = time.perf_counter()
+        while steps_due != 0 and not self.game_over:
+            # Move groups and check for meeting
+            step_start = time.perf_counter()
+            group_manager.move_groups(self.people, self.grid_width, self.grid_height, self.occupancy, self.context)
+            moved = time.perf_counter()
+            found_group = group_manager.update_groups(self.people, self.occupancy, self.context) or found_group
+            move_time += moved - step_start
+            update_time += time.perf_counter() - moved
+
+            self.game_move_count += 1  # Increment move count
+            self.game_over = self.all_met()  # End the game once all people met
+            steps_due -= 1
+            steps_taken += 1
+
+            budget_used = pygame.time.get_ticks() - current_time >= universal_variables.INSTANT_FRAME_BUDGET
+            if steps_due < 0 and budget_used:
+                break  # Let Instant check for input; it draws nothing until the run is over
+
+        if steps_taken:
+            # Steps are too short to export one by one, so the frame's steps are one span
+            PROFILER.record('simulate', start, time.perf_counter(), steps=steps_taken)
+            PROFILER.add('move_groups', move_time)
+            PROFILER.add('update_groups', update_time)
+            PROFILER.count_steps(steps_taken)
+
+        # Redraw once per frame, and only when something changed
+        if self.redraw or self.game_over or (steps_taken and self.context.simulation_speed != 'Instant'):
+            self.draw_grid(self.screen)
+            self.redraw = False
+
+        if found_group and self.context.simulation_speed == 'Normal':
+            happy_image = assets.get_image('happy.png', (100, 100), 150)  # Loaded once, on the first merge
+            if happy_image is not None:
+                self.screen.blit(happy_image, (self.viewport.width // 2 - 50,
+                                               self.viewport.height // 2 - 50))  # Show happy image
+            start = time.perf_counter()
+            pygame.display.update()
+            PROFILER.record('display', start, time.perf_counter())
+            self.pause_until = pygame.time.get_ticks() + universal_variables.MERGE_PAUSE * 1000  # Pause for effect
+            return None  # A finished run ends once the pause is over
+
+        if self.game_over:  # If all people met
+            return self.finish_run()
+        return None
+
+    def finish_run(self):
+        """
+        Show everybody merged and record the statistics of the finished run.
+
+        :return: The scene to switch to next.
+        """
+        for person in self.people:
+            person.color = universal_variables.GROUP_MERGED_COLOR  # Change color to indicate merge
+        self.draw_grid(self.screen)
+
+        # Collect and update game statistics
+        context = self.context
+        context.record_run(self.game_move_count)
 
-        # Blit text to screen
-        screen.blit(text_surface, text_rect)
+        # Keep the run on disk for later sessions
+        if context.run_log_path:
+            run_log.append_run(context.run_log_path, self.grid_width, self.grid_height, self.start_positions,
+                               context.wandering_choice, self.game_move_count,
+                               context.current_run_longest_without_meeting, context.grade_level)
 
-        pygame.display.update()
+        # Show statistics menu
+        context.run_complete = True
+        return self.exit_scene
 
     def game_loop(self):
         """
-        Main game loop that handles events, updates game state, and manages rendering.
+        Play a single run in its own scene manager, without the menus.
         """
-        # Initialize the game window
-        screen = pygame.display.set_mode(
-            (self.grid_width * universal_variables.CELL_SIZE, self.grid_height * universal_variables.CELL_SIZE + 50))
-        pygame.display.set_caption("Wandering in the Woods")
-
-        running = True
-        while running:
-            game_over = False
-            game_move_count = 0  # Track number of moves in the game
-            last_time = pygame.time.get_ticks()  # Track elapsed time
-
-            while not game_over:
-                # Handle user input events
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:  # Quit game
-                        pygame.quit()
-                        return
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_RIGHT:  # Increase turn time
-                            universal_variables.TURN_TIME += 0.05
-                            universal_variables.TURN_TIME = round(universal_variables.TURN_TIME, 2)
-                            self.draw_grid(screen)
-                        elif event.key == pygame.K_LEFT:  # Decrease turn time
-                            universal_variables.TURN_TIME -= 0.05
-                            universal_variables.TURN_TIME = round(universal_variables.TURN_TIME, 2)
-                            self.draw_grid(screen)
-
-                current_time = pygame.time.get_ticks()  # Get current time
-
-                # Draw initial state
-                self.draw_grid(screen)
-
-                if current_time - last_time >= universal_variables.TURN_TIME * 1000:  # Check time elapsed
-                    last_time = current_time  # Reset timer
-                    self.draw_grid(screen)
-
-                    # Move groups and check for meeting
-                    group_manager.move_groups(self.people, self.grid_width, self.grid_height)
-                    found_group = group_manager.update_groups(self.people)
-
-                    if found_group:
-                        self.draw_grid(screen)
-                        screen.blit(happy_image, (self.grid_width * universal_variables.CELL_SIZE // 2 - 50,
-                                                  self.grid_height * universal_variables.CELL_SIZE // 2 - 50))  # Show happy image
-                        pygame.display.update()
-                        time.sleep(3)  # Pause for effect
-
-                    game_move_count += 1  # Increment move count
-
-                    if self.all_met():  # If all people met
-                        for person in self.people:
-                            person.color = universal_variables.GROUP_MERGED_COLOR  # Change color to indicate merge
-                            self.draw_grid(screen)
-                        game_over = True  # End game
-
-                pygame.display.update()
-
-            # Collect and update game statistics
-            universal_variables.CURRENT_RUN = game_move_count
-            universal_variables.AGGREGATE_RUNS.append(game_move_count)
-
-            # Update shortest and longest run stats
-            universal_variables.SHORTEST_RUN = min(universal_variables.SHORTEST_RUN,
-                                                   game_move_count) if universal_variables.SHORTEST_RUN != -1 else game_move_count
-            universal_variables.LONGEST_RUN = max(universal_variables.LONGEST_RUN,
-                                                  game_move_count) if universal_variables.LONGEST_RUN != -1 else game_move_count
-
-            # Calculate average run time
-            universal_variables.AVERAGE_RUN = round(
-                sum(universal_variables.AGGREGATE_RUNS) / len(universal_variables.AGGREGATE_RUNS), 2)
-
-            # Show statistics menu
-            universal_variables.RUN_COMPLETE = True
-            simulation.main_menu()
+        self.exit_scene = scene_manager.QUIT  # Nothing to return to
+        scene_manager.SceneManager({'game': self}).run('game')
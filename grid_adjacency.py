@@ -0,0 +1,117 @@
+"""
+Grid adjacency module defining the GridAdjacency class.
+
+This module precomputes, once per grid size, where a group can move from
+every cell of the grid under each wandering strategy. The movement code then
+indexes into these tables instead of re-checking the grid bounds on every
+step. Cells are numbered row by row (cell = y * grid_width + x), and the
+tables are flat integer arrays so that even very large forests stay compact.
+"""
+
+from array import array
+from functools import lru_cache
+
+# Direction offsets in the order the wandering strategies list them: up, down, left, right
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+class GridAdjacency:
+    """
+    A class holding the precomputed move tables of one grid size.
+
+    Attributes:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        clamped (array): clamped[cell * 4 + direction] is the destination of a move,
+                         staying put when the move is blocked ('Random').
+        reflected (array): reflected[cell * 4 + direction] is the destination of a move,
+                           bouncing off the edge when the move is blocked ('Random Valid').
+        neighbour_start (array): neighbour_cells[neighbour_start[cell]:neighbour_start[cell + 1]]
+                                 are the in-bounds neighbours of a cell ('Biased Unexplored').
+        neighbour_cells (array): The in-bounds neighbours of every cell, in direction order.
+        valid_masks (array): For each cell, a 4-bit mask of the in-bounds directions (bit 0 = up).
+    """
+
+    def __init__(self, grid_width, grid_height):
+        """
+        Initializes a GridAdjacency instance by building every table.
+
+        Args:
+            grid_width (int): The width of the grid.
+            grid_height (int): The height of the grid.
+        """
+        self.grid_width = grid_width  # Set grid width
+        self.grid_height = grid_height  # Set grid height
+        self.clamped = array('i')
+        self.reflected = array('i')
+        self.neighbour_start = array('i', [0])  # The first cell's neighbours start at the beginning
+        self.neighbour_cells = array('i')
+        self.valid_masks = array('B')
+
+        # Fill in the tables one cell at a time, trying each direction in order
+        for cell in range(grid_width * grid_height):
+            y, x = divmod(cell, grid_width)
+            mask = 0
+            for direction, (dx, dy) in enumerate(DIRECTIONS):
+                new_x, new_y = x + dx, y + dy
+                if 0 <= new_x < grid_width and 0 <= new_y < grid_height:
+                    # The move stays on the grid under every strategy
+                    new_cell = new_y * grid_width + new_x
+                    self.clamped.append(new_cell)
+                    self.reflected.append(new_cell)
+                    self.neighbour_cells.append(new_cell)
+                    mask |= 1 << direction
+                    continue
+
+                # A blocked move leaves the group in place ('Random')...
+                self.clamped.append(cell)
+
+                # ...or bounces it off the edge ('Random Valid'), unless a single row or column leaves no room
+                back_x, back_y = x - dx, y - dy
+                if 0 <= back_x < grid_width and 0 <= back_y < grid_height:
+                    self.reflected.append(back_y * grid_width + back_x)
+                else:
+                    self.reflected.append(cell)
+
+            self.valid_masks.append(mask)
+            self.neighbour_start.append(len(self.neighbour_cells))  # Where the next cell's neighbours start
+
+    def neighbours(self, cell):
+        """
+        Returns the in-bounds neighbours of a cell.
+
+        Args:
+            cell (int): The cell number.
+
+        Returns:
+            array: The neighbouring cells, in direction order.
+        """
+        return self.neighbour_cells[self.neighbour_start[cell]:self.neighbour_start[cell + 1]]
+
+    def position(self, cell):
+        """
+        Converts a cell number back into grid coordinates.
+
+        Args:
+            cell (int): The cell number.
+
+        Returns:
+            tuple: The (x, y) position of the cell.
+        """
+        y, x = divmod(cell, self.grid_width)
+        return x, y
+
+
+@lru_cache(maxsize=16)
+def get_adjacency(grid_width, grid_height):
+    """
+    Returns the move tables of a grid size, building them on first use.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+
+    Returns:
+        GridAdjacency: The shared tables for this grid size.
+    """
+    return GridAdjacency(grid_width, grid_height)
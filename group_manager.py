@@ -1,5 +1,7 @@
 import random
-import universal_variables
+import grid_adjacency
+from occupancy_index import OccupancyIndex
+from simulation_context import DEFAULT_CONTEXT
 
 
 def check_collision(person1, person2):
@@ -16,44 +18,171 @@ def check_collision(person1, person2):
     return (person1.x == person2.x) and (person1.y == person2.y)
 
 
-def update_groups(people):
+def find_group_root(person):
     """
-    Updates the groups of players if they collide. Merges groups when two players
-    collide and updates their statistics.
+    Finds the root of a person's group in the disjoint-set forest.
+
+    Every person on the way to the root is re-pointed straight at it (path
+    compression), so later lookups take close to constant time.
+
+    Args:
+        person: The player object whose group root is wanted.
+
+    Returns:
+        The player object at the root of the group.
+    """
+    root = person
+    while root.parent is not root:
+        root = root.parent  # Walk up to the root
+
+    while person.parent is not root:
+        person.parent, person = root, person.parent  # Point everybody on the path directly at the root
+
+    return root
+
+
+def merge_groups(person1, person2):
+    """
+    Merges the groups of two people, attaching the smaller group to the larger one.
+
+    The member list of the smaller group is appended to the larger group's
+    list, and only the moved members have their group reference updated.
+
+    Args:
+        person1: A player object in the first group.
+        person2: A player object in the second group.
+
+    Returns:
+        bool: True if the groups were merged; False if they were already the same group.
+    """
+    root1 = find_group_root(person1)
+    root2 = find_group_root(person2)
+
+    if root1 is root2:
+        return False  # Already part of the same group
+
+    # Union by size keeps the forest shallow and moves as few members as possible
+    if root1.group_size < root2.group_size:
+        root1, root2 = root2, root1
+
+    root2.parent = root1
+    root1.group_size += root2.group_size
+    root1.group.extend(root2.group)  # Grow the larger group's member list in place
+
+    for member in root2.group:
+        member.group = root1.group  # Update references of the members that moved over
+
+    return True
+
+
+def group_leaders(people):
+    """
+    Picks the leader of each group: its first member in the order of people.
+
+    Args:
+        people: A list of all player objects.
+
+    Returns:
+        list: The leader of every group, in the order of people.
+    """
+    roots = set()
+    leaders = []
+
+    for person in people:
+        root = find_group_root(person)
+        if root not in roots:
+            roots.add(root)
+            leaders.append(person)  # First member of the group seen so far leads it
+
+    return leaders
+
+
+def build_occupancy_index(people):
+    """
+    Builds an occupancy index holding the root of every group on its current cell.
+
+    Args:
+        people: A list of all player objects.
+
+    Returns:
+        OccupancyIndex: The index to pass to move_groups and update_groups.
+    """
+    occupancy = OccupancyIndex()
+
+    for leader in group_leaders(people):
+        occupancy.add(find_group_root(leader), (leader.x, leader.y))
+
+    occupancy.changed_cells.update(occupancy.cells)  # Groups placed on the same cell still have to meet
+    return occupancy
+
+
+def record_meeting(player1, player2, context=None):
+    """
+    Updates the meeting statistics after the groups of two players merge.
+
+    Args:
+        player1: A player object from the first group.
+        player2: A player object from the second group.
+        context (SimulationContext): Optional simulation whose statistics are updated (defaults to the globals).
+    """
+    # Update the longest run without meeting based on move counts
+    (context or DEFAULT_CONTEXT).record_meeting(max(player1.move_count, player2.move_count))
+
+    player1.move_count = 0  # Reset move count for both players
+    player2.move_count = 0
+
+
+def update_groups(people, occupancy=None, context=None):
+    """
+    Updates the groups of players if they collide. Merges every group that shares
+    a cell with another group and updates their statistics.
+
+    Without an occupancy index, each group leader is looked up in a map of
+    occupied cells built on the spot, so all the merges of a step are resolved
+    in a single pass over the groups. With an index kept up to date by
+    move_groups, only the cells that groups moved onto are checked.
 
     Args:
         people: A list of all player objects to check for collisions and group updates.
+        occupancy (OccupancyIndex): Optional index from build_occupancy_index.
+        context (SimulationContext): Optional simulation whose statistics are updated (defaults to the globals).
 
     Returns:
         bool: True if any groups were merged; False otherwise.
     """
-    for player1 in people:
-        for player2 in people:
-            # If the two players chosen are not the same person, and they are colliding
-            if player1 != player2 and check_collision(player1, player2):
-                # If the two players are not already part of the same group
-                if player1.group != player2.group:
-                    merged_group = player1.group + player2.group  # Merge player groups
+    found_group = False
+
+    if occupancy is not None:
+        for cell in occupancy.pop_changed_cells():
+            groups = occupancy.cells.get(cell, [])
+            if len(groups) < 2:
+                continue  # Nobody to meet on this cell
+
+            # Merge every group on the cell into the first one
+            player1 = groups[0]
+            for player2 in groups[1:]:
+                merge_groups(player1, player2)
+                record_meeting(player1, player2, context)
+
+            occupancy.cells[cell] = [find_group_root(player1)]  # One merged group is left on the cell
+            found_group = True
+
+        return found_group  # True if at least one merge occurred
 
-                    # Update the longest run without meeting based on move counts
-                    if player1.move_count < player2.move_count:
-                        if player2.move_count > universal_variables.LONGEST_RUN_WITHOUT_MEETING:
-                            universal_variables.LONGEST_RUN_WITHOUT_MEETING = player2.move_count
-                    else:
-                        if player1.move_count > universal_variables.LONGEST_RUN_WITHOUT_MEETING:
-                            universal_variables.LONGEST_RUN_WITHOUT_MEETING = player1.move_count
+    occupied_cells = {}  # (x, y) -> leader of the first group found on that cell
 
-                    player1.move_count = 0  # Reset move count for both players
-                    player2.move_count = 0
+    for player2 in group_leaders(people):
+        player1 = occupied_cells.setdefault((player2.x, player2.y), player2)
 
-                    # Make all players part of the new merged group
-                    for players in merged_group:
-                        players.group = merged_group  # Update references to the new merged group
+        # If another group is already standing on this cell, the two groups meet
+        if player1 is not player2 and merge_groups(player1, player2):
+            record_meeting(player1, player2, context)
+            found_group = True
 
-                    return True  # Return True to indicate that a merge occurred
+    return found_group  # True if at least one merge occurred
 
 
-def move_groups(people, grid_width, grid_height):
+def move_groups(people, grid_width, grid_height, occupancy=None, context=None):
     """
     Moves each group of players based on the chosen wandering strategy.
 
@@ -61,18 +190,23 @@ def move_groups(people, grid_width, grid_height):
         people: A list of all player objects whose groups will be moved.
         grid_width: The width of the grid.
         grid_height: The height of the grid.
+        occupancy: Optional OccupancyIndex to keep up to date as groups move.
+        context: Optional SimulationContext whose strategy and random number generator are used
+                 (defaults to the globals).
     """
-    if universal_variables.WANDERING_CHOICE == 'Random':
-        move_groups_random(people, grid_width, grid_height)
-    elif universal_variables.WANDERING_CHOICE == 'Random Valid':
-        move_groups_random_valid(people, grid_width, grid_height)
-    elif universal_variables.WANDERING_CHOICE == 'Biased Unexplored':
-        move_groups_biased(people, grid_width, grid_height)
+    context = context or DEFAULT_CONTEXT
+    wandering_choice = context.wandering_choice
+    if wandering_choice == 'Random':
+        move_groups_random(people, grid_width, grid_height, occupancy, context.rng)
+    elif wandering_choice == 'Random Valid':
+        move_groups_random_valid(people, grid_width, grid_height, occupancy, context.rng)
+    elif wandering_choice == 'Biased Unexplored':
+        move_groups_biased(people, grid_width, grid_height, context.memory_limit, occupancy, context.rng)
     else:
-        print('Unrecognized universal_variables.WANDERING_CHOICE')
+        print('Unrecognized wandering choice: ' + str(wandering_choice))
 
 
-def move_groups_biased(people, grid_width, grid_height, memory_limit=5):
+def move_groups_biased(people, grid_width, grid_height, memory_limit=5, occupancy=None, rng=random):
     """
     Moves each group on the grid, favoring unexplored directions.
 
@@ -81,54 +215,43 @@ def move_groups_biased(people, grid_width, grid_height, memory_limit=5):
         grid_width: The width of the grid.
         grid_height: The height of the grid.
         memory_limit: The number of past positions to remember for the leader.
+        occupancy: Optional OccupancyIndex to keep up to date as groups move.
+        rng: The random number generator choosing the moves.
     """
-    group_leaders = {}
-
-    # Assign a leader to each group
-    for person in people:
-        if tuple(person.group) not in group_leaders:
-            group_leaders[tuple(person.group)] = person  # Pick a leader for each group
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)  # Shared move tables for this grid
 
     # Move each group based on its leader's direction
-    for group, leader in group_leaders.items():
-        possible_moves = [
-            ('up', leader.x, leader.y - 1),
-            ('down', leader.x, leader.y + 1),
-            ('left', leader.x - 1, leader.y),
-            ('right', leader.x + 1, leader.y)
-        ]
-
-        # Keep only valid moves within grid bounds
-        valid_moves = []
-        for direction, x, y in possible_moves:
-            if 0 <= x < grid_width and 0 <= y < grid_height:
-                valid_moves.append((direction, x, y))
+    for leader in group_leaders(people):
+        old_cell = (leader.x, leader.y)  # Remember where the group came from
+
+        # Valid moves within grid bounds come straight from the neighbour table
+        valid_moves = [adjacency.position(cell) for cell in adjacency.neighbours(leader.y * grid_width + leader.x)]
 
         # Filter moves to avoid recently visited locations
-        unexplored_moves = []
-        print(leader.history)
-        for direction, x, y in valid_moves:
-            if (x, y) not in leader.history:
-                unexplored_moves.append((direction, x, y))
+        unexplored_moves = [move for move in valid_moves if move not in leader.history]
 
         # Choose a direction based on unexplored locations, or move randomly if all are explored
         if unexplored_moves:
-            direction, new_x, new_y = random.choice(unexplored_moves)
+            new_x, new_y = rng.choice(unexplored_moves)
+        elif valid_moves:
+            new_x, new_y = rng.choice(valid_moves)  # If all are explored, move randomly
         else:
-            direction, new_x, new_y = random.choice(valid_moves)  # If all are explored, move randomly
+            new_x, new_y = old_cell  # A 1x1 grid has nowhere to go, so the group stays put
 
         # Move all members of the group
         for member in leader.group:
             member.x, member.y = new_x, new_y
             member.move_count += 1
-            member.history.append((new_x, new_y))
 
-            # Limit the size of the history list
-            if len(member.history) > memory_limit:
-                member.history.pop(0)
+        # Only the leader's history steers the group, and a merged group is always led by one of the
+        # previous leaders, so the other members' histories are never read again
+        leader.history.append((new_x, new_y), memory_limit)
+
+        if occupancy is not None:
+            occupancy.move(leader.parent, old_cell, (new_x, new_y))  # group_leaders left parent pointing at the root
 
 
-def move_groups_random_valid(people, grid_width, grid_height):
+def move_groups_random_valid(people, grid_width, grid_height, occupancy=None, rng=random):
     """
     Moves each group on the grid based on valid random directions for the group leader.
 
@@ -136,48 +259,29 @@ def move_groups_random_valid(people, grid_width, grid_height):
         people: A list of all player objects whose groups will be moved.
         grid_width: The width of the grid.
         grid_height: The height of the grid.
+        occupancy: Optional OccupancyIndex to keep up to date as groups move.
+        rng: The random number generator choosing the moves.
     """
-    group_leaders = {}
-
-    # Assign a leader to each group
-    for person in people:
-        if tuple(person.group) not in group_leaders:
-            group_leaders[tuple(person.group)] = person  # Pick a leader for each group
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)  # Shared move tables for this grid
+    moves = adjacency.reflected
 
     # Move each group based on its leader's direction
-    for group, leader in group_leaders.items():
-        direction = random.choice(['up', 'down', 'left', 'right'])  # Random direction
-        new_x, new_y = leader.x, leader.y  # Start with the leader's current position
-
-        # Determine the new position based on the direction
-        if direction == 'up':
-            if leader.y > 0:
-                new_y -= 1
-            else:
-                new_y += 1
-        elif direction == 'down':
-            if leader.y < grid_height - 1:
-                new_y += 1
-            else:
-                new_y -= 1
-        elif direction == 'left':
-            if leader.x > 0:
-                new_x -= 1
-            else:
-                new_x += 1
-        elif direction == 'right':
-            if leader.x < grid_width - 1:
-                new_x += 1
-            else:
-                new_x -= 1
+    for leader in group_leaders(people):
+        old_cell = (leader.x, leader.y)  # Remember where the group came from
+
+        # Pick a random direction; blocked moves bounce off the edge of the grid
+        new_y, new_x = divmod(moves[(leader.y * grid_width + leader.x) * 4 + rng.randrange(4)], grid_width)
 
         # Move all members of the group to the new position
         for member in leader.group:
             member.x, member.y = new_x, new_y  # Update position of each member in the group
             member.move_count += 1  # Increment move count for each group member
 
+        if occupancy is not None:
+            occupancy.move(leader.parent, old_cell, (new_x, new_y))  # group_leaders left parent pointing at the root
+
 
-def move_groups_random(people, grid_width, grid_height):
+def move_groups_random(people, grid_width, grid_height, occupancy=None, rng=random):
     """
     Moves each group on the grid based on a random direction chosen for the group leader.
 
@@ -185,30 +289,23 @@ def move_groups_random(people, grid_width, grid_height):
         people: A list of all player objects whose groups will be moved.
         grid_width: The width of the grid.
         grid_height: The height of the grid.
+        occupancy: Optional OccupancyIndex to keep up to date as groups move.
+        rng: The random number generator choosing the moves.
     """
-    group_leaders = {}
-
-    # Assign a leader to each group
-    for person in people:
-        if tuple(person.group) not in group_leaders:
-            group_leaders[tuple(person.group)] = person  # Pick a leader for each group
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)  # Shared move tables for this grid
+    moves = adjacency.clamped
 
     # Move each group based on its leader's direction
-    for group, leader in group_leaders.items():
-        direction = random.choice(['up', 'down', 'left', 'right'])  # Random direction
-        new_x, new_y = leader.x, leader.y  # Start with the leader's current position
-
-        # Determine the new position based on the direction
-        if direction == 'up' and leader.y > 0:
-            new_y -= 1
-        elif direction == 'down' and leader.y < grid_height - 1:
-            new_y += 1
-        elif direction == 'left' and leader.x > 0:
-            new_x -= 1
-        elif direction == 'right' and leader.x < grid_width - 1:
-            new_x += 1
+    for leader in group_leaders(people):
+        old_cell = (leader.x, leader.y)  # Remember where the group came from
+
+        # Pick a random direction; blocked moves leave the group where it is
+        new_y, new_x = divmod(moves[(leader.y * grid_width + leader.x) * 4 + rng.randrange(4)], grid_width)
 
         # Move all members of the group to the new position
         for member in leader.group:
             member.x, member.y = new_x, new_y  # Update position of each member in the group
             member.move_count += 1  # Increment move count for each group member
+
+        if occupancy is not None:
+            occupancy.move(leader.parent, old_cell, (new_x, new_y))  # group_leaders left parent pointing at the root
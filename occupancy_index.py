@@ -0,0 +1,93 @@
+"""
+Occupancy index module defining the OccupancyIndex class.
+
+This module contains a spatial hash from grid cells to the groups standing on
+them. The movement functions in group_manager keep it up to date as groups
+move, and remember which cells a group moved onto while another group was
+already there, so collisions can be found by looking only at those cells
+instead of comparing every pair of players.
+"""
+
+
+class OccupancyIndex:
+    """
+    A class mapping grid cells to the groups standing on them.
+
+    Groups are identified by any object that stays the same while the group
+    exists; group_manager uses the root of each group's disjoint-set tree.
+
+    Attributes:
+        cells (dict): Maps each occupied (x, y) cell to the list of groups on it.
+        changed_cells (set): Cells that may hold more than one group since the last collision check.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty OccupancyIndex instance.
+        """
+        self.cells = {}  # (x, y) -> groups on that cell
+        self.changed_cells = set()  # Cells that may hold more than one group
+
+    def add(self, group, cell):
+        """
+        Records a group standing on a cell.
+
+        Args:
+            group: The group identifier.
+            cell (tuple): The (x, y) cell the group is on.
+        """
+        self.cells.setdefault(cell, []).append(group)
+
+    def remove(self, group, cell):
+        """
+        Forgets a group standing on a cell.
+
+        Args:
+            group: The group identifier.
+            cell (tuple): The (x, y) cell the group was recorded on.
+        """
+        groups = self.cells[cell]
+        groups.remove(group)
+
+        if not groups:
+            del self.cells[cell]  # Keep only occupied cells in the index
+
+    def move(self, group, old_cell, new_cell):
+        """
+        Moves a group from one cell to another.
+
+        The new cell is marked as changed only when another group is already
+        standing on it, since that is the only way a move can cause a meeting.
+
+        Args:
+            group: The group identifier.
+            old_cell (tuple): The (x, y) cell the group was on before moving.
+            new_cell (tuple): The (x, y) cell the group moved to.
+        """
+        if new_cell == old_cell:
+            return  # Staying put cannot cause a new meeting
+
+        cells = self.cells
+        groups = cells[old_cell]
+        if len(groups) == 1:
+            del cells[old_cell]  # The group was alone on its old cell
+        else:
+            groups.remove(group)
+
+        groups = cells.get(new_cell)
+        if groups is None:
+            cells[new_cell] = [group]  # Moved onto an empty cell
+        else:
+            groups.append(group)
+            self.changed_cells.add(new_cell)  # Somebody is already here
+
+    def pop_changed_cells(self):
+        """
+        Returns the cells that may hold more than one group and starts a new set.
+
+        Returns:
+            set: The (x, y) cells to check for collisions.
+        """
+        changed_cells = self.changed_cells
+        self.changed_cells = set()
+        return changed_cells
@@ -0,0 +1,120 @@
+"""
+Parallel runner module for spreading batch trials across CPU cores.
+
+This module shards the trials of a batch into fixed-size chunks and runs them
+in a ProcessPoolExecutor. Every chunk gets its own random number generator,
+seeded from the batch seed and the chunk index, so a seeded batch produces the
+same trials no matter how many workers run it. The chunk results are merged
+back in chunk order once all of them have finished.
+"""
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import batch_runner
+import grid_adjacency
+
+# Number of trials handed to a worker at a time
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def chunk_rng(seed, chunk_index):
+    """
+    Creates the independent random number generator of one chunk.
+
+    String seeds are hashed with SHA-512 by random.Random, so neighbouring
+    chunk indices still give unrelated streams.
+
+    Args:
+        seed (int): The seed of the whole batch.
+        chunk_index (int): The position of the chunk in the batch.
+
+    Returns:
+        random.Random: The generator driving every trial of the chunk.
+    """
+    return random.Random(f'{seed}-{chunk_index}')
+
+
+def run_chunk(grid_width, grid_height, positions, wandering_choice, trials, seed, chunk_index, memory_limit=5,
+              max_steps=None, keep_trials=True):
+    """
+    Runs one chunk of a batch. Executed inside the worker processes.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        trials (int): The number of trials in this chunk.
+        seed (int): The seed of the whole batch.
+        chunk_index (int): The position of the chunk in the batch.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+        keep_trials (bool): Whether to send back every trial's result, or only the statistics.
+
+    Returns:
+        BatchResult: The trials of this chunk.
+    """
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)
+    rng = chunk_rng(seed, chunk_index)
+    result = batch_runner.BatchResult(keep_trials=keep_trials)
+
+    for _ in range(trials):
+        result.add(*batch_runner.run_trial(grid_width, grid_height, positions, wandering_choice, rng, memory_limit,
+                                           max_steps, adjacency))
+
+    return result
+
+
+def run_batch_parallel(grid_width, grid_height, positions, wandering_choice, trials, seed=None, workers=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, memory_limit=5, max_steps=None, keep_trials=True):
+    """
+    Runs a batch of independent trials on several worker processes.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        trials (int): The number of trials to run.
+        seed (int): Optional seed, making the batch reproducible for any worker count.
+        workers (int): The number of worker processes (defaults to every core; 1 runs in-process).
+        chunk_size (int): The number of trials handed to a worker at a time.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+        keep_trials (bool): Whether to keep every trial's result, or only the statistics (constant memory).
+
+    Returns:
+        BatchResult: The per-trial results of every chunk, merged in chunk order.
+    """
+    for x, y in positions:
+        if not (0 <= x < grid_width and 0 <= y < grid_height):
+            raise ValueError(f'Starting position ({x}, {y}) is outside the {grid_width}x{grid_height} grid')
+    if wandering_choice not in batch_runner.WANDERING_CHOICES:
+        raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)  # Fresh batch, still internally consistent
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Split the trials into chunks; only the last one may be smaller
+    chunk_trials = [min(chunk_size, trials - start) for start in range(0, trials, chunk_size)]
+    arguments = [(grid_width, grid_height, positions, wandering_choice, count, seed, index, memory_limit, max_steps,
+                  keep_trials) for index, count in enumerate(chunk_trials)]
+
+    result = batch_runner.BatchResult(keep_trials=keep_trials)
+
+    if workers == 1 or len(arguments) <= 1:
+        # Not worth starting processes for a single worker or chunk, or for an empty batch
+        for args in arguments:
+            result.merge(run_chunk(*args))
+        return result
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(arguments))) as executor:
+        # map keeps chunk order, so the merged trials do not depend on scheduling
+        for chunk_result in executor.map(run_chunk, *zip(*arguments)):
+            result.merge(chunk_result)
+
+    return result
@@ -6,12 +6,10 @@ that can move randomly within a grid and form groups with other entities.
 """
 
 import random
-import pygame
-import universal_variables
+import sprite_cache
 import utilities
-
-# Initialize pygame
-pygame.init()
+from simulation_context import DEFAULT_CONTEXT
+from visit_memory import VisitMemory
 
 
 class Person:
@@ -25,7 +23,9 @@ class Person:
         move_count (int): The number of moves the entity has made.
         player_number (int): The unique identifier for the player.
         group (list): A list containing the entity and any group members.
-        history (list): A list to track the past visited locations.
+        parent (Person): The next entity towards the root of the entity's group (itself if it is the root).
+        group_size (int): The number of entities in the group, kept up to date on the group's root.
+        history (VisitMemory): The recently visited locations, read while the entity leads its group.
     """
 
     def __init__(self, x, y, color, player_number):
@@ -44,8 +44,9 @@ class Person:
         self.move_count = 0  # Initialize move count
         self.player_number = player_number  # Assign the unique player number
         self.group = [self]  # Initially, the group consists only of the entity itself
-        self.history = []  # List to track past visited locations
-        self.history.append((self.x, self.y))  # Add the initial position to history
+        self.parent = self  # Each entity starts as the root of its own group
+        self.group_size = 1  # Size of the group rooted at this entity
+        self.history = VisitMemory([(self.x, self.y)])  # Track past visited locations, starting here
 
     def move(self, grid_width, grid_height):
         """
@@ -76,7 +77,21 @@ class Person:
 
         self.move_count += 1  # Increment the move count after each move
 
-    def draw(self, screen):
+    def display_color(self):
+        """
+        Returns the color the entity is drawn in.
+
+        Returns:
+            tuple: The entity's own color, or the blend of its group members' colors if it is part of a group.
+        """
+        # If the entity is part of a group, blend the colors of all members
+        if len(self.group) > 1:
+            group_colors = [p.color for p in self.group]  # Gather colors from group members
+            return utilities.blend_colors(group_colors)  # Blend the colors using the utility function
+
+        return self.color  # Use the entity's color if not part of a group
+
+    def draw(self, screen, context=None):
         """
         Draws the entity on the screen. If part of a group, it blends the colors.
 
@@ -85,22 +100,12 @@ class Person:
 
         Args:
             screen (pygame.Surface): The screen surface to draw the entity on.
+            context (SimulationContext): Optional simulation whose cell size is used (defaults to the globals).
         """
-        # If the entity is part of a group, blend the colors of all members
-        if len(self.group) > 1:
-            group_colors = [p.color for p in self.group]  # Gather colors from group members
-            color = utilities.blend_colors(group_colors)  # Blend the colors using the utility function
-        else:
-            color = self.color  # Use the entity's color if not part of a group
-
-        # Draw the entity on the screen as a circle
-        pygame.draw.circle(
-            screen,
-            color,
-            (self.x * universal_variables.CELL_SIZE + universal_variables.CELL_SIZE // 2,
-             self.y * universal_variables.CELL_SIZE + universal_variables.CELL_SIZE // 2),
-            universal_variables.CELL_SIZE // 3  # Size of the circle
-        )
+        # Draw the entity on the screen as a circle, reusing the pre-rendered one for its color
+        cell_size = (context or DEFAULT_CONTEXT).cell_size
+        screen.blit(sprite_cache.circle_sprite(self.display_color(), cell_size),
+                    (self.x * cell_size, self.y * cell_size))
 
     def __str__(self):
         """
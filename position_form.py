@@ -0,0 +1,176 @@
+"""
+Position form module defining the PositionForm class.
+
+The final menu asks for every player's starting position. Its inputs used to
+be torn down and rebuilt each time the menu was opened, and the positions were
+found again by parsing player numbers out of the input titles. A PositionForm
+builds a fixed pool of X/Y inputs and a single Start Game button once, shows
+as many rows as there are players, and reads the positions back by index.
+
+Players beyond the pool, or whole classes of them, can be placed by pasting
+their coordinates into the bulk entry field as "x,y" pairs, e.g. "0,0 4,4 2,3".
+Pairs that cannot be read, or that lie off the grid, are reported under the
+field instead of starting the game.
+"""
+
+import pygame_menu
+
+import batch_runner
+import universal_variables
+import utilities
+
+# Color of the message explaining why the positions cannot be used
+ERROR_COLOR = (200, 0, 0)
+
+# Height of a row of position inputs, in pixels
+ROW_HEIGHT = 49
+
+
+class PositionForm:
+    """
+    A class managing the reusable player position inputs of a menu.
+
+    Attributes:
+        menu (pygame_menu.Menu): The menu holding the form.
+        rows (list of tuple): The (x input, y input) pair of each player the form has room for, in player order.
+        bulk_input (pygame_menu.widgets.TextInput): Field taking "x,y" pairs for any number of players.
+        error_label (pygame_menu.widgets.Label): The message explaining why the positions cannot be used.
+        start_button (pygame_menu.widgets.Button): The button starting the game.
+        player_count (int): The number of players the form is currently showing.
+        grid_width (int): The width of the grid positions are limited to.
+        grid_height (int): The height of the grid positions are limited to.
+    """
+
+    def __init__(self, menu, on_start, row_count=None):
+        """
+        Initializes a PositionForm instance, adding all of its widgets to the menu.
+
+        Args:
+            menu (pygame_menu.Menu): The menu to add the form to.
+            on_start (callable): Called when Start Game is pressed.
+            row_count (int): The number of players with their own inputs (defaults to POSITION_FORM_ROWS).
+        """
+        self.menu = menu  # Set menu
+        self.player_count = 0  # Nothing shown until show is called
+        self.grid_width = universal_variables.GRID_WIDTH
+        self.grid_height = universal_variables.GRID_HEIGHT
+        row_count = row_count or universal_variables.POSITION_FORM_ROWS
+
+        # Create a parent frame to hold the two columns of inputs (X and Y coordinates)
+        self.parent_frame = menu.add.frame_h(220 * 2 + 80, row_count * ROW_HEIGHT + 20)
+        self.x_frame = menu.add.frame_v(220 + 20, row_count * ROW_HEIGHT + 10)
+        self.y_frame = menu.add.frame_v(220 + 20, row_count * ROW_HEIGHT + 10)
+
+        self.rows = []
+        for i in range(1, row_count + 1):
+            # Player X and Y position inputs, kept in range for whatever grid is being set up
+            x_input = menu.add.text_input(f'Player {i} X: ', default='0', maxchar=3,
+                                          input_type=pygame_menu.locals.INPUT_INT)
+            y_input = menu.add.text_input(f'Player {i} Y: ', default='0', maxchar=3,
+                                          input_type=pygame_menu.locals.INPUT_INT)
+            x_input.add_draw_callback(self.limit_x)
+            y_input.add_draw_callback(self.limit_y)
+
+            self.x_frame.pack(x_input)  # Pack X input into first vertical frame
+            self.y_frame.pack(y_input)  # Pack Y input into second vertical frame
+            self.rows.append((x_input, y_input))
+
+        # Pack both frames into the parent frame for display
+        self.parent_frame.pack(self.x_frame)
+        self.parent_frame.pack(self.y_frame)
+
+        # Paste box for placing many players at once
+        self.bulk_input = menu.add.text_input('Bulk Positions (x,y ...): ', default='', maxchar=0,
+                                              copy_paste_enable=True)
+        self.error_label = menu.add.label('', font_color=ERROR_COLOR)
+
+        # Add the one button starting the game
+        self.start_button = menu.add.button('Start Game', on_start)
+
+    def limit_x(self, input_field, menu):
+        """
+        Keeps an X input on the grid. Used as a draw callback.
+
+        Args:
+            input_field (pygame_menu.widgets.TextInput): The input to limit.
+            menu (pygame_menu.Menu): The menu containing the input.
+        """
+        utilities.limit_input_value_selected(input_field, menu, 0, self.grid_width - 1)
+
+    def limit_y(self, input_field, menu):
+        """
+        Keeps a Y input on the grid. Used as a draw callback.
+
+        Args:
+            input_field (pygame_menu.widgets.TextInput): The input to limit.
+            menu (pygame_menu.Menu): The menu containing the input.
+        """
+        utilities.limit_input_value_selected(input_field, menu, 0, self.grid_height - 1)
+
+    def show(self, player_count, grid_width, grid_height):
+        """
+        Shows one row of inputs per player, up to the size of the pool, and hides the rest.
+
+        Args:
+            player_count (int): The number of players.
+            grid_width (int): The width of the grid.
+            grid_height (int): The height of the grid.
+        """
+        self.player_count = player_count
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.show_error('')  # Nothing has been entered yet for this setup
+
+        shown = min(player_count, len(self.rows))
+        for i, (x_input, y_input) in enumerate(self.rows):
+            for input_field in (x_input, y_input):
+                if i < shown:
+                    input_field.show()
+                else:
+                    input_field.hide()
+
+        # Shrink the frames to the rows in use
+        self.x_frame.resize(220 + 20, shown * ROW_HEIGHT + 10)
+        self.y_frame.resize(220 + 20, shown * ROW_HEIGHT + 10)
+        self.parent_frame.resize(220 * 2 + 80, shown * ROW_HEIGHT + 20)
+
+    def show_error(self, message):
+        """
+        Shows why the entered positions cannot be used, or clears the message.
+
+        Args:
+            message (str): The message, or '' to clear it.
+        """
+        self.error_label.set_title(message)
+
+    def positions(self):
+        """
+        Reads the starting positions entered for the players shown.
+
+        Pairs in the bulk entry field place players in order, starting with
+        player 1; the inputs of the pool place the players after them.
+
+        Returns:
+            list: The (x, y) position of each player, or None for a player without an entry.
+
+        Raises:
+            ValueError: If a bulk pair cannot be read, or a position lies off the grid.
+        """
+        positions = [None] * self.player_count
+
+        for i, (x_input, y_input) in enumerate(self.rows[:self.player_count]):
+            positions[i] = (int(x_input.get_value()), int(y_input.get_value()))
+
+        bulk_positions = batch_runner.parse_positions(self.bulk_input.get_value())
+        if len(bulk_positions) > self.player_count:
+            raise ValueError(f'{len(bulk_positions)} bulk positions entered for {self.player_count} players')
+        positions[:len(bulk_positions)] = bulk_positions
+
+        # The inputs are kept on the grid as they are drawn, but pasted pairs are not
+        for position in positions:
+            if position is not None and not (0 <= position[0] < self.grid_width and
+                                             0 <= position[1] < self.grid_height):
+                raise ValueError(f'Starting position {position} is outside the '
+                                 f'{self.grid_width}x{self.grid_height} grid')
+
+        return positions
@@ -0,0 +1,302 @@
+"""
+Profiler module defining the PhaseProfiler class.
+
+When the game stutters on a large grid, the time could be going to input
+handling, moving the groups, merging them, drawing the grid or pushing the
+frame to the display. A PhaseProfiler times each of those phases of every
+frame, keeps rolling averages and percentiles over the last few frames for
+an on-screen overlay, and keeps the raw timings for export as CSV or as a
+Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+
+The scenes report their phases to the shared PROFILER; it does nothing but
+check a flag until it is enabled, by PROFILING or by pressing F3.
+"""
+
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+import universal_variables
+
+# Space between the edge of the overlay and its text, in pixels
+OVERLAY_PADDING = 6
+
+
+class PhaseProfiler:
+    """
+    A class timing the phases of each frame.
+
+    Attributes:
+        enabled (bool): Whether timings are being recorded.
+        overlay (bool): Whether the overlay is shown.
+        origin (float): The perf_counter time that exported timings are relative to.
+        frame_count (int): The number of frames recorded.
+        frame_totals (dict): Milliseconds spent in each phase during the current frame.
+        frame_steps (int): The number of simulation steps taken during the current frame.
+        windows (dict): Maps each phase to a deque of its milliseconds per frame over the recent frames.
+        frame_ends (collections.deque): The (perf_counter time, steps) at the end of each recent frame.
+        spans (collections.deque): The (phase, start, duration, frame, details) of each timed span, for export.
+        overlay_surface (pygame.Surface): The rendered overlay, reused until it is due to be refreshed.
+        overlay_rendered (int): The time (in milliseconds) the overlay was last rendered.
+        overlay_background (tuple): The (screen, rect, pixels) under the overlay, to erase it with.
+    """
+
+    def __init__(self, enabled=None, window=None, max_spans=None):
+        """
+        Initializes a PhaseProfiler instance.
+
+        Args:
+            enabled (bool): Whether to record timings from the start (defaults to universal_variables.PROFILING).
+            window (int): The number of frames statistics are taken over (defaults to PROFILE_WINDOW).
+            max_spans (int): The most spans kept for export (defaults to PROFILE_MAX_SPANS).
+        """
+        self.enabled = universal_variables.PROFILING if enabled is None else enabled
+        self.overlay = False  # Hidden until F3 is pressed
+        self.window = window or universal_variables.PROFILE_WINDOW
+        self.max_spans = max_spans or universal_variables.PROFILE_MAX_SPANS
+        self.overlay_background = None  # Nothing drawn yet
+        self.reset()
+
+    def reset(self):
+        """
+        Discards every recorded timing.
+        """
+        self.origin = time.perf_counter()  # Exported times count from here
+        self.frame_count = 0
+        self.frame_totals = {}
+        self.frame_steps = 0
+        self.windows = {}
+        self.frame_ends = deque(maxlen=self.window + 1)  # One more end than frames, to time the first of them
+        self.spans = deque(maxlen=self.max_spans)  # The oldest spans make room for new ones
+        self.overlay_surface = None
+        self.overlay_rendered = 0
+
+    def record(self, phase, start, end, **details):
+        """
+        Records a phase of the current frame that ran from start to end.
+
+        Args:
+            phase (str): The name of the phase, e.g. 'draw_grid'.
+            start (float): The time.perf_counter() time the phase started.
+            end (float): The time.perf_counter() time the phase ended.
+            **details: Optional values exported with the span, e.g. the number of steps it covers.
+        """
+        if not self.enabled:
+            return
+        self.add(phase, end - start)
+        self.spans.append((phase, start - self.origin, end - start, self.frame_count, details))
+
+    def add(self, phase, seconds):
+        """
+        Adds time to a phase of the current frame without exporting a span for it.
+
+        Used for phases that run many times a frame, like moving the groups once per step.
+
+        Args:
+            phase (str): The name of the phase.
+            seconds (float): The time spent in the phase.
+        """
+        if self.enabled:
+            self.frame_totals[phase] = self.frame_totals.get(phase, 0) + seconds * 1000
+
+    def count_steps(self, steps):
+        """
+        Counts simulation steps taken during the current frame.
+
+        Args:
+            steps (int): The number of steps.
+        """
+        self.frame_steps += steps
+
+    def end_frame(self):
+        """
+        Closes the current frame, adding its phase times to the rolling statistics.
+        """
+        if not self.enabled:
+            self.frame_steps = 0
+            return
+
+        # A phase missing from a frame took no time in it
+        for phase in self.frame_totals.keys() - self.windows.keys():
+            self.windows[phase] = deque(maxlen=self.window)
+        for phase, window in self.windows.items():
+            window.append(self.frame_totals.get(phase, 0))
+
+        self.frame_ends.append((time.perf_counter(), self.frame_steps))
+        self.frame_count += 1
+        self.frame_totals = {}
+        self.frame_steps = 0
+
+    def fps(self):
+        """
+        Returns the number of frames per second over the recent frames.
+
+        Returns:
+            float: The frame rate, 0 before two frames were recorded.
+        """
+        if len(self.frame_ends) < 2:
+            return 0.0
+        return (len(self.frame_ends) - 1) / max(self.frame_ends[-1][0] - self.frame_ends[0][0], 1e-9)
+
+    def steps_per_second(self):
+        """
+        Returns the number of simulation steps per second over the recent frames.
+
+        Returns:
+            float: The step rate, 0 before two frames were recorded.
+        """
+        if len(self.frame_ends) < 2:
+            return 0.0
+        steps = sum(steps for _, steps in list(self.frame_ends)[1:])  # Steps taken after the first frame ended
+        return steps / max(self.frame_ends[-1][0] - self.frame_ends[0][0], 1e-9)
+
+    def phase_statistics(self):
+        """
+        Summarizes the time each phase took per frame over the recent frames.
+
+        Returns:
+            dict: Maps each phase to a dict of its 'mean', 'p50', 'p95' and 'max' milliseconds per frame.
+        """
+        statistics = {}
+        for phase, window in self.windows.items():
+            values = sorted(window)
+            count = len(values)
+            statistics[phase] = {
+                'mean': sum(values) / count,
+                'p50': values[min(count - 1, int(count * 0.5))],
+                'p95': values[min(count - 1, int(count * 0.95))],
+                'max': values[-1],
+            }
+        return statistics
+
+    def toggle_overlay(self):
+        """
+        Shows or hides the overlay. Recording starts with the overlay and stops with it unless PROFILING is set.
+        """
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or universal_variables.PROFILING
+
+    def render_overlay(self):
+        """
+        Renders the frame rate, step rate and phase times onto a translucent box.
+
+        Returns:
+            pygame.Surface: The overlay.
+        """
+        font = universal_variables.font_overlay
+        lines = [f'FPS {self.fps():.1f}   steps/s {self.steps_per_second():,.0f}',
+                 'ms per frame: mean / p50 / p95']
+        statistics = sorted(self.phase_statistics().items(), key=lambda item: -item[1]['mean'])  # Slowest first
+        for phase, phase_statistics in statistics:
+            lines.append(f"{phase}: {phase_statistics['mean']:.2f} / {phase_statistics['p50']:.2f} / "
+                         f"{phase_statistics['p95']:.2f}")
+
+        text_surfaces = [font.render(line, True, universal_variables.WHITE) for line in lines]
+        width = max(text.get_width() for text in text_surfaces) + 2 * OVERLAY_PADDING
+        height = sum(text.get_height() for text in text_surfaces) + 2 * OVERLAY_PADDING
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 180))  # Dark, but the frame under it stays visible
+        y = OVERLAY_PADDING
+        for text in text_surfaces:
+            surface.blit(text, (OVERLAY_PADDING, y))
+            y += text.get_height()
+        return surface
+
+    def draw_overlay(self, screen):
+        """
+        Draws the overlay in the top left corner, keeping what it covers so erase_overlay can restore it.
+
+        The numbers are only rendered again every OVERLAY_REFRESH milliseconds, so they stay readable.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+
+        Returns:
+            pygame.Rect: The area drawn over.
+        """
+        now = pygame.time.get_ticks()
+        if self.overlay_surface is None or now - self.overlay_rendered >= universal_variables.OVERLAY_REFRESH:
+            self.overlay_surface = self.render_overlay()
+            self.overlay_rendered = now
+
+        rect = self.overlay_surface.get_rect(topleft=(0, 0)).clip(screen.get_rect())
+        self.overlay_background = (screen, rect, screen.subsurface(rect).copy())
+        screen.blit(self.overlay_surface, rect)
+        return rect
+
+    def erase_overlay(self, screen):
+        """
+        Puts back what the overlay covered, so scenes that only repaint what changed never see it.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+
+        Returns:
+            pygame.Rect: The area restored, or None if there was nothing to restore.
+        """
+        if self.overlay_background is None:
+            return None
+        drawn_on, rect, background = self.overlay_background
+        self.overlay_background = None
+        if drawn_on is not screen:
+            return None  # The window was opened again since, so the overlay is already gone
+        screen.blit(background, rect)
+        return rect
+
+    def export_csv(self, path):
+        """
+        Writes the recorded spans to a CSV file, one row per span.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame', 'phase', 'start_ms', 'duration_ms', 'details'])
+            for phase, start, duration, frame, details in self.spans:
+                writer.writerow([frame, phase, f'{start * 1000:.3f}', f'{duration * 1000:.3f}',
+                                 ' '.join(f'{key}={value}' for key, value in details.items())])
+
+    def export_chrome_trace(self, path):
+        """
+        Writes the recorded spans to a file in the Chrome trace event format.
+
+        Args:
+            path (str): The path of the file.
+        """
+        events = [{'name': phase, 'cat': 'frame', 'ph': 'X', 'ts': round(start * 1e6, 3),
+                   'dur': round(duration * 1e6, 3), 'pid': 0, 'tid': 0, 'args': dict(details, frame=frame)}
+                  for phase, start, duration, frame, details in self.spans]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    def export(self, csv_path=None, trace_path=None):
+        """
+        Writes the recorded spans both as CSV and as a Chrome trace.
+
+        Args:
+            csv_path (str): The path of the CSV file (defaults to universal_variables.PROFILE_CSV_PATH).
+            trace_path (str): The path of the trace (defaults to universal_variables.PROFILE_TRACE_PATH).
+
+        Returns:
+            bool: True if both files were written.
+        """
+        csv_path = csv_path or universal_variables.PROFILE_CSV_PATH
+        trace_path = trace_path or universal_variables.PROFILE_TRACE_PATH
+        try:
+            self.export_csv(csv_path)
+            self.export_chrome_trace(trace_path)
+        except OSError as e:
+            print(f"Unable to export timings: {e}")
+            return False
+
+        print(f"Exported {len(self.spans)} timings to {csv_path} and {trace_path}")
+        return True
+
+
+# The profiler every scene reports to
+PROFILER = PhaseProfiler()
@@ -0,0 +1,181 @@
+"""
+Run log module for recording completed runs in a compact binary file.
+
+The statistics in universal_variables only last as long as the process. This
+module appends every completed run to a log on disk, one fixed-width record
+per run behind a short header, so the log can be collected over many sessions
+and batch jobs and then memory-mapped by run_log_analytics without parsing.
+
+Each record holds, little-endian and unpadded:
+
+    timestamp                    float64  seconds since the epoch
+    steps                        int64    steps until everybody met (-1 if abandoned)
+    longest_run_without_meeting  int64
+    grid_width, grid_height      uint16
+    player_count                 uint8
+    grade_level                  uint8    0 when unknown, e.g. for batch runs
+    strategy                     uint8    index into batch_runner.WANDERING_CHOICES
+    (padding)                    1 byte
+    positions                    (x, y) uint16 of the first MAX_LOGGED_PLAYERS players, unused ones UNUSED_POSITION
+"""
+
+import os
+import struct
+import time
+
+import batch_runner
+
+# File signature and format version, checked before appending to an existing log
+MAGIC = b'WITWRUNS'
+VERSION = 1
+
+# Most players whose starting positions fit in a record (larger games keep the positions of the first ones)
+MAX_LOGGED_PLAYERS = 16
+
+# Coordinate stored in the position slots of missing players
+UNUSED_POSITION = 0xFFFF
+
+HEADER = struct.Struct('<8sII')  # Magic, version, record size
+RECORD = struct.Struct('<dqqHHBBBx' + 'H' * (2 * MAX_LOGGED_PLAYERS))
+
+
+def pack_run(grid_width, grid_height, positions, wandering_choice, steps, longest_run_without_meeting, grade_level=0,
+             timestamp=None):
+    """
+    Encodes one run as a log record.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player (at most 255 players).
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        steps (int): The number of steps until everybody met (-1 if abandoned).
+        longest_run_without_meeting (int): The longest run without meeting.
+        grade_level (int): The grade level played (0 if not applicable).
+        timestamp (float): The time the run finished (defaults to now).
+
+    Returns:
+        bytes: The RECORD.size byte record.
+    """
+    if wandering_choice not in batch_runner.WANDERING_CHOICES:
+        raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+    coordinates = [coordinate for position in positions[:MAX_LOGGED_PLAYERS] for coordinate in position]
+    coordinates.extend([UNUSED_POSITION] * (2 * MAX_LOGGED_PLAYERS - len(coordinates)))
+
+    return RECORD.pack(time.time() if timestamp is None else timestamp, steps, longest_run_without_meeting,
+                       grid_width, grid_height, len(positions), grade_level,
+                       batch_runner.WANDERING_CHOICES.index(wandering_choice), *coordinates)
+
+
+class RunLogWriter:
+    """
+    A class appending records to a run log, keeping the file open between runs.
+
+    Attributes:
+        path (str): The path of the log.
+        file (file): The log, opened for appending.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes a RunLogWriter instance, creating the log if it does not exist yet.
+
+        Args:
+            path (str): The path of the log.
+        """
+        self.path = path  # Set log path
+        self.file = open(path, 'ab')  # Appending never rewrites earlier runs
+
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))  # New log
+        else:
+            try:
+                record_count = read_header(path)  # Never append records of a different layout
+            except ValueError:
+                self.file.close()
+                raise
+            self.file.truncate(HEADER.size + record_count * RECORD.size)  # Drop a record cut short by a crash
+
+    def append(self, grid_width, grid_height, positions, wandering_choice, steps, longest_run_without_meeting,
+               grade_level=0):
+        """
+        Appends one run to the log. Takes the same arguments as pack_run, except the timestamp.
+        """
+        self.file.write(pack_run(grid_width, grid_height, positions, wandering_choice, steps,
+                                 longest_run_without_meeting, grade_level))
+
+    def append_batch(self, result, grid_width, grid_height, positions, wandering_choice, grade_level=0):
+        """
+        Appends every trial of a batch to the log in a single write.
+
+        Args:
+            result (batch_runner.BatchResult): A batch run with keep_trials=True.
+            grid_width (int): The width of the grid.
+            grid_height (int): The height of the grid.
+            positions (list of tuple): The (x, y) starting position of each player.
+            wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+            grade_level (int): The grade level played (0 if not applicable).
+        """
+        if result.steps is None:
+            raise ValueError('The batch did not keep its per-trial results (run it with keep_trials=True)')
+
+        # Every trial shares its setup, so the record is only checked and laid out once
+        template = RECORD.unpack(pack_run(grid_width, grid_height, positions, wandering_choice, 0, 0, grade_level))
+        timestamp, setup = template[0], template[3:]  # One finishing time for the whole batch
+        pack = RECORD.pack
+        self.file.write(b''.join(pack(timestamp, steps, longest_run, *setup)
+                                 for steps, longest_run in zip(result.steps, result.longest_runs)))
+
+    def close(self):
+        """
+        Flushes and closes the log.
+        """
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_header(path):
+    """
+    Checks that a file is a run log this module can read and append to.
+
+    Args:
+        path (str): The path of the log.
+
+    Returns:
+        int: The number of complete records in the log.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+
+    if len(header) < HEADER.size:
+        raise ValueError(path + ' is not a run log (it is too short)')
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(path + ' is not a version ' + str(VERSION) + ' run log')
+
+    # A record cut short by a crash mid-write is ignored
+    return (os.path.getsize(path) - HEADER.size) // RECORD.size
+
+
+def append_run(path, grid_width, grid_height, positions, wandering_choice, steps, longest_run_without_meeting,
+               grade_level=0):
+    """
+    Appends one run to a log, creating it if needed. Takes the same arguments as pack_run, except the timestamp.
+
+    Returns:
+        bool: True if the run was logged; False if the log could not be written.
+    """
+    try:
+        with RunLogWriter(path) as writer:
+            writer.append(grid_width, grid_height, positions, wandering_choice, steps, longest_run_without_meeting,
+                          grade_level)
+    except (OSError, ValueError) as e:
+        print(f"Unable to log run: {e}")
+        return False
+
+    return True
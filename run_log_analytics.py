@@ -0,0 +1,132 @@
+"""
+Run log analytics module for querying run logs with NumPy.
+
+A run log written by run_log is memory-mapped as a structured array, so its
+columns can be filtered and aggregated with array operations straight from
+the page cache, without decoding millions of records into Python objects.
+"""
+
+import numpy as np
+
+import batch_runner
+import run_log
+
+# Layout of a run_log record, field for field
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('steps', '<i8'),
+    ('longest_run_without_meeting', '<i8'),
+    ('grid_width', '<u2'),
+    ('grid_height', '<u2'),
+    ('player_count', 'u1'),
+    ('grade_level', 'u1'),
+    ('strategy', 'u1'),
+    ('padding', 'u1'),
+    ('positions', '<u2', (run_log.MAX_LOGGED_PLAYERS, 2)),
+])
+assert RECORD_DTYPE.itemsize == run_log.RECORD.size, 'RECORD_DTYPE is out of step with run_log.RECORD'
+
+# Fields summarize_by groups on by default
+GROUP_FIELDS = ('grid_width', 'grid_height', 'player_count', 'strategy')
+
+
+def open_log(path):
+    """
+    Memory-maps a run log.
+
+    Args:
+        path (str): The path of the log.
+
+    Returns:
+        numpy.ndarray: A read-only structured array of RECORD_DTYPE with one entry per run.
+    """
+    record_count = run_log.read_header(path)
+    if not record_count:
+        return np.empty(0, dtype=RECORD_DTYPE)  # A zero-length file region cannot be mapped
+
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=run_log.HEADER.size, shape=(record_count,))
+
+
+def select(records, grid_width=None, grid_height=None, player_count=None, wandering_choice=None, grade_level=None):
+    """
+    Returns the runs of one setup.
+
+    Args:
+        records (numpy.ndarray): Records from open_log.
+        grid_width (int): Optional grid width to keep.
+        grid_height (int): Optional grid height to keep.
+        player_count (int): Optional player count to keep.
+        wandering_choice (str): Optional strategy to keep, one of batch_runner.WANDERING_CHOICES.
+        grade_level (int): Optional grade level to keep.
+
+    Returns:
+        numpy.ndarray: The matching records.
+    """
+    mask = np.ones(len(records), dtype=bool)
+    if wandering_choice is not None:
+        mask &= records['strategy'] == batch_runner.WANDERING_CHOICES.index(wandering_choice)
+    for field, value in (('grid_width', grid_width), ('grid_height', grid_height), ('player_count', player_count),
+                         ('grade_level', grade_level)):
+        if value is not None:
+            mask &= records[field] == value
+    return records[mask]
+
+
+def summarize(records):
+    """
+    Computes aggregate statistics over runs, with the same keys as batch_runner.BatchResult.summary.
+
+    Args:
+        records (numpy.ndarray): Records from open_log or select.
+
+    Returns:
+        dict: The run count, completed count, mean, standard deviation, minimum,
+              median, 90th and 99th percentiles, maximum and longest run without meeting.
+    """
+    steps = records['steps']
+    completed = steps[steps != -1]  # Ignore abandoned runs
+    summary = {'trials': len(records), 'completed': len(completed),
+               'longest_run_without_meeting': int(records['longest_run_without_meeting'].max(initial=0))}
+
+    if not len(completed):
+        return summary
+
+    # Partitioning around the ranks finds the percentiles without sorting every run
+    ranks = [min(len(completed) - 1, int(len(completed) * fraction)) for fraction in (0.5, 0.9, 0.99)]
+    median, p90, p99 = np.partition(completed, ranks)[ranks]
+
+    summary.update({
+        'mean': float(completed.mean()),
+        'stdev': float(completed.std(ddof=1)) if len(completed) > 1 else 0.0,
+        'min': int(completed.min()),
+        'median': int(median),
+        'p90': int(p90),
+        'p99': int(p99),
+        'max': int(completed.max()),
+    })
+    return summary
+
+
+def summarize_by(records, fields=GROUP_FIELDS):
+    """
+    Computes aggregate statistics for each distinct setup in a log.
+
+    Args:
+        records (numpy.ndarray): Records from open_log or select.
+        fields (tuple): The record fields that tell setups apart.
+
+    Returns:
+        dict: Maps a tuple of the field values (strategies by name) to the summarize output of those runs.
+    """
+    if not len(records):
+        return {}
+
+    keys, inverse, counts = np.unique(records[list(fields)], return_inverse=True, return_counts=True)
+    groups = np.split(np.argsort(inverse, kind='stable'), np.cumsum(counts)[:-1])  # Record indices of each setup
+
+    summaries = {}
+    for key, indices in zip(keys, groups):
+        key = tuple(batch_runner.WANDERING_CHOICES[value] if field == 'strategy' else int(value)
+                    for field, value in zip(fields, key.tolist()))
+        summaries[key] = summarize(records[indices])
+    return summaries
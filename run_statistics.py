@@ -0,0 +1,178 @@
+"""
+Run statistics module defining the RunStatistics class.
+
+This module keeps summary statistics of a stream of run lengths without
+storing the runs themselves. The count, mean and variance are updated with
+Welford's algorithm, and quantiles are read off a histogram whose bins grow
+geometrically, so every value is counted in O(1) time and memory stays
+bounded no matter how many runs are recorded.
+"""
+
+import math
+
+# Largest relative error of a quantile estimate
+RELATIVE_ACCURACY = 0.01
+
+# Ratio between the upper edges of neighbouring histogram bins
+BIN_GROWTH = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+
+class RunStatistics:
+    """
+    A class accumulating statistics over a stream of run lengths.
+
+    Bin k of the histogram counts the values in (BIN_GROWTH ** (k - 1), BIN_GROWTH ** k],
+    so it takes about a thousand bins to cover every value from 1 to a billion.
+
+    Attributes:
+        count (int): The number of values recorded.
+        mean (float): The mean of the values.
+        m2 (float): The sum of squared differences from the mean (Welford's algorithm).
+        minimum (float): The smallest value, or None before any value was recorded.
+        maximum (float): The largest value, or None before any value was recorded.
+        bins (dict): Maps a bin number to the number of positive values in it.
+        zero_count (int): The number of values equal to zero.
+        integers (bool): True while every value recorded was a whole number.
+    """
+
+    def __init__(self, values=()):
+        """
+        Initializes a RunStatistics instance.
+
+        Args:
+            values (iterable): Optional values to record straight away.
+        """
+        self.count = 0  # Number of values recorded
+        self.mean = 0.0  # Running mean
+        self.m2 = 0.0  # Running sum of squared differences from the mean
+        self.minimum = None  # Smallest value
+        self.maximum = None  # Largest value
+        self.bins = {}  # Histogram of positive values
+        self.zero_count = 0  # Values too small for the logarithmic bins
+        self.integers = True  # Whether quantiles can be rounded to whole numbers
+
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        """
+        Records one value.
+
+        Args:
+            value (float): The run length to record (must not be negative).
+        """
+        if value < 0:
+            raise ValueError('Run lengths cannot be negative: ' + str(value))
+
+        # Welford's update of the mean and the sum of squared differences
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.integers = self.integers and value == int(value)
+
+        if value == 0:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value, BIN_GROWTH))
+            self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other):
+        """
+        Adds the values recorded by another accumulator to this one.
+
+        Args:
+            other (RunStatistics): The statistics to merge in.
+
+        Returns:
+            RunStatistics: This accumulator, now covering the values of both.
+        """
+        if not other.count:
+            return self
+
+        # Chan's formula for combining two means and sums of squared differences
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        self.integers = self.integers and other.integers
+        self.zero_count += other.zero_count
+        for index, bin_count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + bin_count
+
+        return self
+
+    def variance(self):
+        """
+        Returns the sample variance of the values.
+
+        Returns:
+            float: The variance, or 0.0 with fewer than two values.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def stdev(self):
+        """
+        Returns the sample standard deviation of the values.
+
+        Returns:
+            float: The standard deviation, or 0.0 with fewer than two values.
+        """
+        return math.sqrt(self.variance())
+
+    def quantile(self, fraction):
+        """
+        Estimates a quantile, picking the same rank as batch_runner.BatchResult.summary.
+
+        Args:
+            fraction (float): The quantile to estimate, e.g. 0.5 for the median.
+
+        Returns:
+            float: The estimate, within RELATIVE_ACCURACY of the true value (None before any value was recorded).
+        """
+        if not self.count:
+            return None
+
+        rank = min(self.count - 1, int(self.count * fraction))  # Index of the value in sorted order
+        seen = self.zero_count
+        if rank < seen:
+            return 0
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # The point of the bin that is within RELATIVE_ACCURACY of everything in it
+                estimate = 2 * BIN_GROWTH ** index / (BIN_GROWTH + 1)
+                estimate = min(max(estimate, self.minimum), self.maximum)
+                return round(estimate) if self.integers else estimate
+
+        return self.maximum
+
+    def summary(self):
+        """
+        Computes aggregate statistics over the values.
+
+        Returns:
+            dict: The count, mean, standard deviation, minimum, median, 90th and 99th percentiles and maximum.
+        """
+        summary = {'count': self.count}
+        if not self.count:
+            return summary
+
+        summary.update({
+            'mean': self.mean,
+            'stdev': self.stdev(),
+            'min': self.minimum,
+            'median': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'max': self.maximum,
+        })
+        return summary
@@ -0,0 +1,120 @@
+"""
+Scene manager module defining the SceneManager class.
+
+The menus and the game used to hand control to each other by calling each
+other's loops, so every run left another menu loop and set of menus on the
+stack. A SceneManager runs a single flat loop instead: it owns one instance of
+every scene, lets the current one handle a frame, and switches scenes when a
+frame asks it to.
+
+A scene is any object with three methods:
+
+    enter()          called each time the scene is switched to
+    timeout()        how long to sleep for input before the next frame, in
+                     milliseconds (0 while animating, to run at the frame rate)
+    frame(events)    handles the input and draws one frame; returns the name of
+                     the scene to switch to, QUIT to stop, or None to stay
+
+The manager also times the wait for input of every frame, and handles the
+profiler keys for all scenes: F3 shows the performance overlay, F4 exports
+the recorded timings.
+"""
+
+import time
+
+import pygame
+
+from frame_scheduler import FrameScheduler
+from profiler import PROFILER
+
+# Scene name that ends the loop
+QUIT = 'quit'
+
+
+class SceneManager:
+    """
+    A class driving the scenes of the game from a single loop.
+
+    Attributes:
+        scenes (dict): Maps a scene name to the scene.
+        current (object): The scene receiving frames, or None once the loop is over.
+        scheduler (FrameScheduler): Paces the frames of every scene.
+    """
+
+    def __init__(self, scenes):
+        """
+        Initializes a SceneManager instance.
+
+        Args:
+            scenes (dict): The scenes, by name.
+        """
+        self.scenes = dict(scenes)  # Scenes by name
+        self.current = None  # Scene receiving frames
+        self.scheduler = FrameScheduler()  # Caps the frame rate and sleeps while nothing moves
+
+    def switch(self, name):
+        """
+        Makes a scene current and lets it set itself up.
+
+        Args:
+            name (str): The name of the scene, or QUIT to end the loop.
+        """
+        if name == QUIT:
+            self.current = None
+            return
+
+        self.current = self.scenes[name]
+        self.current.enter()
+
+    def run(self, name):
+        """
+        Runs frames until a scene quits or the window is closed.
+
+        Args:
+            name (str): The name of the first scene.
+        """
+        self.switch(name)
+
+        while self.current is not None:
+            timeout = self.current.timeout()
+            start = time.perf_counter()
+            events = self.scheduler.poll() if timeout <= 0 else self.scheduler.wait(timeout)
+            PROFILER.record('wait', start, time.perf_counter())
+
+            if any(event.type == pygame.QUIT for event in events):  # The window was closed
+                self.current = None
+                break
+            for event in events:
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:  # Show or hide the overlay
+                    PROFILER.toggle_overlay()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:  # Save the timings
+                    PROFILER.export()
+
+            # Scenes only repaint what changed, so they must never find the overlay on screen
+            erased = PROFILER.erase_overlay(pygame.display.get_surface())
+
+            next_scene = self.current.frame(events)
+            if next_scene is not None:
+                self.switch(next_scene)
+
+            self.show_overlay(erased)
+            PROFILER.end_frame()
+
+    def show_overlay(self, erased):
+        """
+        Draws the performance overlay over the frame, if it is shown, and pushes it to the display.
+
+        Args:
+            erased (pygame.Rect): The area the overlay of the last frame was erased from, or None.
+        """
+        screen = pygame.display.get_surface()
+        if screen is None:
+            return  # The last scene closed the window
+
+        start = time.perf_counter()
+        dirty_rects = [erased] if erased else []
+        if PROFILER.overlay:
+            dirty_rects.append(PROFILER.draw_overlay(screen))
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+            PROFILER.record('overlay', start, time.perf_counter())
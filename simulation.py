@@ -1,114 +1,37 @@
-import os
-import sys
-from functools import partial
+import time
 
 import pygame
 import pygame_menu
 from pygame_menu import themes
 
+import assets
 import universal_variables
 import utilities
+from game_base import Game
 from person import Person
+from position_form import PositionForm
+from profiler import PROFILER
+from scene_manager import SceneManager
 
-# Initialize pygame
-pygame.init()
-
-# Initialize pygame mixer for sound
-pygame.mixer.init()
-
-# Function to get the correct path for bundled files
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and PyInstaller """
-    if getattr(sys, 'frozen', False):  # Check if running as an exe
-        base_path = sys._MEIPASS  # Temporary directory for PyInstaller
-    else:
-        base_path = os.path.abspath(".")  # Normal script execution
-
-    return os.path.join(base_path, relative_path)
-
-# Load the background music
-background_music_path = resource_path('music.wav')
-background_music = pygame.mixer.Sound(background_music_path)
-
-def start_the_game(mainmenu, submenu):
-    """
-    Starts the game based on the grade level.
-    Opens the simulation chooser or the main menu with a parameter submenu.
-
-    Args:
-        mainmenu: The main menu to be displayed.
-        submenu: The submenu for game parameters.
-    """
-    if universal_variables.GRADE_LEVEL == 1:
-        simulation_chooser(mainmenu)
-    elif universal_variables.GRADE_LEVEL == 2 or universal_variables.GRADE_LEVEL == 3:
-        mainmenu._open(submenu)
-
-
-def generate_player_position_inputs(submenu, player_count):
-    """
-    Generates input fields for player positions (X, Y) in the game.
-    Clears any existing input fields and creates new ones.
-
-    Args:
-        submenu: The submenu where input fields will be added.
-        player_count: The number of players for whom inputs are generated.
-    """
-    # Remove any existing player position input boxes
-    for widget in submenu.get_widgets():
-        submenu.remove_widget(widget)
-
-    # Create a parent frame to hold columns of input frames
-    parent_frame = submenu.add.frame_h(220 * 2 + 80, universal_variables.PLAYER_COUNT * 49 + 20)
-
-    # Create two vertical frames for each text input (X and Y coordinates)
-    frame1 = submenu.add.frame_v(220 + 20, universal_variables.PLAYER_COUNT * 49 + 10)
-    frame2 = submenu.add.frame_v(220 + 20, universal_variables.PLAYER_COUNT * 49 + 10)
-
-    # Create new input boxes for each player position
-    for i in range(1, player_count + 1):
-        # Player X position input
-        input1 = submenu.add.text_input(f'Player {i} X: ', default='0', maxchar=3,
-                                        input_type=pygame_menu.locals.INPUT_INT)
-        frame1.pack(input1)  # Pack X input into first vertical frame
-
-        # Player Y position input
-        input2 = submenu.add.text_input(f'Player {i} Y: ', default='0', maxchar=3,
-                                        input_type=pygame_menu.locals.INPUT_INT)
-        frame2.pack(input2)  # Pack Y input into second vertical frame
-
-        # Apply the limit function to both input fields with partial function
-        input1.add_draw_callback(
-            partial(utilities.limit_input_value_selected, min=0, max=universal_variables.GRID_WIDTH - 1))
-        input2.add_draw_callback(
-            partial(utilities.limit_input_value_selected, min=0, max=universal_variables.GRID_HEIGHT - 1))
-
-    # Pack both frames into the parent frame for display
-    parent_frame.pack(frame1)
-    parent_frame.pack(frame2)
-
-
-def simulation_chooser(finalmenu):
+def simulation_chooser(main_game, positions=None):
     """
     Chooses and initializes the simulation based on the grade level.
     Creates the player objects and sets their positions accordingly.
 
     Args:
-        finalmenu: The final menu to open after the simulation setup.
+        main_game: The game scene to set up for the new run.
+        positions: Optional starting position of each player, by player index (None keeps the default position).
     """
-    # Import the Game class from the game_base module
-    from game_base import Game
-
-    # Initialize the main game with grid dimensions and the number of players
-    main_game = Game(universal_variables.GRID_WIDTH, universal_variables.GRID_HEIGHT, universal_variables.PLAYER_COUNT)
+    # Reuse the game with the new grid dimensions and number of players
+    main_game.reset(universal_variables.GRID_WIDTH, universal_variables.GRID_HEIGHT, universal_variables.PLAYER_COUNT)
 
     # Based on the grade level, initialize the players with specific positions and colors
-    if universal_variables.GRADE_LEVEL == 1:
+    if main_game.context.grade_level == 1:
         # For grade level 1, place two players at opposite corners of the grid
         main_game.people.append(Person(0, 0, universal_variables.PLAYER_COLORS[0], 1))  # First player at top-left
         main_game.people.append(Person(universal_variables.GRID_WIDTH - 1, universal_variables.GRID_HEIGHT - 1,
                                        universal_variables.PLAYER_COLORS[1], 2))  # Second player at bottom-right
-    elif universal_variables.GRADE_LEVEL == 2 or universal_variables.GRADE_LEVEL == 3:
+    elif main_game.context.grade_level == 2 or main_game.context.grade_level == 3:
         # For grade levels 2 and 3, distribute players evenly across the grid
         for i in range(universal_variables.PLAYER_COUNT):
             # Use modulo to cycle through the PLAYER_COLORS list if the player count exceeds available colors
@@ -120,223 +43,340 @@ def simulation_chooser(finalmenu):
                                            color, i + 1))
     else:
         # If an invalid grade level is provided, print an error message
-        print("Invalid Grade Level: " + str(universal_variables.GRADE_LEVEL))
+        print("Invalid Grade Level: " + str(main_game.context.grade_level))
 
     # Now assign player positions based on the input values from the final menu
-    for widget in finalmenu.get_widgets():
-        # Check if the widget is a TextInput (i.e., the input fields for X and Y positions)
-        if isinstance(widget, pygame_menu.widgets.TextInput):
-            value = widget.get_value()  # Get the value entered for the position
-            x, y = -1, -1  # Initialize x and y coordinates to -1
-
-            # If the input widget is for X position, assign the X value
-            if 'X' in widget.get_title():
-                x = int(value)
-            # If the input widget is for Y position, assign the Y value
-            elif 'Y' in widget.get_title():
-                y = int(value)
-
-            # Extract the player number from the widget title (assumes player numbers are in the title)
-            player_number = ''.join(c for c in widget.get_title() if c.isdigit())
-
-            # Find the corresponding player and set their position based on the input
-            for person in main_game.people:
-                if person.player_number == int(player_number):
-                    if x != -1:
-                        person.x = x  # Update the player's X coordinate if it was provided
-                    elif y != -1:
-                        person.y = y  # Update the player's Y coordinate if it was provided
-
-    # Start the game loop, which runs the main game logic
-    main_game.game_loop()
+    for person, position in zip(main_game.people, positions or ()):
+        if position is not None:
+            person.x, person.y = position
 
-def main_menu():
+
+class MenuScene:
     """
-    Initializes and runs the main menu loop, allowing navigation through menus and handling input.
-    The main loop manages the state of the menus and the flow of the simulation.
+    A class holding every menu of the game, built once and shown between runs.
+
+    Attributes:
+        game: The game scene that Start Game sets up.
+        next_scene: The scene a button asked to switch to during the current frame, if any.
+        mainmenu: The main menu, from which the settings, parameter and final menus are opened.
+        statsmenu: The menu showing the statistics after a run.
     """
-    # Set up the screen for the game window using the dimensions from universal_variables
-    screen = pygame.display.set_mode((universal_variables.WINDOW_WIDTH, universal_variables.WINDOW_HEIGHT))
 
-    # MAIN MENU
-    # Create the main menu using pygame_menu, setting the window dimensions and theme
-    mainmenu = pygame_menu.Menu('Wandering In The Woods', universal_variables.WINDOW_WIDTH,
-                                universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
+    def __init__(self, game):
+        """
+        Builds the menus. The game window must already be open.
+
+        Args:
+            game: The game scene that Start Game sets up.
+        """
+        self.game = game  # Set game scene
+        self.context = game.context  # Settings the menus change and statistics they show
+        self.next_scene = None  # Scene requested by a button
+
+        # MAIN MENU
+        # Create the main menu using pygame_menu, setting the window dimensions and theme
+        self.mainmenu = pygame_menu.Menu('Wandering In The Woods', universal_variables.WINDOW_WIDTH,
+                                         universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
+
+        # Add a button to run the simulation; when clicked, it triggers the start_the_game method
+        self.mainmenu.add.button('Run Simulation', self.start_the_game)
+
+        # Add a button to open the settings menu, which allows the user to modify game settings
+        self.mainmenu.add.button('Settings', lambda: self.mainmenu._open(self.settings))
+
+        # Add a button to quit the game and exit the application
+        self.mainmenu.add.button('Quit', pygame_menu.events.EXIT)
 
-    # Add a button to run the simulation; when clicked, it triggers the start_the_game function
-    mainmenu.add.button('Run Simulation', lambda: start_the_game(mainmenu, submenu))
+        # SETTINGS MENU
+        # Create the settings menu where the user can modify the grade level, simulation time, and cell size
+        self.settings = pygame_menu.Menu('Settings', universal_variables.WINDOW_WIDTH,
+                                         universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
 
-    # Add a button to open the settings menu, which allows the user to modify game settings
-    mainmenu.add.button('Settings', lambda: mainmenu._open(settings))
+        # Add a selector for grade level, allowing the user to choose between K-2, 3-5, and 6-8
+        # The default value is set based on the current grade level in universal_variables
+        self.grade_selector = self.settings.add.selector('Grade Level :', [('K-2', 1), ('3-5', 2), ('6-8', 3)],
+                                                         default=self.context.grade_level - 1)
 
-    # Add a button to quit the game and exit the application
-    mainmenu.add.button('Quit', pygame_menu.events.EXIT)
+        # Add a text input for the simulation turn time, allowing the user to set how long each simulation turn lasts
+        # The default value is based on the TURN_TIME variable in universal_variables
+        self.time_selector = self.settings.add.text_input('Simulation Turn Time: ',
+                                                          default=str(self.context.turn_time),
+                                                          input_type=pygame_menu.locals.INPUT_FLOAT)
 
-    # SETTINGS MENU
-    # Create the settings menu where the user can modify the grade level, simulation time, and cell size
-    settings = pygame_menu.Menu('Settings', universal_variables.WINDOW_WIDTH, universal_variables.WINDOW_HEIGHT,
-                                theme=themes.THEME_GREEN)
+        # Add a text input for the cell size, allowing the user to modify the size of each grid cell in the simulation
+        # The default value is set based on the CELL_SIZE variable in universal_variables
+        self.cell_size_selector = self.settings.add.text_input('Cell Size: ',
+                                                               default=str(self.context.cell_size),
+                                                               input_type=pygame_menu.locals.INPUT_INT)
 
-    # Add a selector for grade level, allowing the user to choose between K-2, 3-5, and 6-8
-    # The default value is set based on the current grade level in universal_variables
-    grade_selector = settings.add.selector('Grade Level :', [('K-2', 1), ('3-5', 2), ('6-8', 3)],
-                                           default=universal_variables.GRADE_LEVEL - 1)
+        # Add a selector for the simulation speed: one step per turn, many steps per frame, or straight to the end
+        self.speed_selector = self.settings.add.selector(
+            'Speed :', [(speed, speed) for speed in universal_variables.SPEED_CHOICES],
+            default=universal_variables.SPEED_CHOICES.index(self.context.simulation_speed))
 
-    # Add a text input for the simulation turn time, allowing the user to set how long each simulation turn lasts
-    # The default value is based on the TURN_TIME variable in universal_variables
-    time_selector = settings.add.text_input('Simulation Turn Time: ', default=str(universal_variables.TURN_TIME),
-                                            input_type=pygame_menu.locals.INPUT_FLOAT)
+        # Add a text input for how many steps Fast Forward simulates between redraws
+        self.steps_per_frame_selector = self.settings.add.text_input(
+            'Fast Forward Steps Per Frame: ', default=str(self.context.steps_per_frame),
+            input_type=pygame_menu.locals.INPUT_INT)
 
-    # Add a text input for the cell size, allowing the user to modify the size of each grid cell in the simulation
-    # The default value is set based on the CELL_SIZE variable in universal_variables
-    cell_size_selector = settings.add.text_input('Cell Size: ', default=str(universal_variables.CELL_SIZE),
-                                                 input_type=pygame_menu.locals.INPUT_INT)
+        # PARAMETER MENU
+        # Create the game parameters menu for inputting game settings like grid size and player count
+        self.submenu = pygame_menu.Menu('Game Parameters', universal_variables.WINDOW_WIDTH,
+                                        universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
 
-    # PARAMETER MENU
-    # Create the game parameters menu for inputting game settings like grid size and player count
-    submenu = pygame_menu.Menu('Game Parameters', universal_variables.WINDOW_WIDTH, universal_variables.WINDOW_HEIGHT,
-                               theme=themes.THEME_GREEN)
+        # Add text input for grid width, with a default value of '5' and a maximum of 3 characters
+        self.grid_width_input = self.submenu.add.text_input('Grid Width: ', default='5', maxchar=3,
+                                                            input_type=pygame_menu.locals.INPUT_INT)
 
-    # Add text input for grid width, with a default value of '5' and a maximum of 2 characters
-    grid_width_input = submenu.add.text_input('Grid Width: ', default='5', maxchar=2,
-                                              input_type=pygame_menu.locals.INPUT_INT)
+        # Add text input for grid height, with a default value of '5' and a maximum of 3 characters
+        self.grid_height_input = self.submenu.add.text_input('Grid Height: ', default='5', maxchar=3,
+                                                             input_type=pygame_menu.locals.INPUT_INT)
 
-    # Add text input for grid height, with a default value of '5' and a maximum of 2 characters
-    grid_height_input = submenu.add.text_input('Grid Height: ', default='5', maxchar=2,
-                                               input_type=pygame_menu.locals.INPUT_INT)
+        # Add text input for player count, with a default value of '2' and a maximum of 2 characters
+        self.player_count_input = self.submenu.add.text_input('Player Count: ', default='2', maxchar=2,
+                                                              input_type=pygame_menu.locals.INPUT_INT)
 
-    # Add text input for player count, with a default value of '2' and a maximum of 2 characters
-    player_count_input = submenu.add.text_input('Player Count: ', default='2', maxchar=2,
-                                                input_type=pygame_menu.locals.INPUT_INT)
+        # Add a selector for wandering choice, allowing selection between three options
+        self.wandering_choice = self.submenu.add.selector(
+            'Wandering Choice: ', [('Random', 1), ('Random Valid', 2), ('Biased Unexplored', 3)], default=0)
 
-    # Add a selector for wandering choice, allowing selection between three options
-    wandering_choice = submenu.add.selector('Wandering Choice: ',
-                                            [('Random', 1), ('Random Valid', 2), ('Biased Unexplored', 3)], default=0)
+        # Initially hide the wandering choice selector, as it's not needed for all grade levels
+        self.wandering_choice.hide()
 
-    # Initially hide the wandering choice selector, as it's not needed for all grade levels
-    wandering_choice.hide()
+        # Add a button to continue to the final menu, which will process the inputs and start the game
+        self.submenu.add.button('Continue', self.final_menu_handler)
 
-    # Add a button to continue to the final menu, which will process the inputs and start the game
-    submenu.add.button('Continue', lambda: final_menu_handler())
+        # STATS MENU
+        # Create a separate stats menu to show simulation results like the current run and longest run
+        # Its labels are filled in by refresh_stats each time a run completes
+        self.statsmenu = pygame_menu.Menu('Wandering In The Woods', universal_variables.WINDOW_WIDTH,
+                                          universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
 
-    # STATS MENU
-    # Create a separate stats menu to show simulation results like the current run and longest run
-    statsmenu = pygame_menu.Menu('Wandering In The Woods', universal_variables.WINDOW_WIDTH,
-                                 universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
+        # Display the current run number
+        self.current_run_label = self.statsmenu.add.label('')
 
-    # Display the current run number
-    statsmenu.add.label('Current Run: ' + str(universal_variables.CURRENT_RUN))
+        # Display the longest run without any player meeting
+        self.longest_run_without_meeting_label = self.statsmenu.add.label('')
 
-    # Display the longest run without any player meeting
-    statsmenu.add.label('Longest Run Without Meeting: ' + str(universal_variables.LONGEST_RUN_WITHOUT_MEETING))
+        # Display the longest run time (e.g., how long the simulation lasted)
+        self.longest_run_label = self.statsmenu.add.label('')
 
-    # Display the longest run time (e.g., how long the simulation lasted)
-    statsmenu.add.label('Longest Run: ' + str(universal_variables.LONGEST_RUN))
+        # Display the shortest run time (e.g., how quickly the simulation completed)
+        self.shortest_run_label = self.statsmenu.add.label('')
 
-    # Display the shortest run time (e.g., how quickly the simulation completed)
-    statsmenu.add.label('Shortest Run: ' + str(universal_variables.SHORTEST_RUN))
+        # Display the average run time of all simulations
+        self.average_run_label = self.statsmenu.add.label('')
 
-    # Display the average run time of all simulations
-    statsmenu.add.label('Average Run: ' + str(universal_variables.AVERAGE_RUN))
+        # Display the number of runs completed and the spread of their run times
+        self.aggregate_runs_label = self.statsmenu.add.label('')
+        self.percentiles_label = self.statsmenu.add.label('')
 
-    # Display the total number of runs completed
-    statsmenu.add.label('Aggregate Runs: ' + str(universal_variables.AGGREGATE_RUNS))
+        # Add a button to return to the main menu after the user views stats
+        self.statsmenu.add.button('Return To Main Menu', self.return_to_main_menu)
 
-    # Add a button to return to the main menu after the user views stats
-    statsmenu.add.button('Return To Main Menu', lambda: return_to_main_menu(mainmenu))
+        # Add a button to quit the application
+        self.statsmenu.add.button('Quit', pygame_menu.events.EXIT)
 
-    # Add a button to quit the application
-    statsmenu.add.button('Quit', pygame_menu.events.EXIT)
+        # FINAL MENU
+        self.finalmenu = pygame_menu.Menu('Final Game Parameters', universal_variables.WINDOW_WIDTH,
+                                          universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
 
-    # FINAL MENU
-    finalmenu = pygame_menu.Menu('Final Game Parameters', universal_variables.WINDOW_WIDTH,
-                                 universal_variables.WINDOW_HEIGHT, theme=themes.THEME_GREEN)
+        # Add the player position inputs and the Start Game button, reused by every run
+        self.position_form = PositionForm(self.finalmenu, self.start_game)
 
-    def final_menu_handler():
+    def start_the_game(self):
+        """
+        Starts the game based on the grade level.
+        Starts the game straight away for grade level 1, or opens the parameter submenu otherwise.
+        """
+        if self.context.grade_level == 1:
+            simulation_chooser(self.game)
+            self.next_scene = 'game'
+        elif self.context.grade_level == 2 or self.context.grade_level == 3:
+            self.mainmenu._open(self.submenu)
+
+    def final_menu_handler(self):
         """
         Handles the final game parameter inputs, sets the game parameters, and opens the final menu.
         """
-        universal_variables.GRID_WIDTH = int(grid_width_input.get_value())
-        universal_variables.GRID_HEIGHT = int(grid_height_input.get_value())
-        universal_variables.PLAYER_COUNT = int(player_count_input.get_value())
+        universal_variables.GRID_WIDTH = int(self.grid_width_input.get_value())
+        universal_variables.GRID_HEIGHT = int(self.grid_height_input.get_value())
+        universal_variables.PLAYER_COUNT = int(self.player_count_input.get_value())
 
-        generate_player_position_inputs(finalmenu, universal_variables.PLAYER_COUNT)
+        # Show a row of position inputs per player, reusing the ones of the previous run
+        self.position_form.show(universal_variables.PLAYER_COUNT, universal_variables.GRID_WIDTH,
+                                universal_variables.GRID_HEIGHT)
 
-        mainmenu._open(finalmenu)
+        self.mainmenu._open(self.finalmenu)
 
-        start_game_button = finalmenu.add.button('Start Game', lambda: simulation_chooser(finalmenu))
+    def start_game(self):
+        """
+        Sets up the game from the final menu and switches to it, unless the positions entered cannot be used.
+        """
+        try:
+            positions = self.position_form.positions()
+        except ValueError as e:
+            self.position_form.show_error(str(e))  # Stay on the final menu so the entry can be fixed
+            return
 
-        start_game_button.set_col_row_index(0, universal_variables.PLAYER_COUNT * 2,
-                                            universal_variables.PLAYER_COUNT * 2)
+        self.position_form.show_error('')
+        simulation_chooser(self.game, positions)
+        self.next_scene = 'game'
 
-    def return_to_main_menu(menu):
+    def return_to_main_menu(self):
         """
         Resets the game and returns to the main menu.
+        """
+        self.context.run_complete = False
+        self.mainmenu.full_reset()  # Back to the first page rather than the menu the last run was started from
+        self.mainmenu.enable()
 
-        Args:
-            menu: The main menu to return to.
+    def refresh_stats(self):
+        """
+        Updates the stats menu labels with the latest statistics.
+        """
+        run_statistics = self.context.run_statistics
+        self.current_run_label.set_title('Current Run: ' + str(self.context.current_run))
+        self.longest_run_without_meeting_label.set_title(
+            'Longest Run Without Meeting: ' + str(self.context.longest_run_without_meeting))
+        self.longest_run_label.set_title('Longest Run: ' + str(self.context.longest_run))
+        self.shortest_run_label.set_title('Shortest Run: ' + str(self.context.shortest_run))
+        self.average_run_label.set_title('Average Run: ' + str(self.context.average_run))
+        self.aggregate_runs_label.set_title('Aggregate Runs: ' + str(run_statistics.count))
+
+        if run_statistics.count:
+            self.percentiles_label.set_title('Median: {} | 90th: {} | 99th: {}'.format(
+                run_statistics.quantile(0.5), run_statistics.quantile(0.9), run_statistics.quantile(0.99)))
+            self.percentiles_label.show()
+        else:
+            self.percentiles_label.hide()
+
+    def enter(self):
+        """
+        Restores the menu window after a run. Called by the scene manager when the menus are switched to.
         """
-        universal_variables.RUN_COMPLETE = False
-        menu.enable()
+        # The game resizes the window to fit the grid
+        size = (universal_variables.WINDOW_WIDTH, universal_variables.WINDOW_HEIGHT)
+        screen = pygame.display.get_surface()
+        if screen is None or screen.get_size() != size:
+            pygame.display.set_mode(size)
+        pygame.display.set_caption("Wandering in the Woods")
 
-    while True:
-        events = pygame.event.get()  # Get all the events in the event queue
+        if self.context.run_complete:
+            self.refresh_stats()
+
+    def timeout(self):
+        """
+        Returns how long the menus may sleep for input.
+
+        Returns:
+            int: Milliseconds to wait, waking up now and then to redraw blinking cursors.
+        """
+        return universal_variables.IDLE_TIMEOUT
+
+    def frame(self, events):
+        """
+        Handles the input of one frame and draws the current menu.
+
+        Args:
+            events: The pygame events received since the last frame.
+
+        Returns:
+            str: 'game' once a run was started, otherwise None.
+        """
+        start = time.perf_counter()
 
         # Limit the values of the input fields to ensure they stay within acceptable ranges.
         # These checks are done each time the user interacts with the fields.
-        if time_selector.get_selected_time() == 0:
+        if self.time_selector.get_selected_time() == 0:
             # Ensures the time input stays within the range 0 to 10
-            utilities.limit_input_value(time_selector.get_value(), time_selector, 0, 10)
-        if cell_size_selector.get_selected_time() == 0:
+            utilities.limit_input_value(self.time_selector.get_value(), self.time_selector, 0, 10)
+        if self.cell_size_selector.get_selected_time() == 0:
             # Ensures the cell size input stays within the range 10 to 100
-            utilities.limit_input_value(cell_size_selector.get_value(), cell_size_selector, 10, 100)
-        if grid_width_input.get_selected_time() == 0:
-            # Ensures the grid width input stays within the range 2 to 25
-            utilities.limit_input_value(grid_width_input.get_value(), grid_width_input, 2, 25)
-        if grid_height_input.get_selected_time() == 0:
-            # Ensures the grid height input stays within the range 2 to 25
-            utilities.limit_input_value(grid_height_input.get_value(), grid_height_input, 2, 25)
-        if player_count_input.get_selected_time() == 0:
-            # Ensures the player count input stays within the range 2 to 16
-            utilities.limit_input_value(player_count_input.get_value(), player_count_input, 2, 16)
-
-        for event in events:  # Process each event in the event queue
+            utilities.limit_input_value(self.cell_size_selector.get_value(), self.cell_size_selector, 10, 100)
+        if self.steps_per_frame_selector.get_selected_time() == 0:
+            # Ensures the steps per frame input stays within the range 1 to 10000
+            utilities.limit_input_value(self.steps_per_frame_selector.get_value(), self.steps_per_frame_selector, 1,
+                                        10000)
+        if self.grid_width_input.get_selected_time() == 0:
+            # Ensures the grid width input stays within the range 2 to MAX_GRID_SIZE
+            utilities.limit_input_value(self.grid_width_input.get_value(), self.grid_width_input, 2,
+                                        universal_variables.MAX_GRID_SIZE)
+        if self.grid_height_input.get_selected_time() == 0:
+            # Ensures the grid height input stays within the range 2 to MAX_GRID_SIZE
+            utilities.limit_input_value(self.grid_height_input.get_value(), self.grid_height_input, 2,
+                                        universal_variables.MAX_GRID_SIZE)
+        if self.player_count_input.get_selected_time() == 0:
+            # Ensures the player count input stays within the range 2 to MAX_PLAYER_COUNT
+            utilities.limit_input_value(self.player_count_input.get_value(), self.player_count_input, 2,
+                                        universal_variables.MAX_PLAYER_COUNT)
+
+        if events:
             # Update the global variables based on the user's input in the settings menu
-            universal_variables.GRADE_LEVEL = grade_selector.get_value()[1] + 1  # Update the grade level
-            universal_variables.TURN_TIME = time_selector.get_value()  # Update the turn time
-            universal_variables.CELL_SIZE = cell_size_selector.get_value()  # Update the cell size
-            universal_variables.WANDERING_CHOICE = wandering_choice.get_value()[0][0]  # Update the wandering choice
+            self.context.grade_level = self.grade_selector.get_value()[1] + 1  # Update the grade level
+            self.context.turn_time = self.time_selector.get_value()  # Update the turn time
+            self.context.cell_size = self.cell_size_selector.get_value()  # Update the cell size
+            self.context.simulation_speed = self.speed_selector.get_value()[0][0]  # Update the simulation speed
+            self.context.steps_per_frame = self.steps_per_frame_selector.get_value()  # Update fast forward rate
+            self.context.wandering_choice = self.wandering_choice.get_value()[0][0]  # Update wandering choice
 
             # Display or hide the wandering choice based on the selected grade level
-            if universal_variables.GRADE_LEVEL == 3:
-                wandering_choice.show()  # Show wandering choice for grade 3
+            if self.context.grade_level == 3:
+                self.wandering_choice.show()  # Show wandering choice for grade 3
             else:
-                wandering_choice.hide()  # Hide wandering choice for other grades
-
-            if event.type == pygame.QUIT:  # Check if the user has closed the window
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-                exit()  # Exit the game if the window is closed
+                self.wandering_choice.hide()  # Hide wandering choice for other grades
 
         # Update the menu based on the current state
-        if universal_variables.RUN_COMPLETE:  # If a simulation run was completed, show stats
-            statsmenu.update(events)  # Update the stats menu
-            statsmenu.draw(screen)  # Draw the stats menu on the screen
+        screen = pygame.display.get_surface()
+        handled = updated = drawn = time.perf_counter()
+        PROFILER.record('events', start, handled, events=len(events))
+        if self.context.run_complete:  # If a simulation run was completed, show stats
+            self.statsmenu.update(events)  # Update the stats menu
+            updated = time.perf_counter()
+            self.statsmenu.draw(screen)  # Draw the stats menu on the screen
+            drawn = time.perf_counter()
         else:  # Otherwise, show the main menu
-            if mainmenu.is_enabled():
+            if self.mainmenu.is_enabled():
                 try:
-                    mainmenu.update(events)  # Update the main menu with current events
-                    mainmenu.draw(screen)  # Draw the main menu on the screen
+                    self.mainmenu.update(events)  # Update the main menu with current events
+                    updated = time.perf_counter()
+                    self.mainmenu.draw(screen)  # Draw the main menu on the screen
+                    drawn = time.perf_counter()
                 except pygame.error as e:
-                    pass
+                    updated = drawn = time.perf_counter()  # Count a failed frame as updating
+        PROFILER.record('menu_update', handled, updated)
+        PROFILER.record('menu_draw', updated, drawn)
 
         pygame.display.update()  # Update the display to show any changes made in the loop
+        PROFILER.record('display', drawn, time.perf_counter())
+
+        # A button may have started a run during the update
+        next_scene, self.next_scene = self.next_scene, None
+        return next_scene
+
+
+def main_menu():
+    """
+    Builds the menus and the game once and runs them until the window is closed.
+    The scene manager switches between the menus and the game without nesting their loops.
+    """
+    # Set up the screen for the game window using the dimensions from universal_variables
+    pygame.display.set_mode((universal_variables.WINDOW_WIDTH, universal_variables.WINDOW_HEIGHT))
+
+    # One game scene, reset for every run
+    game = Game(universal_variables.GRID_WIDTH, universal_variables.GRID_HEIGHT, universal_variables.PLAYER_COUNT)
+    manager = SceneManager({'menu': MenuScene(game), 'game': game})
+    manager.run('menu')
+
+    # The window was closed
+    pygame.display.quit()
+    pygame.quit()
 
 
 # Run the main menu
 if __name__ == "__main__":
-    background_music.play(-1)  # -1 means loop the music indefinitely
+    pygame.init()  # Initialize pygame
+    assets.play_music('music.wav')  # Streamed and looped indefinitely
     try:
         main_menu()
     except pygame.error as e:
@@ -0,0 +1,181 @@
+"""
+Simulation context module defining the SimulationContext class.
+
+The movement, grouping and drawing code used to read its settings from, and
+write its statistics to, the module globals in universal_variables, so two
+simulations in one process would overwrite each other's statistics. Each of
+them now takes a SimulationContext holding the settings and statistics of one
+simulation, so any number of simulations can run side by side, e.g. in
+threads or a split-screen view.
+
+Code that does not pass a context gets DEFAULT_CONTEXT, which reads and writes
+the universal_variables globals themselves, so the menus and anything else
+still setting those keep working unchanged.
+"""
+
+import random
+
+import universal_variables
+from run_statistics import RunStatistics
+
+# Settings a context copies from universal_variables when created, and the global each one stands for
+SETTINGS = {
+    'grade_level': 'GRADE_LEVEL',
+    'wandering_choice': 'WANDERING_CHOICE',
+    'memory_limit': 'MEMORY_LIMIT',
+    'cell_size': 'CELL_SIZE',
+    'simulation_speed': 'SIMULATION_SPEED',
+    'turn_time': 'TURN_TIME',
+    'steps_per_frame': 'STEPS_PER_FRAME',
+    'run_log_path': 'RUN_LOG_PATH',
+}
+
+# Statistics a context keeps, and the global each one stands for
+STATISTICS = {
+    'run_complete': 'RUN_COMPLETE',
+    'longest_run_without_meeting': 'LONGEST_RUN_WITHOUT_MEETING',
+    'longest_run': 'LONGEST_RUN',
+    'shortest_run': 'SHORTEST_RUN',
+    'average_run': 'AVERAGE_RUN',
+    'current_run': 'CURRENT_RUN',
+    'current_run_longest_without_meeting': 'CURRENT_RUN_LONGEST_WITHOUT_MEETING',
+    'run_statistics': 'RUN_STATISTICS',
+}
+
+# Every global a context stands for, by context attribute
+GLOBAL_NAMES = {**SETTINGS, **STATISTICS}
+
+
+class SimulationContext:
+    """
+    A class holding the settings and statistics of one simulation.
+
+    Attributes:
+        grade_level (int): The grade level played (1 = K-2 | 2 = 3-5 | 3 = 6-8).
+        wandering_choice (str): How the players wander, one of batch_runner.WANDERING_CHOICES.
+        memory_limit (int): The number of recently visited cells a Biased Unexplored leader avoids.
+        cell_size (int): The size of a grid cell on screen, in pixels.
+        simulation_speed (str): How quickly the game steps the simulation, one of universal_variables.SPEED_CHOICES.
+        turn_time (float): The time between steps at Normal speed, in seconds.
+        steps_per_frame (int): The number of steps simulated between frames in Fast Forward.
+        run_log_path (str): The run log completed runs are appended to, or None to log nothing.
+        rng (random.Random): The random number generator moving the players.
+        run_complete (bool): Whether a run has just been completed.
+        longest_run_without_meeting (int): The most steps any player went without meeting somebody.
+        longest_run (int): The step count of the longest run (-1 before the first run).
+        shortest_run (int): The step count of the shortest run (-1 before the first run).
+        average_run (float): The average step count of the runs.
+        current_run (int): The step count of the last run.
+        current_run_longest_without_meeting (int): The most steps any player went without meeting somebody
+                                                   in the current run.
+        run_statistics (RunStatistics): The step counts of every run.
+    """
+
+    def __init__(self, seed=None, **settings):
+        """
+        Initializes a SimulationContext instance with empty statistics.
+
+        Args:
+            seed (int): Optional seed for the context's random number generator.
+            **settings: Values for any of the settings in SETTINGS, e.g. wandering_choice='Random';
+                        the others are copied from universal_variables.
+        """
+        unknown = settings.keys() - SETTINGS.keys()
+        if unknown:
+            raise TypeError('Unrecognized simulation settings: ' + ', '.join(sorted(unknown)))
+        for name, global_name in SETTINGS.items():
+            setattr(self, name, settings.get(name, getattr(universal_variables, global_name)))
+
+        self.rng = random.Random(seed)  # Private generator, so simulations never disturb each other's moves
+
+        self.run_complete = False
+        self.longest_run_without_meeting = 0
+        self.longest_run = -1
+        self.shortest_run = -1
+        self.average_run = 0
+        self.current_run = 0
+        self.current_run_longest_without_meeting = 0
+        self.run_statistics = RunStatistics()
+
+    def start_run(self):
+        """
+        Forgets the statistics of the previous run before a new one starts.
+        """
+        self.current_run_longest_without_meeting = 0
+
+    def record_meeting(self, move_count):
+        """
+        Records how long a player went without meeting somebody.
+
+        Args:
+            move_count (int): The number of steps the player wandered alone.
+        """
+        if move_count > self.current_run_longest_without_meeting:
+            self.current_run_longest_without_meeting = move_count
+        if move_count > self.longest_run_without_meeting:
+            self.longest_run_without_meeting = move_count
+
+    def record_run(self, steps):
+        """
+        Adds a completed run to the statistics.
+
+        Args:
+            steps (int): The number of steps until everybody met.
+        """
+        self.current_run = steps
+        run_statistics = self.run_statistics
+        run_statistics.add(steps)  # O(1) update, no list of every run
+
+        # Update shortest, longest and average run stats
+        self.shortest_run = run_statistics.minimum
+        self.longest_run = run_statistics.maximum
+        self.average_run = round(run_statistics.mean, 2)
+
+
+class GlobalContext(SimulationContext):
+    """
+    The context of code that does not pass one: its settings and statistics are the universal_variables globals.
+
+    Attributes:
+        rng (module): The random module, so seeding it still makes the game reproducible.
+    """
+
+    rng = random
+
+    def __init__(self):
+        """
+        Initializes the GlobalContext. It stores nothing itself.
+        """
+
+    def __getattr__(self, name):
+        """
+        Reads a setting or statistic from its universal_variables global.
+
+        Python only calls this for attributes the context does not have itself, i.e. every setting and statistic.
+
+        Args:
+            name (str): The context attribute, e.g. 'wandering_choice'.
+
+        Returns:
+            object: The value of the matching global, e.g. universal_variables.WANDERING_CHOICE.
+        """
+        try:
+            return getattr(universal_variables, GLOBAL_NAMES[name])
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+
+    def __setattr__(self, name, value):
+        """
+        Writes a setting or statistic to its universal_variables global, so the menus see the change.
+
+        Args:
+            name (str): The context attribute, e.g. 'longest_run'.
+            value (object): The new value.
+        """
+        if name not in GLOBAL_NAMES:
+            raise AttributeError(f"{type(self).__name__!r} object has no setting or statistic {name!r}")
+        setattr(universal_variables, GLOBAL_NAMES[name], value)
+
+
+# The context used wherever none is passed
+DEFAULT_CONTEXT = GlobalContext()
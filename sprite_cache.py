@@ -0,0 +1,29 @@
+"""
+Sprite cache module for pre-rendered player circles.
+
+Players and groups are all drawn as the same filled circle, differing only in
+color and cell size. Rather than rasterizing a new circle with
+pygame.draw.circle for every player on every frame, each (color, cell size)
+pair is rendered once onto a small transparent surface that is then blitted.
+"""
+
+from functools import lru_cache
+
+import pygame
+
+
+@lru_cache(maxsize=256)
+def circle_sprite(color, cell_size):
+    """
+    Returns the circle drawn for a player or group, rendering it on first use.
+
+    Args:
+        color (tuple): The RGB color of the circle.
+        cell_size (int): The size of a grid cell, in pixels.
+
+    Returns:
+        pygame.Surface: A transparent cell-sized surface with the circle centered on it.
+    """
+    sprite = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)  # Fully transparent to start with
+    pygame.draw.circle(sprite, color, (cell_size // 2, cell_size // 2), cell_size // 3)
+    return sprite
@@ -0,0 +1,375 @@
+"""
+Sweep module for running batches over a grid of setups, with an on-disk result cache.
+
+A sweep spec lists the values to try for each parameter:
+
+    {
+        "grid_width": [5, 10, 20],
+        "grid_height": [5, 10, 20],
+        "player_count": [2, 4, 8],
+        "layout": ["diagonal", "corners", "random"],
+        "wandering_choice": ["Random", "Random Valid", "Biased Unexplored"],
+        "memory_limit": [3, 5],
+        "trials": 1000,
+        "seed": 0,
+        "max_steps": 100000
+    }
+
+Every combination becomes a job, a batch of trials run by batch_runner. A
+layout is one of the names in LAYOUTS or an explicit list of [x, y] starting
+positions (which then sets the player count). A single value may be given
+instead of a list, and any parameter left out takes its DEFAULTS value.
+
+The summary of every finished job is stored in a SQLite cache, keyed by a hash
+of everything the job's results depend on: its parameters, its seed and
+batch_runner.ENGINE_VERSION. Running a sweep again, after a crash or with more
+cells added to the spec, only runs the jobs missing from the cache.
+
+Run a sweep from the command line with
+
+    python sweep.py spec.json --workers 4 --output results.jsonl
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import batch_runner
+
+# Cache used when no other path is given
+DEFAULT_CACHE_PATH = 'sweep_cache.sqlite'
+
+# Values of the parameters a spec leaves out
+DEFAULTS = {
+    'grid_width': [10],
+    'grid_height': [10],
+    'player_count': [2],
+    'layout': ['diagonal'],
+    'wandering_choice': ['Random'],
+    'memory_limit': [5],
+    'trials': 1000,
+    'seed': 0,
+    'max_steps': None,
+}
+
+# Parameters a sweep runs every combination of
+AXES = ('grid_width', 'grid_height', 'player_count', 'layout', 'wandering_choice', 'memory_limit')
+
+
+def diagonal_layout(grid_width, grid_height, player_count, rng):
+    """
+    Spreads the players along the diagonal, like grade levels 2 and 3 of the game.
+    """
+    return batch_runner.default_positions(grid_width, grid_height, player_count)
+
+
+def corners_layout(grid_width, grid_height, player_count, rng):
+    """
+    Puts the players in the corners of the grid, opposite corners first, like grade level 1 of the game.
+    """
+    corners = [(0, 0), (grid_width - 1, grid_height - 1), (grid_width - 1, 0), (0, grid_height - 1)]
+    return [corners[i % 4] for i in range(player_count)]
+
+
+def random_layout(grid_width, grid_height, player_count, rng):
+    """
+    Puts the players on distinct random cells (or random cells, if there are more players than cells).
+    """
+    cell_count = grid_width * grid_height
+    if player_count <= cell_count:
+        cells = rng.sample(range(cell_count), player_count)
+    else:
+        cells = [rng.randrange(cell_count) for _ in range(player_count)]
+    return [(cell % grid_width, cell // grid_width) for cell in cells]
+
+
+# Named start layouts: each takes the grid width and height, the player count and a random.Random
+LAYOUTS = {
+    'diagonal': diagonal_layout,
+    'corners': corners_layout,
+    'random': random_layout,
+}
+
+
+def digest(value):
+    """
+    Hashes a JSON-serializable value, independent of the order of its dict keys.
+
+    Args:
+        value: The value to hash.
+
+    Returns:
+        str: The SHA-256 hex digest of the value's canonical JSON.
+    """
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def expand_jobs(spec):
+    """
+    Expands a sweep spec into one job per distinct setup.
+
+    Setups that cannot differ are merged: memory_limit only matters to Biased
+    Unexplored, and an explicit layout fixes the player count.
+
+    Args:
+        spec (dict): The values of each parameter, as described in the module docstring.
+
+    Returns:
+        list of tuple: The (key, params) of each job, in spec order. params holds everything run_job needs;
+                       key is the hash its results are cached under.
+    """
+    unknown = spec.keys() - DEFAULTS.keys()
+    if unknown:
+        raise ValueError('Unrecognized sweep parameters: ' + ', '.join(sorted(unknown)))
+    spec = {**DEFAULTS, **spec}
+
+    axes = []
+    for name in AXES:
+        values = spec[name]
+        single_layout = name == 'layout' and isinstance(values, list) and values and isinstance(values[0], list) \
+            and values[0] and isinstance(values[0][0], int)
+        if not isinstance(values, list) or single_layout:
+            values = [values]  # A single value, including a single list of positions
+        axes.append(values)
+
+    jobs = {}
+    for grid_width, grid_height, player_count, layout, wandering_choice, memory_limit in itertools.product(*axes):
+        if wandering_choice not in batch_runner.WANDERING_CHOICES:
+            raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+
+        setup = {'grid_width': grid_width, 'grid_height': grid_height,
+                 'layout': layout if isinstance(layout, str) else 'explicit',
+                 'wandering_choice': wandering_choice,
+                 'memory_limit': memory_limit if wandering_choice == 'Biased Unexplored' else None,
+                 'trials': spec['trials'], 'max_steps': spec['max_steps']}
+
+        # Each job gets its own seed, so its results do not depend on which other jobs are in the sweep
+        if isinstance(layout, str):
+            if layout not in LAYOUTS:
+                raise ValueError('Unrecognized layout: ' + layout)
+            layout_rng = random.Random(f"{spec['seed']}-layout-{grid_width}x{grid_height}-{player_count}")
+            positions = LAYOUTS[layout](grid_width, grid_height, player_count, layout_rng)
+        elif isinstance(layout, list):
+            positions = [tuple(position) for position in layout]
+        else:
+            raise ValueError('A layout must be a layout name or a list of [x, y] positions, not ' + repr(layout))
+        for x, y in positions:
+            if not (0 <= x < grid_width and 0 <= y < grid_height):
+                raise ValueError(f'Starting position ({x}, {y}) is outside the {grid_width}x{grid_height} grid')
+        setup.update(player_count=len(positions), positions=[list(position) for position in positions])
+        setup['seed'] = f"{spec['seed']}-{digest(setup)}"
+
+        key = digest({'params': setup, 'engine_version': batch_runner.ENGINE_VERSION})
+        jobs.setdefault(key, setup)
+
+    return list(jobs.items())
+
+
+def run_job(params):
+    """
+    Runs the batch of one job. Executed inside the worker processes.
+
+    Args:
+        params (dict): The job's parameters, from expand_jobs.
+
+    Returns:
+        dict: The batch_runner.BatchResult.summary of the job, with 'never_meet' set (and no trials run)
+              when the players can never all meet.
+    """
+    positions = [tuple(position) for position in params['positions']]
+    if not batch_runner.can_meet(params['grid_width'], params['grid_height'], positions, params['wandering_choice']):
+        return {'trials': 0, 'completed': 0, 'longest_run_without_meeting': 0, 'never_meet': True}
+
+    result = batch_runner.run_batch(params['grid_width'], params['grid_height'], positions,
+                                    params['wandering_choice'], params['trials'], params['seed'],
+                                    5 if params['memory_limit'] is None else params['memory_limit'],
+                                    params['max_steps'])
+    return result.summary()
+
+
+class ResultCache:
+    """
+    A class storing job summaries in a SQLite database, keyed by the job's hash.
+
+    Every result is committed as soon as it is stored, so an interrupted sweep loses at most the jobs in progress.
+
+    Attributes:
+        path (str): The path of the database.
+        connection (sqlite3.Connection): The open database.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        """
+        Initializes a ResultCache instance, creating the database if it does not exist yet.
+
+        Args:
+            path (str): The path of the database.
+        """
+        self.path = path  # Set database path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')  # Readers never wait for a sweep that is writing
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, params TEXT NOT NULL, '
+                                'summary TEXT NOT NULL, seconds REAL NOT NULL, created REAL NOT NULL)')
+        self.connection.commit()
+
+    def get_many(self, keys):
+        """
+        Looks up the cached summaries of many jobs at once.
+
+        Args:
+            keys (list): The keys of the jobs.
+
+        Returns:
+            dict: Maps the key of each cached job to its summary; jobs not in the cache are left out.
+        """
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), 500):  # Stay under SQLite's limit on query parameters
+            chunk = keys[start:start + 500]
+            rows = self.connection.execute(f"SELECT key, summary FROM results WHERE key IN "
+                                           f"({', '.join('?' * len(chunk))})", chunk)
+            found.update((key, json.loads(summary)) for key, summary in rows)
+        return found
+
+    def put(self, key, params, summary, seconds):
+        """
+        Stores the summary of a finished job.
+
+        Args:
+            key (str): The key of the job.
+            params (dict): The job's parameters, kept for reading the cache by hand.
+            summary (dict): The job's summary.
+            seconds (float): The time the job took to run.
+        """
+        with self.connection:  # Commits
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                                    (key, json.dumps(params, sort_keys=True), json.dumps(summary), seconds,
+                                     time.time()))
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def timed_job(params):
+    """
+    Runs a job and measures how long it took. Executed inside the worker processes.
+
+    Args:
+        params (dict): The job's parameters, from expand_jobs.
+
+    Returns:
+        tuple: (summary, seconds).
+    """
+    start = time.perf_counter()
+    summary = run_job(params)
+    return summary, time.perf_counter() - start
+
+
+def run_sweep(spec, cache_path=DEFAULT_CACHE_PATH, workers=1, on_result=None):
+    """
+    Runs every job of a sweep that is not cached yet, caching each one as it finishes.
+
+    Args:
+        spec (dict): The values of each parameter, as described in the module docstring.
+        cache_path (str): The path of the result cache.
+        workers (int): The number of worker processes (None for every core; 1 runs in-process).
+        on_result (callable): Optional callback taking (params, summary, cached) for each job as its summary
+                              becomes available, cached ones first.
+
+    Returns:
+        list of tuple: The (params, summary) of every job, in spec order.
+    """
+    jobs = expand_jobs(spec)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with ResultCache(cache_path) as cache:
+        summaries = cache.get_many(key for key, _ in jobs)
+        missing = [(key, params) for key, params in jobs if key not in summaries]
+        if on_result is not None:
+            for key, params in jobs:
+                if key in summaries:
+                    on_result(params, summaries[key], True)
+
+        def finish(key, params, summary, seconds):
+            cache.put(key, params, summary, seconds)
+            summaries[key] = summary
+            if on_result is not None:
+                on_result(params, summary, False)
+
+        if workers == 1 or len(missing) <= 1:
+            for key, params in missing:
+                finish(key, params, *timed_job(params))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+                # Store each job as soon as it finishes, whatever order they finish in
+                futures = {executor.submit(timed_job, params): (key, params) for key, params in missing}
+                for future in as_completed(futures):
+                    finish(*futures[future], *future.result())
+
+    return [(params, summaries[key]) for key, params in jobs]
+
+
+def main(argv=None):
+    """
+    Runs the sweep in a spec file and writes one JSON line per job.
+
+    Args:
+        argv (list): Optional arguments to parse instead of sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(description='Run a parameter sweep, reusing cached results.')
+    parser.add_argument('spec', help='JSON file with the values of each parameter')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='result cache (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 for every core (default: 1)')
+    parser.add_argument('--output', help='file to write the results to as JSON lines (default: stdout)')
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as file:
+        spec = json.load(file)
+    try:
+        job_count = len(expand_jobs(spec))
+    except ValueError as e:
+        parser.error(str(e))
+
+    done = []
+
+    def progress(params, summary, cached):
+        done.append(cached)
+        if not cached:
+            print(f'[{len(done)}/{job_count}] {params["grid_width"]}x{params["grid_height"]} '
+                  f'{params["player_count"]}p {params["layout"]} {params["wandering_choice"]}', file=sys.stderr)
+
+    results = run_sweep(spec, args.cache, args.workers or None, progress)
+    print(f'{job_count} jobs: {sum(done)} cached, {job_count - sum(done)} run', file=sys.stderr)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for params, summary in results:
+            output.write(json.dumps({**params, **summary}) + '\n')
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: the modules live at the top of the repository, so make them importable from the tests.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
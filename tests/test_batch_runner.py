@@ -0,0 +1,50 @@
+"""
+Tests for the headless batch runner.
+"""
+
+import random
+
+import pytest
+
+import batch_runner
+
+
+def test_can_meet_checks_parity_on_a_checkerboard():
+    assert not batch_runner.can_meet(5, 5, [(0, 0), (0, 1)], 'Random Valid')
+    assert not batch_runner.can_meet(5, 5, [(0, 0), (0, 1)], 'Biased Unexplored')
+    assert batch_runner.can_meet(5, 5, [(0, 0), (1, 1)], 'Random Valid')
+    assert batch_runner.can_meet(5, 5, [(0, 0), (0, 1)], 'Random')
+
+
+def test_random_valid_can_meet_on_a_single_column_or_row():
+    # Moves into the side walls leave a group in place, so parity is not preserved
+    for width, height, positions in ((1, 5, [(0, 0), (0, 1)]), (5, 1, [(0, 0), (1, 0)])):
+        assert batch_runner.can_meet(width, height, positions, 'Random Valid')
+        rng = random.Random(1)
+        for _ in range(20):
+            steps, _ = batch_runner.run_trial(width, height, positions, 'Random Valid', rng, max_steps=10000)
+            assert steps > 0
+
+
+@pytest.mark.parametrize('wandering_choice', batch_runner.WANDERING_CHOICES)
+def test_players_on_a_single_cell_grid_meet_at_once(wandering_choice):
+    assert batch_runner.run_trial(1, 1, [(0, 0), (0, 0)], wandering_choice, random.Random(0)) == (1, 1)
+
+
+def test_parse_positions_reads_whitespace_separated_pairs():
+    assert batch_runner.parse_positions(' 0,0\t4,4\n2,3 ') == [(0, 0), (4, 4), (2, 3)]
+    assert batch_runner.parse_positions('') == []
+
+
+@pytest.mark.parametrize('text', ['0,0 banana 9,9', '1,2,3', '12, 2', '(1,2)', '1.5,2'])
+def test_parse_positions_rejects_malformed_tokens(text):
+    with pytest.raises(ValueError, match='is not an "x,y" position'):
+        batch_runner.parse_positions(text)
+
+
+def test_parse_positions_checks_the_grid_when_given():
+    assert batch_runner.parse_positions('-3,4') == [(-3, 4)]  # Read as written, not as (3, 4)
+    with pytest.raises(ValueError, match='outside the 9x7 grid'):
+        batch_runner.parse_positions('-3,4', 9, 7)
+    with pytest.raises(ValueError, match='outside the 9x7 grid'):
+        batch_runner.parse_positions('0,0 9,0', 9, 7)
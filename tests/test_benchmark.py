@@ -0,0 +1,36 @@
+"""
+Tests for comparing benchmark results against a baseline.
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # benchmark renders through pygame
+
+import benchmark  # noqa: E402
+
+BASELINE = {
+    'movement': {'steps_per_second': 1000.0, 'seconds': 2.0, 'grouping_share': 0.5},
+    'render': {'seconds': 1.0},
+}
+
+
+def test_results_within_the_threshold_pass():
+    results = {'movement': {'steps_per_second': 900.0, 'seconds': 2.2, 'grouping_share': 0.5},
+               'render': {'seconds': 0.5}}
+    assert benchmark.find_regressions(results, BASELINE, threshold=0.2) == []
+
+
+def test_slower_rates_and_longer_times_are_reported():
+    results = {'movement': {'steps_per_second': 500.0, 'seconds': 2.0, 'grouping_share': 0.5},
+               'render': {'seconds': 1.5}}
+    regressions = benchmark.find_regressions(results, BASELINE, threshold=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('movement steps_per_second')
+    assert regressions[1].startswith('render seconds')
+    assert all('worse' in regression for regression in regressions)
+
+
+def test_shares_and_new_cases_are_skipped():
+    results = {'movement': {'steps_per_second': 1000.0, 'seconds': 2.0, 'grouping_share': 0.95},
+               'sweep': {'seconds': 100.0}}
+    assert benchmark.find_regressions(results, BASELINE, threshold=0.2) == []
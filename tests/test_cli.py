@@ -0,0 +1,39 @@
+"""
+Tests for the command-line runner.
+"""
+
+import argparse
+import json
+
+import pytest
+
+import cli
+
+
+def test_parse_positions_rejects_junk_and_empty_input():
+    assert cli.parse_positions('0,0 9,9') == [(0, 0), (9, 9)]
+    for text in ('0,0 banana 9,9', '   '):
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli.parse_positions(text)
+
+
+@pytest.mark.parametrize('argv', [
+    ['--positions=-1,0 9,9'],  # Off the grid, not (1, 0)
+    ['--grade', '1', '--width', '4', '--height', '5', '--strategy', 'Random Valid'],  # Can never meet
+    ['--players', '3', '--positions', '0,0 2,2'],
+])
+def test_main_rejects_setups_before_streaming(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(argv + ['--trials', '3'])
+    assert exit_info.value.code == 2
+    assert capsys.readouterr().out == ''
+
+
+def test_main_streams_one_line_per_trial(capsys):
+    assert cli.main(['--width', '1', '--height', '5', '--positions', '0,0 0,1', '--strategy', 'Random Valid',
+                     '--trials', '4', '--seed', '1', '--summary']) == 0
+    output = capsys.readouterr()
+    lines = [json.loads(line) for line in output.out.splitlines()]
+    assert [line['trial'] for line in lines] == [0, 1, 2, 3]
+    assert all(line['steps'] > 0 for line in lines)
+    assert json.loads(output.err)['trials'] == 4
@@ -0,0 +1,32 @@
+"""
+Tests for the precomputed move tables.
+"""
+
+import grid_adjacency
+
+UP, DOWN, LEFT, RIGHT = range(4)
+
+
+def test_blocked_moves_stay_put_or_bounce():
+    adjacency = grid_adjacency.GridAdjacency(3, 2)
+    corner = 0  # (0, 0)
+    assert adjacency.clamped[corner * 4 + UP] == corner
+    assert adjacency.reflected[corner * 4 + UP] == 3  # Bounces down to (0, 1)
+    assert adjacency.reflected[corner * 4 + LEFT] == 1  # Bounces right to (1, 0)
+    assert adjacency.clamped[corner * 4 + RIGHT] == adjacency.reflected[corner * 4 + RIGHT] == 1
+
+
+def test_single_column_has_no_room_to_bounce_sideways():
+    adjacency = grid_adjacency.GridAdjacency(1, 3)
+    for cell in range(3):
+        assert adjacency.reflected[cell * 4 + LEFT] == cell
+        assert adjacency.reflected[cell * 4 + RIGHT] == cell
+
+
+def test_neighbours_and_masks_list_the_in_bounds_moves():
+    adjacency = grid_adjacency.GridAdjacency(3, 3)
+    assert list(adjacency.neighbours(4)) == [1, 7, 3, 5]  # Centre: up, down, left, right
+    assert list(adjacency.neighbours(0)) == [3, 1]  # Corner: down, right
+    assert adjacency.valid_masks[4] == 0b1111
+    assert adjacency.valid_masks[0] == 0b1010
+    assert list(grid_adjacency.GridAdjacency(1, 1).neighbours(0)) == []
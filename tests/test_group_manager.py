@@ -0,0 +1,21 @@
+"""
+Tests for the in-game movement and grouping of players.
+"""
+
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Person loads sprites through pygame
+
+import group_manager  # noqa: E402
+import universal_variables  # noqa: E402
+from person import Person  # noqa: E402
+from simulation_context import SimulationContext  # noqa: E402
+
+
+def test_biased_group_stays_put_on_a_single_cell_grid():
+    people = [Person(0, 0, universal_variables.PLAYER_COLORS[0], 1),
+              Person(0, 0, universal_variables.PLAYER_COLORS[1], 2)]
+    group_manager.move_groups_biased(people, 1, 1, rng=random.Random(0))
+    assert [(person.x, person.y) for person in people] == [(0, 0), (0, 0)]
+    assert group_manager.update_groups(people, context=SimulationContext())
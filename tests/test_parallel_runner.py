@@ -0,0 +1,19 @@
+"""
+Tests for the multi-process batch runner.
+"""
+
+import parallel_runner
+
+
+def test_empty_batch_returns_an_empty_result():
+    result = parallel_runner.run_batch_parallel(5, 5, [(0, 0), (2, 2)], 'Random', 0, seed=1, workers=4)
+    assert result.trials == 0
+    assert result.steps == []
+
+
+def test_seeded_batch_does_not_depend_on_the_worker_count():
+    arguments = (5, 5, [(0, 0), (2, 2)], 'Random Valid', 50)
+    serial = parallel_runner.run_batch_parallel(*arguments, seed=3, workers=1, chunk_size=10)
+    parallel = parallel_runner.run_batch_parallel(*arguments, seed=3, workers=2, chunk_size=10)
+    assert parallel.steps == serial.steps
+    assert parallel.longest_runs == serial.longest_runs
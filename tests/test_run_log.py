@@ -0,0 +1,59 @@
+"""
+Tests for writing run logs and reading them back.
+"""
+
+import pytest
+
+import batch_runner
+import run_log
+
+run_log_analytics = pytest.importorskip('run_log_analytics')
+
+
+def test_logged_runs_read_back_field_for_field(tmp_path):
+    path = str(tmp_path / 'runs.log')
+    assert run_log.append_run(path, 5, 4, [(0, 0), (4, 3)], 'Random Valid', 12, 7, grade_level=2)
+    assert run_log.append_run(path, 6, 6, [(1, 1), (2, 2), (3, 3)], 'Random', -1, 40)
+
+    records = run_log_analytics.open_log(path)
+    assert run_log.read_header(path) == len(records) == 2
+    first, second = records
+    assert (first['grid_width'], first['grid_height'], first['player_count']) == (5, 4, 2)
+    assert (first['steps'], first['longest_run_without_meeting'], first['grade_level']) == (12, 7, 2)
+    assert batch_runner.WANDERING_CHOICES[first['strategy']] == 'Random Valid'
+    assert first['positions'][:2].tolist() == [[0, 0], [4, 3]]
+    assert (first['positions'][2:] == run_log.UNUSED_POSITION).all()
+    assert second['steps'] == -1 and second['player_count'] == 3
+
+
+def test_batch_round_trip_matches_the_batch_summary(tmp_path):
+    path = str(tmp_path / 'runs.log')
+    positions = [(0, 0), (2, 2)]
+    result = batch_runner.run_batch(5, 5, positions, 'Random', 40, seed=1, keep_trials=True)
+    with run_log.RunLogWriter(path) as writer:
+        writer.append_batch(result, 5, 5, positions, 'Random')
+        writer.append(7, 7, positions, 'Biased Unexplored', 3, 1)
+
+    records = run_log_analytics.open_log(path)
+    batch = run_log_analytics.select(records, grid_width=5, wandering_choice='Random')
+    assert batch['steps'].tolist() == result.steps
+    assert run_log_analytics.summarize(batch)['longest_run_without_meeting'] == max(result.longest_runs)
+    assert set(run_log_analytics.summarize_by(records)) == {(5, 5, 2, 'Random'), (7, 7, 2, 'Biased Unexplored')}
+
+
+def test_truncated_record_is_dropped_on_the_next_append(tmp_path):
+    path = str(tmp_path / 'runs.log')
+    run_log.append_run(path, 5, 5, [(0, 0), (1, 1)], 'Random', 4, 2)
+    with open(path, 'ab') as file:
+        file.write(b'\0' * 5)  # A record cut short by a crash
+    assert run_log.read_header(path) == 1
+
+    run_log.append_run(path, 5, 5, [(0, 0), (1, 1)], 'Random', 9, 3)
+    assert run_log_analytics.open_log(path)['steps'].tolist() == [4, 9]
+
+
+def test_foreign_file_is_not_appended_to(tmp_path):
+    path = tmp_path / 'runs.log'
+    path.write_bytes(b'not a run log at all')
+    assert not run_log.append_run(str(path), 5, 5, [(0, 0), (1, 1)], 'Random', 4, 2)
+    assert path.read_bytes() == b'not a run log at all'
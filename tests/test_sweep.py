@@ -0,0 +1,31 @@
+"""
+Tests for the parameter sweep runner and its result cache.
+"""
+
+import sweep
+
+
+def test_run_job_runs_random_valid_on_a_single_column():
+    [(_, params)] = sweep.expand_jobs({'grid_width': 1, 'grid_height': 5, 'layout': [[0, 0], [0, 1]],
+                                       'wandering_choice': 'Random Valid', 'trials': 10, 'seed': 1})
+    summary = sweep.run_job(params)
+    assert not summary.get('never_meet')
+    assert summary['completed'] == 10
+
+
+def test_run_job_skips_players_that_can_never_meet():
+    [(_, params)] = sweep.expand_jobs({'grid_width': 5, 'grid_height': 5, 'layout': [[0, 0], [0, 1]],
+                                       'wandering_choice': 'Random Valid', 'trials': 10, 'seed': 1})
+    assert sweep.run_job(params)['never_meet']
+
+
+def test_second_sweep_is_served_from_the_cache(tmp_path):
+    spec = {'grid_width': [3, 4], 'grid_height': 4, 'player_count': 2, 'wandering_choice': 'Random',
+            'trials': 5, 'seed': 7}
+    cache_path = str(tmp_path / 'cache.sqlite')
+    first = sweep.run_sweep(spec, cache_path)
+
+    cached = []
+    second = sweep.run_sweep(spec, cache_path, on_result=lambda params, summary, hit: cached.append(hit))
+    assert second == first
+    assert cached == [True, True]
@@ -0,0 +1,34 @@
+"""
+Tests for the NumPy-vectorized batch runner.
+"""
+
+import random
+
+import pytest
+
+import batch_runner
+
+pytest.importorskip('numpy')
+import vectorized_runner  # noqa: E402  (needs NumPy)
+
+
+@pytest.mark.parametrize('wandering_choice', batch_runner.WANDERING_CHOICES)
+def test_single_player_trials_end_like_run_trial(wandering_choice):
+    expected = batch_runner.run_trial(5, 5, [(2, 2)], wandering_choice, random.Random(0))
+    result = vectorized_runner.run_batch_vectorized(5, 5, [(2, 2)], wandering_choice, 10, seed=0)
+    assert set(zip(result.steps, result.longest_runs)) == {expected}
+
+    abandoned = batch_runner.run_trial(5, 5, [(2, 2)], wandering_choice, random.Random(0), max_steps=0)
+    result = vectorized_runner.run_batch_vectorized(5, 5, [(2, 2)], wandering_choice, 10, seed=0, max_steps=0)
+    assert set(zip(result.steps, result.longest_runs)) == {abandoned}
+
+
+@pytest.mark.parametrize('wandering_choice', batch_runner.WANDERING_CHOICES)
+def test_mean_meeting_time_matches_run_trial(wandering_choice):
+    positions = [(0, 0), (2, 2), (4, 0)]
+    rng = random.Random(0)
+    scalar = [batch_runner.run_trial(5, 5, positions, wandering_choice, rng)[0] for _ in range(3000)]
+    vectorized = vectorized_runner.run_batch_vectorized(5, 5, positions, wandering_choice, 3000, seed=0)
+    scalar_mean = sum(scalar) / len(scalar)
+    # Both estimate the same mean; 3000 trials keep them well within 15% of each other
+    assert abs(vectorized.statistics.mean - scalar_mean) < 0.15 * scalar_mean
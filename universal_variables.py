@@ -1,8 +1,4 @@
-# Importing the necessary module for the game
-import pygame
-
-# Initialize the pygame library
-pygame.init()
+from run_statistics import RunStatistics
 
 # ==============================================================
 #                         IMPORTANT VARIABLES
@@ -16,9 +12,19 @@ WINDOW_HEIGHT = 600  # Height of the game window (in pixels)
 GRID_WIDTH = 4  # Number of columns in the grid
 GRID_HEIGHT = 4  # Number of rows in the grid
 CELL_SIZE = 50  # Size (width and height) of each cell in the grid (in pixels)
+MAX_GRID_SIZE = 500  # Largest grid width or height that can be entered in the menu
+
+# Viewport Settings (grids larger than the window can be scrolled and zoomed)
+MAX_VIEW_WIDTH = 1000  # Largest width of the visible part of the grid (in pixels)
+MAX_VIEW_HEIGHT = 700  # Largest height of the visible part of the grid (in pixels)
+MAX_CELL_SIZE = 100  # Largest cell size when zooming in (in pixels)
+LOD_CELL_SIZE = 6  # Below this cell size, a heat map is drawn instead of grid lines and players (in pixels)
+HEAT_MAP_COLORS = ((255, 255, 0), (255, 0, 0))  # Heat map colors of the sparsest and busiest spots (yellow to red)
 
 # Player Settings
 PLAYER_COUNT = 2  # Number of players in the game
+MAX_PLAYER_COUNT = 99  # Largest player count that can be entered in the menu
+POSITION_FORM_ROWS = 16  # Players whose start positions get their own inputs (the rest can be pasted in bulk)
 
 # ==============================================================
 #                         GAME STATISTICS
@@ -35,9 +41,13 @@ SHORTEST_RUN = -1  # Shortest run time (in seconds) during a simulation
 # Average and Current Run Times
 AVERAGE_RUN = 0  # Average run time across all runs
 CURRENT_RUN = 0  # Current run time (in seconds)
+CURRENT_RUN_LONGEST_WITHOUT_MEETING = 0  # Longest time without players meeting in the current run
+
+# Streaming statistics of all run times, kept in constant memory however many runs there are
+RUN_STATISTICS = RunStatistics()  # Count, mean, spread and percentiles of the run times
 
-# List to store run times for all runs
-AGGREGATE_RUNS = []  # List of all run times to calculate averages and comparisons
+# Binary log every completed run is appended to, kept across sessions (None turns logging off)
+RUN_LOG_PATH = 'run_log.bin'  # Read it back with run_log_analytics.open_log
 
 # ==============================================================
 #                         GAME DESIGN PARAMETERS
@@ -49,6 +59,9 @@ GRADE_LEVEL = 1  # Grade level for which the game is designed (default is K-2)
 # Wandering Choice (Player movement behavior)
 WANDERING_CHOICE = 'Biased Unexplored'  # Defines how players wander in the game (random or biased)
 
+# Memory Limit (Biased Unexplored movement)
+MEMORY_LIMIT = 5  # Number of recently visited cells a group leader avoids when wandering 'Biased Unexplored'
+
 # ==============================================================
 #                         COLOR DEFINITIONS
 # ==============================================================
@@ -69,6 +82,25 @@ GROUP_MERGED_COLOR = (128, 0, 128)  # Purple color for merged player groups
 # Turn Time Settings (Duration of each player's turn)
 TURN_TIME = 1  # Time (in seconds) for each player's turn before the game progresses
 
+# Simulation Speed Settings
+SPEED_CHOICES = ('Normal', 'Fast Forward', 'Instant')  # One step per turn | many steps per frame | straight to the end
+SIMULATION_SPEED = 'Normal'  # How quickly the game loop steps the simulation
+STEPS_PER_FRAME = 50  # Steps simulated between redraws in Fast Forward (render every Nth step)
+INSTANT_FRAME_BUDGET = 50  # Time (in milliseconds) Instant spends stepping before checking for input again
+
+# Frame Pacing Settings
+FRAME_RATE = 60  # Maximum number of frames drawn per second
+IDLE_TIMEOUT = 250  # Time (in milliseconds) an idle menu sleeps waiting for input before redrawing anyway
+MERGE_PAUSE = 3  # Time (in seconds) the happy face stays on screen after groups merge
+
+# Profiling Settings (F3 toggles the overlay and recording, F4 exports the recorded timings)
+PROFILING = False  # Record how long each phase of every frame takes from the start, without showing the overlay
+PROFILE_WINDOW = 120  # Number of recent frames the overlay's averages and percentiles are taken over
+PROFILE_MAX_SPANS = 100000  # Most timed spans kept for export; the oldest are dropped first
+PROFILE_CSV_PATH = 'profile.csv'  # File F4 writes the raw timings to as CSV
+PROFILE_TRACE_PATH = 'profile_trace.json'  # File F4 writes the raw timings to as a Chrome trace (chrome://tracing)
+OVERLAY_REFRESH = 250  # Time (in milliseconds) between updates of the numbers shown in the overlay
+
 # ==============================================================
 #                         BUTTON SETTINGS
 # ==============================================================
@@ -89,7 +121,28 @@ PLAYER_COLORS = [(0, 0, 255), (255, 0, 0), (0, 255, 0), (255, 255, 0)]  # Blue,
 #                         FONT SETTINGS
 # ==============================================================
 
-# General Font for Text and Titles
-font = pygame.font.SysFont('Arial', 24)  # Standard font (size 24) for in-game text
-font_title = pygame.font.SysFont('Arial', 60)  # Larger font (size 60) for titles and headers
-BUTTON_FONT = pygame.font.SysFont('Arial', 40)  # Font (size 40) for button text
+# General Font for Text and Titles, looked up the first time each one is used
+FONTS = {
+    'font': ('Arial', 24),  # Standard font (size 24) for in-game text
+    'font_title': ('Arial', 60),  # Larger font (size 60) for titles and headers
+    'BUTTON_FONT': ('Arial', 40),  # Font (size 40) for button text
+    'font_overlay': ('Arial', 16),  # Small font (size 16) for the performance overlay
+}
+
+
+def __getattr__(name):
+    """
+    Loads the fonts in FONTS when they are first read, e.g. universal_variables.font.
+
+    Font discovery is slow, and headless users of this module never draw text.
+
+    Args:
+        name (str): The name of the module attribute being read.
+
+    Returns:
+        pygame.font.Font: The font.
+    """
+    if name in FONTS:
+        import assets  # Imported here so that reading the other settings never loads pygame
+        return assets.get_font(*FONTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
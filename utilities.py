@@ -5,6 +5,8 @@ This module provides utility functions for handling color blending and other
 miscellaneous tasks such as limiting input values within specified ranges.
 """
 
+import universal_variables
+
 def blend_colors(colors):
     """
     Blends a list of RGB colors by averaging their respective components.
@@ -24,6 +26,21 @@ def blend_colors(colors):
     return r, g, b  # Return the blended color as a tuple
 
 
+def heat_color(fraction):
+    """
+    Picks the heat map color for a density.
+
+    Args:
+        fraction (float): The density, from 0 (empty) to 1 (the busiest spot on screen).
+
+    Returns:
+        tuple: The RGB color, running from HEAT_MAP_COLORS[0] for sparse spots to HEAT_MAP_COLORS[1] for the busiest.
+    """
+    (r1, g1, b1), (r2, g2, b2) = universal_variables.HEAT_MAP_COLORS
+    return (round(r1 + (r2 - r1) * fraction), round(g1 + (g2 - g1) * fraction),
+            round(b1 + (b2 - b1) * fraction))  # Linear blend between the two ends
+
+
 def limit_input_value(value, input_field, min, max):
     """
     Limits the input value to be within a specified range.
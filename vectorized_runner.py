@@ -0,0 +1,234 @@
+"""
+Vectorized runner module for simulating many trials at once with NumPy.
+
+This module holds the cells of T trials x P players in NumPy arrays and
+advances every unfinished trial with one set of masked array operations per
+step, instead of stepping one leader at a time in Python. Each strategy
+follows the same rules as its group_manager function (and batch_runner):
+groups move with their lowest numbered member as leader, all groups sharing a
+cell merge after each step, and a trial is retired as soon as all of its
+players share a cell.
+"""
+
+import itertools
+
+import numpy as np
+
+import batch_runner
+import grid_adjacency
+
+# Number of trials simulated together, bounding the size of the working arrays
+DEFAULT_BLOCK_SIZE = 50000
+
+# Most players whose cells are compared pair by pair to find collisions; sorting every row is faster beyond that
+PAIRWISE_MAX_PLAYERS = 12
+
+# Direction bits of a 4-bit move mask, in group_manager order: up, down, left, right
+DIRECTION_BITS = np.array([1, 2, 4, 8], dtype=np.uint8)
+
+# Number of allowed directions in each move mask
+MASK_COUNTS = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.uint8)
+
+# MASK_CHOICES[mask * 4 + n] is the direction of the n-th allowed move in a mask
+MASK_CHOICES = np.array([([d for d in range(4) if mask >> d & 1] + [0] * 4)[:4] for mask in range(16)],
+                        dtype=np.int32).ravel()
+
+
+def _move_arrays(grid_width, grid_height, wandering_choice):
+    """
+    Builds the NumPy lookup tables used by the vectorized kernel.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+
+    Returns:
+        tuple: (moves, valid_masks, neighbour_bits), where moves[cell * 4 + direction]
+               is the destination of each move, valid_masks[cell] flags the in-bounds
+               directions, and neighbour_bits[other - cell + cells] is the direction
+               bit leading from cell to an adjacent other cell (0 if not adjacent).
+    """
+    if wandering_choice not in batch_runner.WANDERING_CHOICES:
+        raise ValueError('Unrecognized wandering choice: ' + str(wandering_choice))
+
+    # Biased Unexplored never picks a blocked move, so it can share the Random table
+    adjacency = grid_adjacency.get_adjacency(grid_width, grid_height)
+    moves = np.array(adjacency.reflected if wandering_choice == 'Random Valid' else adjacency.clamped, dtype=np.intp)
+    valid_masks = np.array(adjacency.valid_masks, dtype=np.uint8)
+
+    # Offsets wrap around row ends, but those directions are never valid, so valid_masks filters them out
+    neighbour_bits = np.zeros(2 * grid_width * grid_height, dtype=np.uint8)
+    for direction, (dx, dy) in enumerate(grid_adjacency.DIRECTIONS):
+        neighbour_bits[grid_width * grid_height + dy * grid_width + dx] = DIRECTION_BITS[direction]
+
+    return moves, valid_masks, neighbour_bits
+
+
+def _run_block(moves, valid_masks, neighbour_bits, start_cells, wandering_choice, trials, rng, memory_limit,
+               max_steps):
+    """
+    Simulates one block of trials side by side until all of them are retired.
+
+    Args:
+        moves (numpy.ndarray): The flat move table from _move_arrays.
+        valid_masks (numpy.ndarray): The in-bounds direction mask of each cell.
+        neighbour_bits (numpy.ndarray): The direction bit of each cell offset.
+        start_cells (numpy.ndarray): The starting cell of each player.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        trials (int): The number of trials in the block.
+        rng (numpy.random.Generator): The random number generator driving the moves.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+
+    Returns:
+        tuple: (steps, longest_runs) arrays with one entry per trial (steps is -1 if abandoned).
+    """
+    player_count = len(start_cells)
+    if player_count == 1:
+        # A lone player has nobody to meet, so like run_trial, its trials end after their first step
+        finished = max_steps is None or max_steps >= 1
+        return np.full(trials, 1 if finished else -1, dtype=np.int64), np.zeros(trials, dtype=np.int64)
+    players = np.arange(player_count, dtype=np.intp)
+    biased = wandering_choice == 'Biased Unexplored'
+    cell_count = len(valid_masks)
+    # Lifts each follower's cell into a range of its own, so followers never look like they collide
+    follower_offset = cell_count * (players + 1)
+    # Pairs of players to compare for collisions, or None to sort every row instead
+    pairs = list(itertools.combinations(players, 2)) if player_count <= PAIRWISE_MAX_PLAYERS else None
+    has_followers = False  # Whether any unfinished trial has merged groups yet
+
+    steps = np.full(trials, -1, dtype=np.int64)
+    longest_runs = np.zeros(trials, dtype=np.int64)
+
+    # Working state of the unfinished trials; rows are compacted once enough trials have retired
+    trial_ids = np.arange(trials)
+    alive = np.ones(trials, dtype=bool)  # Rows that have not been retired yet
+    cell = np.tile(start_cells, (trials, 1))  # Cell of every player
+    leader = np.tile(players, (trials, 1))  # Group leader of every player
+    offset = np.zeros((trials, player_count), dtype=np.int64)  # 0 for leaders, follower_offset for followers
+    last_meeting = np.zeros((trials, player_count), dtype=np.int64)  # Step of each player's last merge
+    longest = np.zeros(trials, dtype=np.int64)
+    row_start = np.arange(trials, dtype=np.intp)[:, None] * player_count  # Flat index of each row
+    if biased:
+        # Ring buffer of the last memory_limit cells of every player; only leaders' buffers are ever read.
+        # Unused slots repeat the starting cell, which is in the history until slot 0 is overwritten anyway
+        history = np.tile(start_cells, (memory_limit, trials, 1))
+
+    step = 0
+    retired = 0  # Retired rows still waiting to be compacted away
+    while len(trial_ids) and (max_steps is None or step < max_steps):
+        step += 1
+        active = len(trial_ids)
+
+        # Move every player as if it led a group; followers are overwritten below
+        if biased:
+            # Flag the valid directions leading back into each player's recent history
+            explored = np.zeros((active, player_count), dtype=np.uint8)
+            shift = cell_count - cell
+            for visited in history:
+                explored |= neighbour_bits[visited + shift]
+            valid = valid_masks[cell]
+            allowed = valid & ~explored
+            allowed = np.where(allowed != 0, allowed, valid)  # If all are explored, move randomly
+
+            # Pick the n-th allowed move, n drawn uniformly like random.choice would
+            choice = (rng.random((active, player_count), dtype=np.float32) * MASK_COUNTS[allowed]).astype(np.intp)
+            direction = MASK_CHOICES[allowed.astype(np.intp) * 4 + choice]
+        else:
+            # Two random bits per player pick one of the four directions
+            direction = np.frombuffer(rng.bytes(active * player_count), dtype=np.uint8).reshape(active, -1) & 3
+        new_cell = moves[cell * 4 + direction]
+
+        # Members follow their leader, and every player remembers where it went
+        cell = new_cell.ravel()[row_start[:active] + leader] if has_followers else new_cell
+        if biased:
+            history[step % memory_limit] = cell
+
+        # Look for any two leaders on the same cell
+        leader_cell = cell + offset
+        if pairs is not None:
+            colliding = np.zeros(active, dtype=bool)
+            for first, second in pairs:
+                colliding |= leader_cell[:, first] == leader_cell[:, second]
+        else:
+            sorted_cells = np.sort(leader_cell, axis=1)  # Sorting puts leaders on the same cell next to each other
+            colliding = (sorted_cells[:, 1:] == sorted_cells[:, :-1]).any(axis=1)
+        merging = np.nonzero(colliding & alive)[0]
+
+        if len(merging):
+            # Each leader joins the lowest numbered leader on its cell, as update_groups does
+            merging_cells = leader_cell[merging]
+            same_cell = merging_cells[:, :, None] == merging_cells[:, None, :]
+            new_leader = same_cell.argmax(axis=2)  # First player sharing the cell (possibly itself)
+            involved = same_cell.sum(axis=2) > 1  # Leaders taking part in a merge
+
+            # Every leader in a merge ends its run without meeting and resets its move count
+            merging_last = last_meeting[merging]
+            run_lengths = np.where(involved, step - merging_last, 0)
+            longest[merging] = np.maximum(longest[merging], run_lengths.max(axis=1))
+            last_meeting[merging] = np.where(involved, step, merging_last)
+
+            merged_leader = np.take_along_axis(new_leader, leader[merging], axis=1)
+            leader[merging] = merged_leader
+            offset[merging] = np.where(merged_leader == players, 0, follower_offset)
+
+            # Only a step with a collision can bring everybody together, so retire from the merging rows
+            finished = merging[(cell[merging] == cell[merging, :1]).all(axis=1)]
+            if len(finished):
+                steps[trial_ids[finished]] = step
+                longest_runs[trial_ids[finished]] = longest[finished]
+                alive[finished] = False
+                retired += len(finished)
+            has_followers = has_followers or len(finished) < len(merging)
+
+        # Drop retired rows once they make up a quarter of the working arrays
+        if retired * 4 > active:
+            keep = alive
+            trial_ids, alive, cell, leader, offset = trial_ids[keep], alive[keep], cell[keep], leader[keep], offset[keep]
+            last_meeting, longest = last_meeting[keep], longest[keep]
+            if biased:
+                history = history[:, keep]
+            retired = 0
+
+    trial_ids, longest = trial_ids[alive], longest[alive]
+    longest_runs[trial_ids] = longest  # Abandoned trials keep the runs they managed
+    return steps, longest_runs
+
+
+def run_batch_vectorized(grid_width, grid_height, positions, wandering_choice, trials, seed=None, memory_limit=5,
+                         max_steps=None, block_size=DEFAULT_BLOCK_SIZE, keep_trials=True):
+    """
+    Runs a batch of independent trials with the vectorized kernel.
+
+    Args:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        positions (list of tuple): The (x, y) starting position of each player.
+        wandering_choice (str): One of batch_runner.WANDERING_CHOICES.
+        trials (int): The number of trials to run.
+        seed (int): Optional seed, making the batch reproducible.
+        memory_limit (int): The number of past positions a Biased Unexplored leader remembers.
+        max_steps (int): Optional cap on the number of steps of each trial.
+        block_size (int): The number of trials simulated together.
+        keep_trials (bool): Whether to keep every trial's result, or only the statistics (constant memory).
+
+    Returns:
+        batch_runner.BatchResult: The per-trial meeting steps and longest runs without meeting.
+    """
+    for x, y in positions:
+        if not (0 <= x < grid_width and 0 <= y < grid_height):
+            raise ValueError(f'Starting position ({x}, {y}) is outside the {grid_width}x{grid_height} grid')
+
+    moves, valid_masks, neighbour_bits = _move_arrays(grid_width, grid_height, wandering_choice)
+    # Native index integers, which NumPy gathers with faster than narrower ones
+    start_cells = np.array([y * grid_width + x for x, y in positions], dtype=np.intp)
+    rng = np.random.default_rng(seed)
+    result = batch_runner.BatchResult(keep_trials=keep_trials)
+
+    for start in range(0, trials, block_size):
+        steps, longest_runs = _run_block(moves, valid_masks, neighbour_bits, start_cells, wandering_choice,
+                                         min(block_size, trials - start), rng, memory_limit, max_steps)
+        result.merge(batch_runner.BatchResult(steps.tolist(), longest_runs.tolist(), keep_trials))
+
+    return result
@@ -0,0 +1,205 @@
+"""
+Viewport module defining the Viewport class.
+
+The game window used to be exactly as large as the grid, which capped the
+forest at the size of the screen. A Viewport is a scrollable, zoomable camera
+onto the grid: it maps grid cells to window pixels, tells the renderer which
+cells are visible so everything else can be skipped, and decides when the
+cells have become too small to draw individually.
+"""
+
+import math
+
+import pygame
+
+import universal_variables
+
+# Zoom applied by one step of the mouse wheel or the +/- keys
+ZOOM_STEP = 1.25
+
+
+class Viewport:
+    """
+    A class representing the visible part of the grid.
+
+    Positions in the forest are measured in world pixels, where cell (x, y)
+    covers x * cell_size to (x + 1) * cell_size horizontally, and likewise
+    vertically. The viewport shows the world pixels starting at (left, top).
+
+    Attributes:
+        grid_width (int): The width of the grid.
+        grid_height (int): The height of the grid.
+        width (int): The width of the visible area, in window pixels.
+        height (int): The height of the visible area, in window pixels.
+        cell_size (int): The current zoom, as the size of a cell in pixels.
+        left (int): The world pixel shown at the left edge of the visible area.
+        top (int): The world pixel shown at the top edge of the visible area.
+    """
+
+    def __init__(self, grid_width, grid_height, width, height, cell_size):
+        """
+        Initializes a Viewport instance showing the top-left corner of the grid.
+
+        Args:
+            grid_width (int): The width of the grid.
+            grid_height (int): The height of the grid.
+            width (int): The width of the visible area, in window pixels.
+            height (int): The height of the visible area, in window pixels.
+            cell_size (int): The starting size of a cell in pixels.
+        """
+        self.grid_width = grid_width  # Set grid width
+        self.grid_height = grid_height  # Set grid height
+        self.width = width  # Set visible width
+        self.height = height  # Set visible height
+        self.cell_size = cell_size  # Set zoom
+        self.left = 0  # Scroll position
+        self.top = 0
+        self.clamp()
+
+    @classmethod
+    def for_grid(cls, grid_width, grid_height, cell_size):
+        """
+        Creates the viewport of a new game, sized to fit the grid on screen.
+
+        The visible area is the grid at the requested cell size, up to
+        MAX_VIEW_WIDTH x MAX_VIEW_HEIGHT pixels. A grid that does not fit starts
+        zoomed out so the whole forest is in view.
+
+        Args:
+            grid_width (int): The width of the grid.
+            grid_height (int): The height of the grid.
+            cell_size (int): The preferred size of a cell in pixels.
+
+        Returns:
+            Viewport: The new viewport.
+        """
+        width = min(grid_width * cell_size, universal_variables.MAX_VIEW_WIDTH)
+        height = min(grid_height * cell_size, universal_variables.MAX_VIEW_HEIGHT)
+        viewport = cls(grid_width, grid_height, width, height, cell_size)
+
+        if width < grid_width * cell_size or height < grid_height * cell_size:
+            viewport.fit()  # Show the whole forest to start with
+        return viewport
+
+    def min_cell_size(self):
+        """
+        Returns the smallest zoom, at which the whole grid fits in the visible area.
+
+        Returns:
+            int: The cell size in pixels (at least 1).
+        """
+        return max(1, min(self.width // self.grid_width, self.height // self.grid_height))
+
+    def clamp(self):
+        """
+        Keeps the zoom within its limits and the visible area on the grid.
+        """
+        self.cell_size = max(self.min_cell_size(), min(self.cell_size, universal_variables.MAX_CELL_SIZE))
+        self.left = max(0, min(self.left, self.grid_width * self.cell_size - self.width))
+        self.top = max(0, min(self.top, self.grid_height * self.cell_size - self.height))
+
+    def pan(self, dx, dy):
+        """
+        Scrolls the visible area.
+
+        Args:
+            dx (int): The number of pixels to scroll right (negative scrolls left).
+            dy (int): The number of pixels to scroll down (negative scrolls up).
+        """
+        self.left += dx
+        self.top += dy
+        self.clamp()
+
+    def zoom(self, steps, anchor=None):
+        """
+        Zooms in or out, keeping the point under the anchor in place.
+
+        Args:
+            steps (int): The number of zoom steps (positive zooms in, negative zooms out).
+            anchor (tuple): The (x, y) window pixel to zoom around (defaults to the center).
+        """
+        anchor_x, anchor_y = anchor if anchor else (self.width // 2, self.height // 2)
+
+        # Rounding away from the current size changes it by at least one pixel, so small cells can still zoom
+        cell_size = self.cell_size * ZOOM_STEP ** steps
+        cell_size = math.ceil(cell_size) if steps > 0 else math.floor(cell_size)
+
+        # The world position under the anchor, in cells, stays under the anchor
+        world_x = (self.left + anchor_x) / self.cell_size
+        world_y = (self.top + anchor_y) / self.cell_size
+        self.cell_size = max(self.min_cell_size(), min(cell_size, universal_variables.MAX_CELL_SIZE))
+        self.left = round(world_x * self.cell_size - anchor_x)
+        self.top = round(world_y * self.cell_size - anchor_y)
+        self.clamp()
+
+    def fit(self):
+        """
+        Zooms out until the whole grid is visible.
+        """
+        self.cell_size = self.min_cell_size()
+        self.left = self.top = 0
+        self.clamp()
+
+    def detailed(self):
+        """
+        Tells whether cells are large enough to draw grid lines and individual players.
+
+        Returns:
+            bool: False once the cells are smaller than LOD_CELL_SIZE, where a heat map is drawn instead.
+        """
+        return self.cell_size >= universal_variables.LOD_CELL_SIZE
+
+    def visible_cells(self):
+        """
+        Returns the range of cells at least partly inside the visible area.
+
+        Returns:
+            tuple: (first_x, first_y, end_x, end_y), with the end coordinates exclusive.
+        """
+        first_x, first_y = self.left // self.cell_size, self.top // self.cell_size
+        end_x = min(self.grid_width, -(-(self.left + self.width) // self.cell_size))
+        end_y = min(self.grid_height, -(-(self.top + self.height) // self.cell_size))
+        return first_x, first_y, end_x, end_y
+
+    def cell_rect(self, x, y, cells=1):
+        """
+        Returns the window rectangle covered by a cell, or by a square block of cells.
+
+        Args:
+            x (int): The x-coordinate of the (top-left) cell.
+            y (int): The y-coordinate of the (top-left) cell.
+            cells (int): The number of cells along each side of the block.
+
+        Returns:
+            pygame.Rect: The rectangle in window pixels (it may extend past the visible area).
+        """
+        return pygame.Rect(x * self.cell_size - self.left, y * self.cell_size - self.top, self.cell_size * cells,
+                           self.cell_size * cells)
+
+    def view_rect(self):
+        """
+        Returns the window rectangle of the visible area.
+
+        Returns:
+            pygame.Rect: The visible area, which starts at the top-left corner of the window.
+        """
+        return pygame.Rect(0, 0, self.width, self.height)
+
+    def grid_rect(self):
+        """
+        Returns the part of the visible area covered by the grid.
+
+        Returns:
+            pygame.Rect: The window rectangle showing grid cells (smaller than the view when zoomed all the way out).
+        """
+        return pygame.Rect(-self.left, -self.top, self.grid_width * self.cell_size,
+                           self.grid_height * self.cell_size).clip(self.view_rect())
+
+    def state(self):
+        """
+        Returns everything that decides which world pixel appears where.
+
+        Returns:
+            tuple: The cell size, scroll position and visible size.
+        """
+        return self.cell_size, self.left, self.top, self.width, self.height
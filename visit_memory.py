@@ -0,0 +1,84 @@
+"""
+Visit memory module defining the VisitMemory class.
+
+This module contains the VisitMemory class, which remembers the most recently
+visited cells of a wandering group. Cells are kept in a ring buffer together
+with a count of how often each cell appears in it, so checking whether a cell
+was visited and forgetting the oldest visit both take constant time, however
+large the memory limit is.
+"""
+
+from collections import deque
+
+
+class VisitMemory:
+    """
+    A class remembering the last few cells visited by a group leader.
+
+    Attributes:
+        visits (collections.deque): The remembered cells, oldest first.
+        counts (dict): How many times each remembered cell appears in visits.
+    """
+
+    def __init__(self, cells=()):
+        """
+        Initializes a VisitMemory instance.
+
+        Args:
+            cells: The cells to start with, oldest first.
+        """
+        self.visits = deque()  # Ring buffer of remembered cells
+        self.counts = {}  # Cell -> number of times it appears in visits
+
+        for cell in cells:
+            self.visits.append(cell)
+            self.counts[cell] = self.counts.get(cell, 0) + 1
+
+    def append(self, cell, limit):
+        """
+        Remembers a newly visited cell, forgetting the oldest ones beyond the limit.
+
+        Args:
+            cell: The visited cell.
+            limit (int): The number of cells to remember.
+        """
+        self.visits.append(cell)
+        self.counts[cell] = self.counts.get(cell, 0) + 1
+
+        # Forget the oldest visits until the memory fits the limit again
+        while len(self.visits) > limit:
+            oldest = self.visits.popleft()
+            if self.counts[oldest] == 1:
+                del self.counts[oldest]
+            else:
+                self.counts[oldest] -= 1
+
+    def __contains__(self, cell):
+        """
+        Checks whether a cell is currently remembered.
+
+        Args:
+            cell: The cell to look up.
+
+        Returns:
+            bool: True if the cell is among the remembered visits.
+        """
+        return cell in self.counts
+
+    def __len__(self):
+        """
+        Returns the number of remembered visits.
+
+        Returns:
+            int: The number of cells in the ring buffer.
+        """
+        return len(self.visits)
+
+    def __iter__(self):
+        """
+        Iterates over the remembered cells, oldest first.
+
+        Returns:
+            iterator: An iterator over the remembered cells.
+        """
+        return iter(self.visits)